@@ -2,19 +2,100 @@
 Forex Trading Analysis Web Application
 Flask-based REST API for price action analysis
 """
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template
 from flask_cors import CORS
-from src.scanner import ForexScanner
-from src.oanda_client import OandaClient
-from src.support_resistance import SupportResistance
 from config import Config
+from src.serialization import FastJSONProvider, ScanResult, Signal, compress, omit_unchanged
+from typing import List
 import os
+import threading
+
+# pandas, numpy and oandapyV20 are only imported with the scanner, on the
+# first request that needs them, so importing the app stays fast
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
-# Initialize scanner
-scanner = ForexScanner()
+_scanner = None
+_scanner_lock = threading.Lock()
+
+# Correlation trackers per (timeframe, window), fed incrementally from cached candles
+correlation_trackers = {}
+_correlation_trackers_lock = threading.Lock()
+
+# Analysis contexts of candle store series served to charts, per (pair, timeframe)
+chart_contexts = {}
+_chart_contexts_lock = threading.Lock()
+
+# Response types worth compressing
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/octet-stream',
+    'application/vnd.apache.arrow.stream'
+}
+
+
+def known_digests():
+    """
+    Get the result digests the client already has
+
+    Returns:
+        set: Digests from the 'known' query param, or None if it was not given
+    """
+    if 'known' not in request.args:
+        return None
+
+    return {digest for digest in request.args.get('known', '').split(',') if digest}
+
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON and binary responses when the client accepts gzip or br"""
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough or
+            'Content-Encoding' in response.headers):
+        return response
+
+    body, encoding = compress(response.get_data(), request.headers.get('Accept-Encoding'))
+
+    if encoding is not None:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+
+    return response
+
+
+def get_scanner():
+    """
+    Get the shared scanner, creating it on first use
+
+    Returns:
+        ForexScanner: Scanner with its API client and signal store
+    """
+    global _scanner
+
+    with _scanner_lock:
+        if _scanner is None:
+            from src.scanner import ForexScanner
+            from src.signal_store import SignalStore
+
+            history_store = None
+            if Config.HISTORY_DIR:
+                from src.history_store import HistoryStore
+                history_store = HistoryStore()
+
+            _scanner = ForexScanner(
+                signal_store=SignalStore(Config.SIGNAL_DB_PATH or None),
+                history_store=history_store
+            )
+
+            # Pip sizes come from the account's instruments, fetched once here
+            # (without credentials the saved table or the stand-in is used)
+            from src.instruments import default_instruments
+            default_instruments(_scanner.client if Config.OANDA_API_KEY else None)
+
+        return _scanner
 
 
 @app.route('/')
@@ -26,10 +107,13 @@ def index():
 @app.route('/api/health')
 def health():
     """Health check endpoint"""
+    from src.request_scheduler import default_scheduler
+
     return jsonify({
         'status': 'healthy',
         'version': '1.0.0',
-        'api_configured': bool(Config.OANDA_API_KEY)
+        'api_configured': bool(Config.OANDA_API_KEY),
+        'scheduler': default_scheduler().metrics()
     })
 
 
@@ -50,14 +134,21 @@ def scan_pair(pair):
     Args:
         pair (str): Forex pair (e.g., EUR_USD)
         timeframe (str): Optional timeframe query param
+        known (str): Optional comma-separated result digests already received;
+            an unchanged result is returned as a stub with its digest
 
     Returns:
         JSON: Scan results
     """
     timeframe = request.args.get('timeframe', 'H4')
+    known = known_digests()
 
     try:
-        result = scanner.scan_pair(pair, timeframe)
+        result: ScanResult = get_scanner().scan_pair(pair, timeframe)
+
+        if known is not None:
+            result = omit_unchanged([result], known)[0]
+
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -68,16 +159,32 @@ def scan_all():
     """
     Scan all pairs
 
+    Args:
+        timeframe (str): Optional timeframe query param
+        batched (bool): Optional query param, detect patterns for all pairs in one pass
+        known (str): Optional comma-separated result digests already received;
+            unchanged results are returned as stubs with their digest
+
     Returns:
-        JSON: All scan results
+        JSON: All scan results, with the candidates each signal filter stage removed
     """
     timeframe = request.args.get('timeframe', 'H4')
+    batched = request.args.get('batched', 'false').lower() in ('1', 'true', 'yes')
+    known = known_digests()
 
     try:
-        results = scanner.scan_all_pairs(timeframe)
+        from src.signal_pipeline import StageCounters
+
+        filters = StageCounters()
+        results: List[ScanResult] = get_scanner().scan_all_pairs(timeframe, batched=batched, counters=filters)
+
+        if known is not None:
+            results = omit_unchanged(results, known)
+
         return jsonify({
             'timeframe': timeframe,
-            'results': results
+            'results': results,
+            'filters': filters.snapshot()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -95,7 +202,7 @@ def scan_multi_timeframe(pair):
         JSON: Multi-timeframe analysis
     """
     try:
-        result = scanner.scan_multi_timeframe(pair)
+        result = get_scanner().scan_multi_timeframe(pair)
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -106,15 +213,51 @@ def get_signals():
     """
     Get active trading signals
 
+    Args:
+        timeframe (str): Optional timeframe query param
+        only_new (bool): Optional query param, only signals new since the last scan
+
     Returns:
-        JSON: Active signals
+        JSON: Active signals, with the candidates each signal filter stage removed
     """
     timeframe = request.args.get('timeframe', 'H4')
+    only_new = request.args.get('only_new', 'false').lower() in ('1', 'true', 'yes')
 
     try:
-        signals = scanner.get_active_signals(timeframe)
+        from src.signal_pipeline import StageCounters
+
+        filters = StageCounters()
+        signals: List[Signal] = get_scanner().get_active_signals(timeframe, only_new=only_new, counters=filters)
         return jsonify({
             'timeframe': timeframe,
+            'count': len(signals),
+            'signals': signals,
+            'filters': filters.snapshot()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/signals/tracked')
+def get_tracked_signals():
+    """
+    Get signals tracked across scans with their lifecycle status
+
+    Args:
+        pair (str): Optional pair query param
+        timeframe (str): Optional timeframe query param
+        status (str): Optional status query param ('open', 'hit_tp', 'hit_sl', 'watch')
+
+    Returns:
+        JSON: Tracked signals
+    """
+    try:
+        signals = get_scanner().signal_store.get_signals(
+            pair=request.args.get('pair'),
+            timeframe=request.args.get('timeframe'),
+            status=request.args.get('status')
+        )
+        return jsonify({
             'count': len(signals),
             'signals': signals
         })
@@ -122,6 +265,212 @@ def get_signals():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/history/win-rate')
+def get_history_win_rate():
+    """
+    Get the win rate of historical signals from the scan history
+
+    Args:
+        pattern (str): Optional pattern query param (e.g., bullish_engulfing)
+        pair (str): Optional pair query param
+        timeframe (str): Optional timeframe query param
+        level (str): Optional level query param ('support' or 'resistance')
+        months (int): Optional lookback in months
+
+    Returns:
+        JSON: Signal counts and win rate
+    """
+    try:
+        history_store = get_scanner().history_store
+
+        if history_store is None:
+            return jsonify({'error': 'Scan history is disabled (set HISTORY_DIR)'}), 404
+
+        months = request.args.get('months')
+
+        return jsonify(history_store.win_rate(
+            pattern=request.args.get('pattern'),
+            pair=request.args.get('pair'),
+            timeframe=request.args.get('timeframe'),
+            level=request.args.get('level'),
+            months=int(months) if months else None
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/correlation')
+def get_correlation():
+    """
+    Get the rolling return correlation matrix and currency strength
+
+    Uses candles cached by earlier scans, falling back to the local candle
+    store; no new API calls are made. Stored candles are only read when the
+    store has bars the tracker has not seen yet.
+
+    Args:
+        timeframe (str): Optional timeframe query param
+        window (int): Optional rolling window query param (one of Config.CORRELATION_WINDOWS)
+
+    Returns:
+        JSON: Correlation matrix and currency strength
+    """
+    timeframe = request.args.get('timeframe', 'H4')
+    window = request.args.get('window', '100')
+
+    if timeframe not in Config.TIMEFRAMES:
+        return jsonify({'error': f"timeframe must be one of {Config.TIMEFRAMES}"}), 400
+    if not window.isdigit() or int(window) not in Config.CORRELATION_WINDOWS:
+        return jsonify({'error': f"window must be one of {Config.CORRELATION_WINDOWS}"}), 400
+
+    try:
+        from src.candle_store import CandleStore
+        from src.correlation import CorrelationTracker
+
+        window = int(window)
+        with _correlation_trackers_lock:
+            tracker = correlation_trackers.get((timeframe, window))
+            if tracker is None:
+                tracker = CorrelationTracker(Config.DEFAULT_PAIRS, window=window)
+                correlation_trackers[(timeframe, window)] = tracker
+
+        frames = get_scanner().analysis_cache.frames(timeframe)
+        store = CandleStore()
+        missing = []
+        # Last bar of stored series without new bars, which others must not overtake
+        until = None
+
+        for pair in Config.DEFAULT_PAIRS:
+            if pair in frames:
+                continue
+
+            stored_until = store.last_time(pair, timeframe)
+            if stored_until is None:
+                missing.append(pair)
+            elif tracker.last_time is None or stored_until > tracker.last_time:
+                frames[pair] = store.load(pair, timeframe, start=tracker.last_time)
+            else:
+                until = stored_until if until is None else min(until, stored_until)
+
+        tracker.update_from_frames(frames, until=until)
+
+        return jsonify({
+            'timeframe': timeframe,
+            'missing_pairs': missing,
+            **tracker.to_dict()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def chart_context(pair, timeframe, count):
+    """
+    Get the candles to chart, with their overlays, without calling OANDA if possible
+
+    The scanner's cached candles are used when they cover the requested bars,
+    then the local candle store, and only then the API.
+
+    Args:
+        pair (str): Forex pair
+        timeframe (str): Timeframe
+        count (int): Bars wanted
+
+    Returns:
+        AnalysisContext: Context for the candles, or None if no data is available
+    """
+    from src.analysis_context import AnalysisContext
+    from src.candle_store import CandleStore
+
+    scanner = get_scanner()
+    context = scanner.analysis_cache.latest(pair, timeframe)
+
+    if context is not None and len(context.df) >= count:
+        return context
+
+    store = CandleStore()
+    last_time = store.last_time(pair, timeframe)
+
+    if last_time is not None:
+        key = (pair, timeframe)
+        with _chart_contexts_lock:
+            cached = chart_contexts.get(key)
+
+        if cached is None or cached.bar_time != last_time:
+            # Loaded outside the lock; a concurrent request for the same series may load it too
+            cached = AnalysisContext(store.load(pair, timeframe), pair=pair, timeframe=timeframe)
+            with _chart_contexts_lock:
+                current = chart_contexts.get(key)
+                if current is None or current.bar_time is None or current.bar_time < cached.bar_time:
+                    chart_contexts[key] = cached
+                else:
+                    cached = current
+
+        return cached
+
+    if context is not None:
+        return context
+
+    df = scanner.client.get_candles(pair, granularity=timeframe, count=min(count, 5000))
+
+    if df is None or df.empty:
+        return None
+
+    return scanner.analysis_cache.get(pair, timeframe, df)
+
+
+@app.route('/api/candles/<pair>')
+def get_candles(pair):
+    """
+    Get candles with pattern and level overlays for charting
+
+    Args:
+        pair (str): Forex pair
+        timeframe (str): Optional timeframe query param
+        count (int): Optional number of most recent bars (default 500)
+        since (int): Optional cursor (epoch ms) from a previous response;
+            only newer bars are returned
+        max_points (int): Optional maximum bars, downsampled with LTTB
+        format (str): Optional 'json', 'binary' (typed-array buffers) or
+            'arrow' (Arrow IPC); defaults from the Accept header, else JSON
+
+    Returns:
+        Candle columns, pattern bitmask per bar, S/R levels and next cursor
+    """
+    from src.candle_feed import ARROW_MIME, BINARY_MIME, build_feed, encode_arrow, encode_binary, encode_json
+
+    timeframe = request.args.get('timeframe', 'H4')
+    count = int(request.args.get('count', 500))
+    since = request.args.get('since')
+    max_points = request.args.get('max_points')
+
+    output_format = request.args.get('format')
+    if output_format is None:
+        accept = request.headers.get('Accept', '')
+        output_format = 'arrow' if ARROW_MIME in accept else 'binary' if BINARY_MIME in accept else 'json'
+
+    try:
+        context = chart_context(pair, timeframe, count)
+
+        if context is None:
+            return jsonify({'error': 'Unable to fetch data'}), 400
+
+        feed = build_feed(
+            context,
+            count=count,
+            since=int(since) if since else None,
+            max_points=int(max_points) if max_points else None
+        )
+
+        if output_format == 'arrow':
+            return Response(encode_arrow(feed), mimetype=ARROW_MIME)
+        if output_format == 'binary':
+            return Response(encode_binary(feed), mimetype=BINARY_MIME)
+
+        return jsonify(encode_json(feed))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/price/<pair>')
 def get_price(pair):
     """
@@ -134,6 +483,8 @@ def get_price(pair):
         JSON: Current price data
     """
     try:
+        from src.oanda_client import OandaClient
+
         client = OandaClient()
         price = client.get_current_price(pair)
 
@@ -179,15 +530,19 @@ def calculate_risk():
         account_size = float(data.get('account_size', 10000))
         risk_percent = float(data.get('risk_percent', 1))
 
-        # Get data for S/R levels
-        client = OandaClient()
-        df = client.get_candles(pair, granularity='H4', count=200)
+        # Reuse S/R levels from the last scan if no candle closed since
+        scanner = get_scanner()
+        context = scanner.analysis_cache.peek(pair, 'H4')
 
-        if df is None:
-            return jsonify({'error': 'Unable to fetch data'}), 400
+        if context is None:
+            df = scanner.client.get_candles(pair, granularity='H4', count=200)
+
+            if df is None or df.empty:
+                return jsonify({'error': 'Unable to fetch data'}), 400
+
+            context = scanner.analysis_cache.get(pair, 'H4', df)
 
-        sr_detector = SupportResistance(df)
-        sr_detector.detect_support_resistance()
+        sr_detector = context.sr_detector
 
         # Calculate R/R
         rr = sr_detector.calculate_risk_reward(
@@ -197,18 +552,41 @@ def calculate_risk():
             take_profit_pips
         )
 
-        # Calculate position size
-        risk_amount = account_size * (risk_percent / 100)
-        pip_value = 10 if 'JPY' in pair else 1  # Simplified
-        position_size = risk_amount / (rr['risk_pips'] * pip_value)
+        # Size the position from the pair's pip size and quote currency
+        from src.instruments import conversion_pairs, default_instruments
+
+        from oandapyV20.exceptions import V20Error
+
+        prices = {}
+        for candidate in conversion_pairs(pair):
+            try:
+                price = scanner.client.get_current_price(candidate)
+            except V20Error as e:
+                if e.code != 400:
+                    raise
+                continue  # Only one orientation of the pair is quoted
+
+            if price:
+                prices[candidate] = (price['bid'] + price['ask']) / 2
+                break
+
+        sizing = default_instruments(scanner.client).size_positions(
+            [pair], [entry], [rr['stop_loss']], [rr['take_profit']], account_size, risk_percent, prices=prices
+        )
+
+        if sizing['errors'][0]:
+            return jsonify({'error': sizing['errors'][0]}), 400
 
         result = {
             **rr,
             'account_size': account_size,
             'risk_percent': risk_percent,
-            'risk_amount': round(risk_amount, 2),
-            'position_size_lots': round(position_size / 100000, 2),  # Standard lots
-            'potential_profit': round(risk_amount * rr['risk_reward_ratio'], 2)
+            'pip_size': float(sizing['pip_size'][0]),
+            'risk_amount': float(sizing['risk_amount'][0]),
+            'units': float(sizing['units'][0]),
+            'position_size_lots': float(sizing['position_size_lots'][0]),  # Standard lots
+            'margin_required': float(sizing['margin_required'][0]),
+            'potential_profit': float(sizing['potential_profit'][0])
         }
 
         return jsonify(result)
@@ -236,6 +614,10 @@ if __name__ == '__main__':
     - GET  /api/scan/all            - Scan all pairs
     - GET  /api/scan/multi-timeframe/<pair> - Multi-TF analysis
     - GET  /api/signals             - Get active signals
+    - GET  /api/signals/tracked     - Signal lifecycle history
+    - GET  /api/candles/<pair>      - Chart candles & overlays
+    - GET  /api/history/win-rate    - Historical signal win rate
+    - GET  /api/correlation         - Correlation & currency strength
     - GET  /api/price/<pair>        - Current price
     - POST /api/risk-calculator     - Calculate R/R
 
@@ -0,0 +1,133 @@
+"""
+Concurrency stress test for the shared scanner and backtester
+
+Runs hundreds of scans and backtests from a thread pool against one
+scanner and one backtester (as the Flask app shares them between request
+threads) on synthetic candles, and checks that every result is identical
+to a serial run on fresh instances:
+
+    python benchmarks/concurrency.py --workers 16 --rounds 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.serialization import OfflineClient, make_candles
+from config import Config
+from src.backtester import Backtester
+from src.pattern_registry import default_registry
+from src.scanner import ForexScanner
+from src.serialization import result_digest
+
+
+def make_scanner():
+    """Scanner with an empty analysis cache that runs without credentials"""
+    scanner = ForexScanner()
+    scanner.client = OfflineClient()
+    return scanner
+
+
+def build_tasks(pairs, timeframes, backtest_pairs, count):
+    """
+    List the scan and backtest tasks of one round
+
+    Args:
+        pairs (int): Pairs scanned per timeframe
+        timeframes (int): Timeframes scanned
+        backtest_pairs (int): Pairs backtested with every pattern
+        count (int): Candles per backtested series
+
+    Returns:
+        list: (kind, key, candles) tuples
+    """
+    tasks = []
+
+    # Scans fetch from the offline client, so a D scan and the D confluence
+    # of an H4 scan see the same candles whichever runs first
+    for timeframe in Config.TIMEFRAMES[:timeframes]:
+        for pair in Config.MAJOR_AND_CROSS_PAIRS[:pairs]:
+            tasks.append(('scan', (pair, timeframe), None))
+
+    for p, pair in enumerate(Config.MAJOR_AND_CROSS_PAIRS[:backtest_pairs]):
+        df = make_candles(1000 + p, count)
+        for pattern in default_registry.directional_groups():
+            tasks.append(('backtest', (pair, pattern), df))
+
+    return tasks
+
+
+def run_task(scanner, backtester, task):
+    """
+    Run one task and digest its result
+
+    Args:
+        scanner (ForexScanner): Scanner to use
+        backtester (Backtester): Backtester to use
+        task (tuple): (kind, key, candles)
+
+    Returns:
+        tuple: (kind, key, digest)
+    """
+    kind, key, df = task
+
+    if kind == 'scan':
+        pair, timeframe = key
+        result = scanner.scan_pair(pair, timeframe, df=df)
+    else:
+        _, pattern = key
+        result = backtester.backtest_pattern(df, pattern)
+
+    return kind, key, result_digest(result)
+
+
+def main():
+    """Run the stress test from the command line"""
+    parser = argparse.ArgumentParser(description='Check that concurrent scans and backtests are deterministic')
+    parser.add_argument('--pairs', type=int, default=28, help='Pairs scanned per timeframe (max 28)')
+    parser.add_argument('--timeframes', type=int, default=3, help='Timeframes scanned (max 3)')
+    parser.add_argument('--backtest-pairs', type=int, default=4, help='Pairs backtested with every pattern')
+    parser.add_argument('--count', type=int, default=1000, help='Candles per backtested series')
+    parser.add_argument('--workers', type=int, default=16, help='Threads in the pool')
+    parser.add_argument('--rounds', type=int, default=5, help='Times every task is submitted')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the task order shuffle')
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.pairs, args.timeframes, args.backtest_pairs, args.count)
+
+    started = time.perf_counter()
+    expected = {}
+    for task in tasks:
+        kind, key, digest = run_task(make_scanner(), Backtester(), task)
+        expected[kind, key] = digest
+    serial_time = time.perf_counter() - started
+
+    # One shared scanner and backtester, cold caches, tasks in random order
+    scanner = make_scanner()
+    backtester = Backtester()
+    submitted = tasks * args.rounds
+    random.Random(args.seed).shuffle(submitted)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda task: run_task(scanner, backtester, task), submitted))
+    concurrent_time = time.perf_counter() - started
+
+    mismatches = [(kind, key) for kind, key, digest in results if digest != expected[kind, key]]
+
+    print(f"{len(tasks)} tasks, serial on fresh instances: {serial_time:.2f}s")
+    print(f"{len(submitted)} tasks on {args.workers} threads, shared instances: {concurrent_time:.2f}s")
+    print(f"mismatches: {len(mismatches)}")
+
+    for kind, key in sorted(set(mismatches))[:10]:
+        print(f"  {kind} {' '.join(key)}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Encode-time and payload-size benchmark for /api/scan/all responses
+
+Builds realistic scan results from synthetic candles (no API access needed)
+and compares Flask's default encoder, the standard library fallback and
+orjson, with and without compression and unchanged-result omission:
+
+    python benchmarks/serialization.py --pairs 28 --timeframes 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from config import Config
+from src import serialization
+from src.scanner import ForexScanner
+
+
+class OfflineClient:
+    """Stands in for OandaClient so scans run without credentials"""
+
+    def get_current_price(self, instrument):
+        return None
+
+    def get_candles(self, instrument, granularity='H1', count=500):
+        # Higher-timeframe candles for confluence scoring
+        return make_candles(sum(map(ord, instrument + granularity)), count)
+
+
+def make_candles(seed, count=200):
+    """Random-walk H4 candles"""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.002, count))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.002, count))
+
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(100, 1000, count)
+    }, index=pd.date_range('2024-01-01', periods=count, freq='4h', tz='UTC'))
+
+
+def build_results(pairs, timeframes):
+    """Scan synthetic candles for every pair and timeframe"""
+    scanner = ForexScanner()
+    scanner.client = OfflineClient()
+    results = []
+
+    for t, timeframe in enumerate(Config.TIMEFRAMES[:timeframes]):
+        for p, pair in enumerate(Config.MAJOR_AND_CROSS_PAIRS[:pairs]):
+            results.append(scanner.scan_pair(pair, timeframe, df=make_candles(p * 10 + t)))
+
+    return {'timeframe': 'H4', 'results': results}
+
+
+def stdlib_dumps(obj):
+    """Encode with the standard library fallback even when orjson is installed"""
+    orjson = serialization.orjson
+    serialization.orjson = None
+    try:
+        return serialization.dumps(obj)
+    finally:
+        serialization.orjson = orjson
+
+
+def timed(func, repeat):
+    """Best time of several runs in milliseconds, plus the last output"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, output
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description='Benchmark scan response serialization')
+    parser.add_argument('--pairs', type=int, default=28, help='Pairs per timeframe (max 28)')
+    parser.add_argument('--timeframes', type=int, default=3, help='Timeframes (max 3)')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per encoder (best is reported)')
+    args = parser.parse_args()
+
+    payload = build_results(args.pairs, args.timeframes)
+    flask_default = DefaultJSONProvider(Flask(__name__))
+
+    encoders = [
+        ('flask default', lambda: flask_default.dumps(payload).encode('utf-8')),
+        ('stdlib fallback', lambda: stdlib_dumps(payload))
+    ]
+    if serialization.orjson is not None:
+        encoders.append(('orjson', lambda: serialization.dumps(payload)))
+
+    print(f"{len(payload['results'])} scan results")
+    print(f"{'encoder':<18}{'encode ms':>12}{'bytes':>12}")
+
+    for name, encode in encoders:
+        elapsed, body = timed(encode, args.repeat)
+        print(f"{name:<18}{elapsed:>12.2f}{len(body):>12}")
+
+    body = serialization.dumps(payload)
+    print(f"\n{'compression':<18}{'ms':>12}{'bytes':>12}")
+    for accept in ('gzip', 'br'):
+        elapsed, (compressed, encoding) = timed(lambda: serialization.compress(body, accept), args.repeat)
+        if encoding is not None:
+            print(f"{encoding:<18}{elapsed:>12.2f}{len(compressed):>12}")
+
+    digests = {serialization.result_digest(result) for result in payload['results']}
+    elapsed, stubs = timed(lambda: serialization.omit_unchanged(payload['results'], digests), args.repeat)
+    stub_body = serialization.dumps({**payload, 'results': stubs})
+    print(f"\n{'all unchanged':<18}{elapsed:>12.2f}{len(stub_body):>12}   (digest + stub)")
+
+
+if __name__ == '__main__':
+    main()
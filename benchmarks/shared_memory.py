@@ -0,0 +1,107 @@
+"""
+Worker memory benchmark: pickled DataFrames vs shared-memory candles
+
+Sends every series to a process pool either pickled with each task or as
+a SharedCandleRegistry handle, and reports the bytes sent per task and
+the private memory the workers gained while reading the candles (shared
+pages are mapped into every worker but counted once, by the parent):
+
+    python benchmarks/shared_memory.py --series 8 --candles 500000 --workers 4
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.serialization import make_candles
+from src.shared_candles import SharedCandleRegistry, init_worker, shared_candles
+
+_baseline = None
+
+
+def private_bytes():
+    """Memory private to this process (Linux), excluding shared mappings"""
+    total = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                total += int(line.split()[1]) * 1024
+    return total
+
+
+def start_worker(handles=None):
+    """Record the worker's memory before any task runs"""
+    global _baseline
+    if handles is not None:
+        init_worker(handles)
+    _baseline = private_bytes()
+
+
+def read_series(df=None, key=None):
+    """Touch every candle and report the worker's memory growth"""
+    if df is None:
+        df = shared_candles(*key)
+    # Column arrays as AnalysisContext reads them
+    for column in ('open', 'high', 'low', 'close'):
+        df[column].to_numpy(dtype=float).sum()
+    return os.getpid(), private_bytes() - _baseline
+
+
+def run(mode, frames, workers, registry=None):
+    """
+    Run one task per series and summarize worker memory
+
+    Returns:
+        tuple: (seconds, bytes sent per task, total worker memory growth)
+    """
+    if mode == 'pickle':
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=start_worker)
+        tasks = [((df,), {}) for df in frames.values()]
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=start_worker, initargs=(registry.handles(),))
+        tasks = [((), {'key': key}) for key in frames]
+
+    sent = sum(len(pickle.dumps(args + tuple(kwargs.values()))) for args, kwargs in tasks) / len(tasks)
+
+    started = time.perf_counter()
+    growth = {}
+    with pool:
+        futures = [pool.submit(read_series, *args, **kwargs) for args, kwargs in tasks]
+        for future in futures:
+            pid, grown = future.result()
+            growth[pid] = max(growth.get(pid, 0), grown)
+    elapsed = time.perf_counter() - started
+
+    return elapsed, sent, sum(growth.values())
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description='Compare pickled and shared-memory candles in worker processes')
+    parser.add_argument('--series', type=int, default=8, help='Candle series')
+    parser.add_argument('--candles', type=int, default=500000, help='Candles per series')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes')
+    args = parser.parse_args()
+
+    frames = {(f"PAIR{k}", 'M1'): make_candles(k, args.candles) for k in range(args.series)}
+
+    print(f"{args.series} series x {args.candles} candles, {args.workers} workers")
+    print(f"{'mode':<10}{'seconds':>10}{'sent/task':>14}{'worker MB':>12}")
+
+    elapsed, sent, grown = run('pickle', frames, args.workers)
+    print(f"{'pickle':<10}{elapsed:>10.2f}{sent:>14.0f}{grown / 2 ** 20:>12.1f}")
+
+    with SharedCandleRegistry() as registry:
+        for (instrument, granularity), df in frames.items():
+            registry.publish(instrument, granularity, df)
+        elapsed, sent, grown = run('shared', frames, args.workers, registry)
+        print(f"{'shared':<10}{elapsed:>10.2f}{sent:>14.0f}{grown / 2 ** 20:>12.1f}")
+        print(f"\nshared memory held by the parent: {registry.nbytes() / 2 ** 20:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Startup-time benchmark for the app and CLI entry points
+
+Runs each entry point's import in a fresh interpreter under
+`python -X importtime` and reports the cumulative import time and the
+heaviest modules. Results can be saved and compared against a baseline:
+
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --baseline startup.json --max-regression 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ['app', 'src.backfill', 'src.replay', 'src.scan_daemon']
+
+
+def measure_import(module, python=sys.executable):
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Args:
+        module (str): Module to import
+        python (str): Python executable
+
+    Returns:
+        dict: Wall time, total import time and per-module cumulative times (ms)
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    wall = (time.perf_counter() - started) * 1000
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = {
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            # Nested imports are indented by two spaces per level
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2
+        }
+
+    return {
+        'wall_ms': round(wall, 1),
+        'import_ms': round(modules.get(module, {}).get('cumulative_ms', 0.0), 1),
+        'modules': modules
+    }
+
+
+def heaviest(modules, limit):
+    """
+    Get the imports made directly by the entry points with the largest cumulative time
+
+    Args:
+        modules (dict): Module -> timings from measure_import
+        limit (int): Number of modules to return
+
+    Returns:
+        list: (module, cumulative ms) pairs
+    """
+    top = [(name, t['cumulative_ms']) for name, t in modules.items() if t['depth'] == 1]
+    return sorted(top, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def run(entry_points, repeat, top):
+    """
+    Benchmark each entry point, keeping the median of several runs
+
+    Args:
+        entry_points (list): Modules to import
+        repeat (int): Runs per entry point
+        top (int): Heaviest modules to report
+
+    Returns:
+        dict: Entry point -> summary
+    """
+    results = {}
+
+    for module in entry_points:
+        runs = [measure_import(module) for _ in range(repeat)]
+        median_run = sorted(runs, key=lambda r: r['import_ms'])[len(runs) // 2]
+
+        results[module] = {
+            'wall_ms': round(statistics.median(r['wall_ms'] for r in runs), 1),
+            'import_ms': round(statistics.median(r['import_ms'] for r in runs), 1),
+            'heaviest': heaviest(median_run['modules'], top)
+        }
+
+    return results
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description='Measure import time of the app and CLI entry points')
+    parser.add_argument('--modules', default=','.join(ENTRY_POINTS), help='Comma-separated modules')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per module (median is reported)')
+    parser.add_argument('--top', type=int, default=8, help='Heaviest imports to list')
+    parser.add_argument('--output', default=None, help='Save results as JSON')
+    parser.add_argument('--baseline', default=None, help='Compare against saved results')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='Fail if import time grows by more than this percent over the baseline')
+    args = parser.parse_args()
+
+    results = run(args.modules.split(','), args.repeat, args.top)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    failed = False
+    for module, result in results.items():
+        line = f"{module:<16} import {result['import_ms']:8.1f} ms   process {result['wall_ms']:8.1f} ms"
+
+        if baseline and module in baseline:
+            before = baseline[module]['import_ms']
+            change = (result['import_ms'] - before) / before * 100 if before else 0.0
+            line += f"   ({change:+.1f}% vs baseline)"
+            if args.max_regression is not None and change > args.max_regression:
+                failed = True
+
+        print(line)
+        for name, cumulative in result['heaviest']:
+            print(f"    {name:<36} {cumulative:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if failed:
+        print(f"Import time regressed by more than {args.max_regression}%")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,16 @@ class Config:
         'live': 'https://api-fxtrade.oanda.com'
     }
 
+    # Offline record/replay ('replay' environment points at src/replay.py's server)
+    OANDA_REPLAY_URL = os.getenv('OANDA_REPLAY_URL', 'http://127.0.0.1:8765')
+    OANDA_RECORD_DIR = os.getenv('OANDA_RECORD_DIR', 'data/recordings')
+    OANDA_RECORD = os.getenv('OANDA_RECORD', 'False') == 'True'
+
+    # OANDA request scheduling
+    OANDA_MAX_REQUESTS_PER_SECOND = float(os.getenv('OANDA_MAX_REQUESTS_PER_SECOND', 20))
+    OANDA_REQUEST_BURST = int(os.getenv('OANDA_REQUEST_BURST', 10))
+    OANDA_MAX_RETRIES = int(os.getenv('OANDA_MAX_RETRIES', 3))
+
     # Flask Settings
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'True') == 'True'
@@ -32,14 +42,45 @@ class Config:
         'AUD_USD', 'USD_CAD', 'NZD_USD'
     ]
 
+    # The 7 majors plus the 21 crosses between EUR, GBP, AUD, NZD, CAD, CHF and JPY
+    MAJOR_AND_CROSS_PAIRS = DEFAULT_PAIRS + [
+        'EUR_GBP', 'EUR_JPY', 'EUR_CHF', 'EUR_AUD', 'EUR_CAD', 'EUR_NZD',
+        'GBP_JPY', 'GBP_CHF', 'GBP_AUD', 'GBP_CAD', 'GBP_NZD',
+        'AUD_JPY', 'AUD_CHF', 'AUD_CAD', 'AUD_NZD',
+        'NZD_JPY', 'NZD_CHF', 'NZD_CAD',
+        'CAD_JPY', 'CAD_CHF', 'CHF_JPY'
+    ]
+
     # Timeframes for multi-timeframe analysis
     TIMEFRAMES = ['H1', 'H4', 'D']
 
     # Pattern detection settings
     MIN_CANDLES_FOR_PATTERN = 50  # Minimum candles to analyze
     SUPPORT_RESISTANCE_LOOKBACK = 100  # Candles to look back for S/R
-    SUPPORT_RESISTANCE_TOLERANCE = 0.0005  # 5 pips tolerance
+    SUPPORT_RESISTANCE_TOLERANCE = 0.0005  # 5 pips tolerance, used when the ATR multiplier is 0
+    SUPPORT_RESISTANCE_ATR_MULTIPLIER = 0.2  # Level tolerance as a fraction of ATR (0.2 ATR ~ 5 pips on EUR_USD H4)
+    ATR_PERIOD = 14
+
+    # Local data storage
+    CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR', 'data/candles')
+    SIGNAL_DB_PATH = os.getenv('SIGNAL_DB_PATH', '')  # Empty keeps signals in memory only
+    SIGNAL_RETENTION_DAYS = int(os.getenv('SIGNAL_RETENTION_DAYS', 30))  # Closed signals kept in memory
+    HISTORY_DIR = os.getenv('HISTORY_DIR', '')  # Parquet scan/signal history (needs pyarrow); empty disables it
+    ARTIFACT_CACHE_DIR = os.getenv('ARTIFACT_CACHE_DIR', 'data/cache')  # Pattern, S/R and trade artifacts
+    ARTIFACT_CACHE_MAX_MB = int(os.getenv('ARTIFACT_CACHE_MAX_MB', 512))
+    INSTRUMENTS_PATH = os.getenv('INSTRUMENTS_PATH', 'data/instruments.json')  # Cached OANDA instrument metadata
+
+    # Backtesting
+    INTRABAR_GRANULARITY = 'M5'  # Lower timeframe used to resolve ambiguous bars
 
     # Risk Management
+    ACCOUNT_CURRENCY = os.getenv('ACCOUNT_CURRENCY', 'USD')
     DEFAULT_RISK_PERCENT = 1.0  # 1% risk per trade
     MIN_RISK_REWARD = 1.5  # Minimum 1:1.5 R/R ratio
+
+    # Higher-timeframe confluence (levels and trend of these timeframes score lower-timeframe signals)
+    CONFLUENCE_TIMEFRAMES = ['D', 'W']
+    CONFLUENCE_MIN_SCORE = None  # e.g. 1 drops signals without higher-timeframe support; None keeps all
+
+    # Cross-pair correlation (one rolling tracker is kept per timeframe and window)
+    CORRELATION_WINDOWS = [50, 100, 200]
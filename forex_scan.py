@@ -0,0 +1,11 @@
+"""
+forex-scan: headless scanner daemon
+
+Usage:
+    python forex_scan.py --timeframes H1,H4 --sink jsonl:data/scans.jsonl --sink sqlite:data/scans.db
+"""
+from src.scan_daemon import main
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,377 @@
+"""
+Shared analysis context for a candle series
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src.pattern_detector import PatternDetector
+from src.pattern_registry import CandleFeatures, default_registry
+from src.support_resistance import SupportResistance, detect_levels
+from src.artifact_cache import fingerprint
+from src.instruments import DEFAULT_PIP_SIZE, default_instruments
+from src.volatility import RollingATR, atr, atr_tolerance
+from src.candle_store import granularity_to_timedelta
+from config import Config
+
+
+# Historical S/R detectors kept per context (most recently used)
+HISTORICAL_SR_CACHE_SIZE = 256
+
+
+class AnalysisContext:
+    """Candle arrays, patterns and S/R levels for one series, each computed at most once"""
+
+    def __init__(self, df, pair=None, timeframe=None, cache=None, atr=None):
+        """
+        Initialize analysis context
+
+        Args:
+            df (pd.DataFrame): OHLC data (closed candles only)
+            pair (str): Optional forex pair
+            timeframe (str): Optional timeframe
+            cache (ArtifactCache): Optional on-disk cache for pattern masks
+                and historical S/R levels, reused across runs
+            atr (np.ndarray): Optional ATR aligned with df, carried over from
+                earlier candles (computed over df otherwise)
+        """
+        self.df = df
+        self.pair = pair
+        self.timeframe = timeframe
+        self.cache = cache
+        self.bar_time = df.index[-1] if not df.empty else None
+
+        self._lock = threading.RLock()
+        self._arrays = None
+        self._pattern_detector = None
+        self._sr_detector = None
+        self._levels = None
+        self._historical_sr = OrderedDict()
+        self._fingerprint = None
+        self._atr = atr
+
+    def is_current(self, now=None):
+        """
+        Check if no newer candle can have closed since this context was built
+
+        Args:
+            now (datetime): Optional current time (defaults to UTC now)
+
+        Returns:
+            bool: True if the last closed candle is still the latest one
+        """
+        if self.bar_time is None or self.timeframe is None:
+            return False
+
+        now = pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz='UTC')
+        duration = granularity_to_timedelta(self.timeframe)
+
+        return now < self.bar_time + 2 * duration
+
+    @property
+    def pip_size(self):
+        """float: Pip size of the pair (the default pip when the pair is unknown)"""
+        return default_instruments().pip_size(self.pair) if self.pair else DEFAULT_PIP_SIZE
+
+    @property
+    def arrays(self):
+        """dict: OHLC columns as NumPy arrays"""
+        with self._lock:
+            if self._arrays is None:
+                self._arrays = {
+                    column: self.df[column].to_numpy(dtype=float)
+                    for column in ('open', 'high', 'low', 'close')
+                }
+            return self._arrays
+
+    @property
+    def fingerprint(self):
+        """str: Content hash of the OHLC data, used as the base of cache keys"""
+        with self._lock:
+            if self._fingerprint is None:
+                self._fingerprint = fingerprint(self.df[['open', 'high', 'low', 'close']])
+            return self._fingerprint
+
+    def _cached_masks(self, registry):
+        """
+        Get pattern masks from the cache, evaluating only the missing ones
+
+        Each pattern is keyed by the data, its condition and its parameters,
+        so changing one pattern's threshold only re-evaluates that pattern.
+
+        Args:
+            registry (PatternRegistry): Patterns to detect
+
+        Returns:
+            dict: Pattern name -> boolean array
+        """
+        keys = {
+            name: fingerprint(self.fingerprint, name, spec.condition, spec.params)
+            for name, spec in registry.patterns.items()
+        }
+        masks = {name: self.cache.get('patterns', key) for name, key in keys.items()}
+        missing = [name for name, mask in masks.items() if mask is None]
+
+        if missing:
+            arrays = self.arrays
+            features = CandleFeatures(arrays['open'], arrays['high'], arrays['low'], arrays['close'])
+            for name, mask in registry.compile(missing).evaluate(features).items():
+                self.cache.put('patterns', keys[name], mask)
+                masks[name] = mask
+
+        return masks
+
+    @property
+    def pattern_detector(self):
+        """PatternDetector: Detector with all patterns already detected"""
+        with self._lock:
+            if self._pattern_detector is None:
+                masks = self._cached_masks(default_registry) if self.cache is not None else None
+                self._pattern_detector = PatternDetector(self.df, masks=masks)
+                self._pattern_detector.detect_all_patterns()
+            return self._pattern_detector
+
+    def use_batch_results(self, features, masks):
+        """
+        Seed the pattern detector with features and masks computed in a batch
+
+        Has no effect once patterns have been detected for this context.
+
+        Args:
+            features (CandleFeatures): Precomputed candle features for this series
+            masks (dict): Precomputed pattern masks for this series
+        """
+        with self._lock:
+            if self._pattern_detector is None:
+                self._pattern_detector = PatternDetector(self.df, features=features, masks=masks)
+                self._pattern_detector.detect_all_patterns()
+
+    @property
+    def pattern_masks(self):
+        """dict: Pattern name -> boolean array"""
+        return self.pattern_detector.masks
+
+    @property
+    def candle_properties(self):
+        """pd.DataFrame: Candle body, range and wicks"""
+        return self.pattern_detector.df[['body', 'range', 'upper_wick', 'lower_wick', 'body_position']]
+
+    @property
+    def patterns(self):
+        """pd.DataFrame: OHLC data with pattern columns"""
+        return self.pattern_detector.df
+
+    @property
+    def atr(self):
+        """np.ndarray: Average True Range of each candle"""
+        with self._lock:
+            if self._atr is None:
+                arrays = self.arrays
+                self._atr = atr(arrays['high'], arrays['low'], arrays['close'])
+            return self._atr
+
+    def continued_atr(self, df):
+        """
+        Get the ATR of newer candles by continuing this context's ATR
+
+        Candles shared with this context keep their ATR and each new candle
+        costs one O(1) update, instead of recomputing the whole series.
+
+        Args:
+            df (pd.DataFrame): Newer OHLC data overlapping this context's candles
+
+        Returns:
+            np.ndarray: ATR aligned with df, or None if df does not continue this series
+        """
+        if self.df.empty or df.empty:
+            return None
+
+        start = self.df.index.searchsorted(df.index[0])
+        overlap = len(self.df) - start
+        if (start >= len(self.df) or overlap > len(df) or
+                not self.df.index[start:].equals(df.index[:overlap])):
+            return None
+
+        engine = RollingATR()
+        engine.value = float(self.atr[-1])
+        engine.prev_close = float(self.arrays['close'][-1])
+
+        new = df.iloc[overlap:]
+        return np.r_[self.atr[start:], engine.extend(new['high'], new['low'], new['close'])]
+
+    def tolerance_at(self, i):
+        """
+        Get the S/R tolerance at a candle
+
+        The tolerance follows the ATR (Config.SUPPORT_RESISTANCE_ATR_MULTIPLIER),
+        so levels are wider on slow timeframes and volatile pairs; with a
+        multiplier of 0 the fixed Config.SUPPORT_RESISTANCE_TOLERANCE is used.
+
+        Args:
+            i (int): Candle index
+
+        Returns:
+            float: Tolerance as a fraction of price
+        """
+        if not Config.SUPPORT_RESISTANCE_ATR_MULTIPLIER:
+            return Config.SUPPORT_RESISTANCE_TOLERANCE
+
+        return float(atr_tolerance(self.atr[i], self.arrays['close'][i]))
+
+    @property
+    def sr_detector(self):
+        """SupportResistance: Detector with levels already detected"""
+        with self._lock:
+            if self._sr_detector is None:
+                self._sr_detector = SupportResistance(
+                    self.df,
+                    lookback=Config.SUPPORT_RESISTANCE_LOOKBACK,
+                    tolerance=self.tolerance_at(-1),
+                    pip_size=self.pip_size
+                )
+                self._levels = self._sr_detector.detect_support_resistance()
+            return self._sr_detector
+
+    @property
+    def levels(self):
+        """dict: Support and resistance levels"""
+        with self._lock:
+            self.sr_detector
+            return self._levels
+
+    def sr_detector_at(self, i, lookback=None):
+        """
+        Get S/R levels as they were at a past candle
+
+        Levels are detected from slices of the cached NumPy arrays; only the
+        most recent HISTORICAL_SR_CACHE_SIZE detectors are kept.
+
+        Args:
+            i (int): Candle index (levels use candles up to and including i)
+            lookback (int): Candles to look back
+
+        Returns:
+            SupportResistance: Detector with levels already detected
+        """
+        lookback = lookback or Config.SUPPORT_RESISTANCE_LOOKBACK
+
+        if i < 0:
+            i += len(self.df)
+        key = (i, lookback)
+
+        with self._lock:
+            sr_detector = self._historical_sr.get(key)
+            if sr_detector is not None:
+                self._historical_sr.move_to_end(key)
+                return sr_detector
+
+            arrays = self.arrays
+            tolerance = self.tolerance_at(i)
+            pip_size = self.pip_size
+
+        start = max(0, i + 1 - lookback)
+        highs = arrays['high'][start:i + 1]
+        lows = arrays['low'][start:i + 1]
+
+        if self.cache is None:
+            levels = detect_levels(highs, lows, tolerance)
+        else:
+            # Keyed by the window itself, so levels survive appended candles
+            cache_key = fingerprint(highs, lows, lookback, tolerance)
+            levels = self.cache.get_or_compute('levels', cache_key, lambda: detect_levels(highs, lows, tolerance))
+
+        sr_detector = SupportResistance.from_levels(levels, lookback=lookback, tolerance=tolerance, pip_size=pip_size)
+
+        with self._lock:
+            self._historical_sr[key] = sr_detector
+            if len(self._historical_sr) > HISTORICAL_SR_CACHE_SIZE:
+                self._historical_sr.popitem(last=False)
+
+        return sr_detector
+
+
+class AnalysisCache:
+    """Analysis contexts per (pair, timeframe), reused until a new candle closes"""
+
+    def __init__(self):
+        """Initialize analysis cache"""
+        self._contexts = {}
+        self._lock = threading.Lock()
+
+    def get(self, pair, timeframe, df):
+        """
+        Get the context for freshly fetched candles
+
+        The cached context is reused if its last candle matches the data.
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+            df (pd.DataFrame): OHLC data
+
+        Returns:
+            AnalysisContext: Context for the data
+        """
+        key = (pair, timeframe)
+
+        with self._lock:
+            context = self._contexts.get(key)
+
+            if (context is None or context.bar_time != df.index[-1] or
+                    len(context.df) != len(df) or context.df.index[0] != df.index[0]):
+                # Continue the previous candles' ATR rather than recomputing it
+                atr = context.continued_atr(df) if context is not None else None
+                context = AnalysisContext(df, pair=pair, timeframe=timeframe, atr=atr)
+                self._contexts[key] = context
+
+            return context
+
+    def frames(self, timeframe):
+        """
+        Get the cached candles of every pair for a timeframe
+
+        Args:
+            timeframe (str): Timeframe
+
+        Returns:
+            dict: Pair -> OHLC DataFrame
+        """
+        with self._lock:
+            return {
+                pair: context.df
+                for (pair, context_timeframe), context in self._contexts.items()
+                if context_timeframe == timeframe
+            }
+
+    def latest(self, pair, timeframe):
+        """
+        Get the cached context even if newer candles may have closed
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+
+        Returns:
+            AnalysisContext: Cached context, or None
+        """
+        with self._lock:
+            return self._contexts.get((pair, timeframe))
+
+    def peek(self, pair, timeframe):
+        """
+        Get the cached context if it is still current
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+
+        Returns:
+            AnalysisContext: Cached context, or None
+        """
+        with self._lock:
+            context = self._contexts.get((pair, timeframe))
+
+        if context is not None and context.is_current():
+            return context
+
+        return None
@@ -0,0 +1,244 @@
+"""
+Content-addressed on-disk cache for analysis and backtest artifacts
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import types
+import uuid
+import numpy as np
+import pandas as pd
+from config import Config
+
+
+def _update(hasher, value):
+    """
+    Feed a value into a hash, recursing into containers
+
+    Args:
+        hasher: hashlib hash object
+        value: DataFrame, array, mapping, sequence, set, function, code object or JSON scalar
+    """
+    if isinstance(value, pd.DataFrame):
+        hasher.update(b'frame')
+        _update(hasher, value.index.as_unit('ns').asi8 if isinstance(value.index, pd.DatetimeIndex) else value.index.to_numpy())
+        for column in value.columns:
+            _update(hasher, str(column))
+            _update(hasher, value[column].to_numpy())
+    elif isinstance(value, np.ndarray):
+        hasher.update(f"array:{value.dtype.str}:{value.shape}".encode())
+        hasher.update(np.ascontiguousarray(value).data if value.dtype != object else pickle.dumps(value))
+    elif isinstance(value, dict):
+        hasher.update(b'dict')
+        for key in sorted(value, key=str):
+            _update(hasher, str(key))
+            _update(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"list:{len(value)}".encode())
+        for item in value:
+            _update(hasher, item)
+    elif isinstance(value, (set, frozenset)):
+        # Sorted by their hashes' bytes, since set order changes with the hash seed
+        items = []
+        for item in value:
+            item_hasher = hashlib.blake2b(digest_size=16)
+            _update(item_hasher, item)
+            items.append(item_hasher.digest())
+        hasher.update(f"set:{len(items)}".encode())
+        for digest in sorted(items):
+            hasher.update(digest)
+    elif isinstance(value, types.CodeType):
+        # Bytecode, the names it looks up and its constants, with nested
+        # functions (lambdas, comprehensions) hashed the same way
+        hasher.update(f"code:{value.co_name}".encode())
+        hasher.update(value.co_code)
+        _update(hasher, list(value.co_names))
+        _update(hasher, list(value.co_consts))
+    elif callable(value) and hasattr(value, '__code__'):
+        # Functions are identified by their code and everything bound to it,
+        # so editing a condition, a default or a captured value invalidates it
+        hasher.update(f"function:{value.__qualname__}".encode())
+        _update(hasher, value.__code__)
+        _update(hasher, list(value.__defaults__ or ()))
+        _update(hasher, value.__kwdefaults__ or {})
+        for cell in value.__closure__ or ():
+            try:
+                _update(hasher, cell.cell_contents)
+            except ValueError:  # Cell not bound yet
+                hasher.update(b'empty-cell')
+    elif isinstance(value, bytes):
+        hasher.update(b'bytes:' + value)
+    else:
+        hasher.update(json.dumps(value, default=str).encode())
+
+
+def fingerprint(*parts):
+    """
+    Hash candle data and parameters into a cache key
+
+    Args:
+        *parts: DataFrames, arrays, dicts, lists, functions or JSON scalars
+
+    Returns:
+        str: Hex digest
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        _update(hasher, part)
+    return hasher.hexdigest()
+
+
+class ArtifactCache:
+    """Pickled artifacts on disk, keyed by content fingerprint and evicted least recently used first"""
+
+    def __init__(self, root=None, max_bytes=None):
+        """
+        Initialize artifact cache
+
+        Args:
+            root (str): Cache directory (defaults to Config.ARTIFACT_CACHE_DIR)
+            max_bytes (int): Total size above which the least recently used
+                artifacts are deleted (defaults to Config.ARTIFACT_CACHE_MAX_MB)
+        """
+        self.root = root or Config.ARTIFACT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.ARTIFACT_CACHE_MAX_MB * 1024 * 1024
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+        self._lock = threading.Lock()
+        self._size = None
+
+    def path(self, stage, key):
+        """Get the file path of an artifact"""
+        return os.path.join(self.root, stage, key[:2], f"{key}.pkl")
+
+    def _entries(self):
+        """
+        List stored artifacts
+
+        Returns:
+            list: (last use time, size, path) tuples
+        """
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self):
+        """int: Total bytes of stored artifacts"""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            return self._size
+
+    def get(self, stage, key):
+        """
+        Read an artifact
+
+        Args:
+            stage (str): Pipeline stage (e.g., 'patterns', 'levels', 'trades')
+            key (str): Fingerprint of the stage inputs
+
+        Returns:
+            The stored value, or None on a miss
+        """
+        path = self.path(stage, key)
+
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self.stats['hits'] += 1
+        return value
+
+    def put(self, stage, key, value):
+        """
+        Store an artifact, evicting old ones if the cache grows too large
+
+        Args:
+            stage (str): Pipeline stage
+            key (str): Fingerprint of the stage inputs
+            value: Picklable value
+        """
+        path = self.path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        total = self.size()
+        with self._lock:
+            self._size = total + len(data) - previous
+            self.stats['writes'] += 1
+
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_or_compute(self, stage, key, compute):
+        """
+        Read an artifact, computing and storing it on a miss
+
+        Args:
+            stage (str): Pipeline stage
+            key (str): Fingerprint of the stage inputs
+            compute (callable): Builds the value when it is not cached
+
+        Returns:
+            Cached or freshly computed value
+        """
+        value = self.get(stage, key)
+        if value is None:
+            value = compute()
+            self.put(stage, key, value)
+        return value
+
+    def evict(self, target_bytes=None):
+        """
+        Delete least recently used artifacts until the cache fits
+
+        Args:
+            target_bytes (int): Size to shrink to (defaults to 90% of max_bytes,
+                so a full cache is not trimmed on every write)
+        """
+        target = target_bytes if target_bytes is not None else int(self.max_bytes * 0.9)
+
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.stats['evictions'] += 1
+
+            self._size = total
+
+    def clear(self):
+        """Delete every artifact"""
+        self.evict(target_bytes=0)
@@ -0,0 +1,259 @@
+"""
+Paginated historical backfill into the local candle store
+"""
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from src.oanda_client import OandaClient
+from src.candle_store import CandleStore, granularity_to_timedelta
+from src.request_scheduler import PRIORITY_BACKFILL
+from config import Config
+
+
+MAX_CANDLES_PER_REQUEST = 5000
+
+
+class Backfiller:
+    """Page through OANDA history and store it locally, resuming from checkpoints"""
+
+    def __init__(self, client=None, store=None, checkpoint_path=None, max_workers=4):
+        """
+        Initialize backfiller
+
+        Args:
+            client (OandaClient): API client
+            store (CandleStore): Destination candle store
+            checkpoint_path (str): JSON file recording progress per instrument/granularity
+            max_workers (int): Instrument/granularity pairs fetched concurrently
+        """
+        self.client = client or OandaClient()
+        self.store = store or CandleStore()
+        self.checkpoint_path = checkpoint_path or os.path.join(self.store.root, 'backfill_checkpoints.json')
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self.checkpoints = self._load_checkpoints()
+
+    def _load_checkpoints(self):
+        """Load saved checkpoints"""
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def _covered(self, key, instrument, granularity):
+        """
+        Get the range a checkpoint records as stored
+
+        Args:
+            key (str): 'INSTRUMENT:GRANULARITY'
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+
+        Returns:
+            tuple: (start, cursor) of the stored range, or None without a checkpoint
+        """
+        value = self.checkpoints.get(key)
+        if value is None:
+            return None
+
+        if isinstance(value, dict):
+            return pd.Timestamp(value['start']), pd.Timestamp(value['cursor'])
+
+        # Older checkpoints only kept the cursor, which could be past the last
+        # stored candle; the stored candles tell where the range really ends
+        cursor = pd.Timestamp(value)
+        first = next(self.store.iter_chunks(instrument, granularity, chunk_size=1), None)
+        last = self.store.last_time(instrument, granularity)
+        if first is None or last is None:
+            return None
+
+        duration = pd.Timedelta(granularity_to_timedelta(granularity))
+        return first.index[0], min(cursor, last + duration)
+
+    def _save_checkpoint(self, key, start, cursor):
+        """
+        Record that the candles in [start, cursor) are stored
+
+        The file is replaced atomically so an interrupted run never leaves it corrupt.
+
+        Args:
+            key (str): 'INSTRUMENT:GRANULARITY'
+            start (pd.Timestamp): Start of the stored range
+            cursor (pd.Timestamp): Start of the next window to fetch
+        """
+        with self._lock:
+            self.checkpoints[key] = {'start': start.isoformat(), 'cursor': cursor.isoformat()}
+
+            os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.checkpoints, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def _fetch_range(self, instrument, granularity, cursor, end, on_page=None):
+        """
+        Fetch and store the candles in [cursor, end), page by page
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            cursor (pd.Timestamp): First candle time
+            end (pd.Timestamp): End of the range (exclusive)
+            on_page (callable): Called after each page with the time up to
+                which candles are stored
+
+        Returns:
+            tuple: (candles fetched, pages)
+        """
+        duration = pd.Timedelta(granularity_to_timedelta(granularity))
+        window = duration * MAX_CANDLES_PER_REQUEST
+        fetched = 0
+        pages = 0
+
+        while cursor < end:
+            window_end = min(end, cursor + window)
+
+            df = self.client.get_candles_range(
+                instrument,
+                granularity,
+                cursor,
+                window_end,
+                priority=PRIORITY_BACKFILL
+            )
+
+            # 'to' is exclusive for our windows: the next window starts there
+            df = df[df.index < window_end]
+            fetched += self.store.append(instrument, granularity, df)
+            pages += 1
+
+            cursor = window_end
+            if on_page is not None:
+                # Only complete candles are returned, so the range stored ends
+                # after the last one received, not at the window's end
+                on_page(min(window_end, df.index[-1] + duration) if not df.empty else window_end)
+
+        return fetched, pages
+
+    def backfill_instrument(self, instrument, granularity, start, end=None):
+        """
+        Backfill one instrument/granularity, resuming from its checkpoint
+
+        A start before the checkpointed range backfills the missing leading
+        range first; a start after it begins a new range.
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            start (datetime): First candle time wanted
+            end (datetime): Last candle time wanted (defaults to now)
+
+        Returns:
+            dict: Summary with candles fetched and the validation report
+        """
+        key = f"{instrument}:{granularity}"
+        start = pd.Timestamp(start, tz='UTC') if pd.Timestamp(start).tzinfo is None else pd.Timestamp(start)
+        end = pd.Timestamp.now(tz='UTC') if end is None else pd.Timestamp(end)
+        if end.tzinfo is None:
+            end = end.tz_localize('UTC')
+
+        # Stop before the first candle that may still be forming
+        duration = pd.Timedelta(granularity_to_timedelta(granularity))
+        end = min(end, pd.Timestamp.now(tz='UTC') - duration)
+
+        covered = self._covered(key, instrument, granularity)
+        fetched = 0
+        pages = 0
+
+        if covered is None or start > covered[1]:
+            range_start, cursor = start, start
+        else:
+            range_start, cursor = covered
+
+            if start < range_start:
+                leading_fetched, leading_pages = self._fetch_range(
+                    instrument, granularity, start, min(range_start, end)
+                )
+                fetched += leading_fetched
+                pages += leading_pages
+
+                # The ranges only join when the leading range reached the stored one
+                if end >= range_start:
+                    range_start = start
+                    self._save_checkpoint(key, range_start, cursor)
+
+        more_fetched, more_pages = self._fetch_range(
+            instrument, granularity, cursor, end,
+            on_page=lambda stored_until: self._save_checkpoint(key, range_start, stored_until)
+        )
+
+        return {
+            'instrument': instrument,
+            'granularity': granularity,
+            'pages': pages + more_pages,
+            'candles_fetched': fetched + more_fetched,
+            'validation': self.store.validate(instrument, granularity)
+        }
+
+    def backfill(self, instruments, granularities, start, end=None):
+        """
+        Backfill many instruments and granularities concurrently
+
+        Args:
+            instruments (list): Forex pairs
+            granularities (list): Timeframes
+            start (datetime): First candle time wanted
+            end (datetime): Last candle time wanted (defaults to now)
+
+        Returns:
+            list: Summary per instrument/granularity
+        """
+        jobs = [(instrument, granularity) for instrument in instruments for granularity in granularities]
+        results = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.backfill_instrument, instrument, granularity, start, end): (instrument, granularity)
+                for instrument, granularity in jobs
+            }
+
+            for future in as_completed(futures):
+                instrument, granularity = futures[future]
+                try:
+                    result = future.result()
+                    print(f"Backfilled {instrument} {granularity}: {result['candles_fetched']} candles "
+                          f"in {result['pages']} pages, {len(result['validation']['gaps'])} gaps")
+                except Exception as e:
+                    result = {'instrument': instrument, 'granularity': granularity, 'error': str(e)}
+                    print(f"Error backfilling {instrument} {granularity}: {str(e)} (resume by rerunning)")
+                results.append(result)
+
+        return results
+
+
+def main():
+    """Run the backfill from the command line"""
+    parser = argparse.ArgumentParser(description='Backfill OANDA candle history into the local candle store')
+    parser.add_argument('--pairs', default=','.join(Config.DEFAULT_PAIRS), help='Comma-separated instruments')
+    parser.add_argument('--granularities', default='H4', help='Comma-separated granularities (e.g., M15,H1,H4)')
+    parser.add_argument('--start', required=True, help='Start date (e.g., 2015-01-01)')
+    parser.add_argument('--end', default=None, help='End date (defaults to now)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent instrument/granularity jobs')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file path')
+    args = parser.parse_args()
+
+    backfiller = Backfiller(checkpoint_path=args.checkpoint, max_workers=args.workers)
+    backfiller.backfill(
+        args.pairs.split(','),
+        args.granularities.split(','),
+        args.start,
+        args.end
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -4,120 +4,352 @@ Backtesting system for pattern-based trading strategies
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from src.pattern_detector import PatternDetector
-from src.support_resistance import SupportResistance
+from src.analysis_context import AnalysisContext
+from src.pattern_registry import default_registry
 from src.oanda_client import OandaClient
+from src.candle_store import CandleStore, granularity_to_timedelta
+from src.artifact_cache import fingerprint
+from src.instruments import DEFAULT_PIP_SIZE
+from src.signal_pipeline import SignalPipeline, StageCounters
+from config import Config
+
+
+class IntrabarResolver:
+    """Resolve bars that touch both stop and target using lower-timeframe candles"""
+
+    def __init__(self, instrument, granularity, intrabar_granularity=None,
+                 store=None, start=None, end=None, chunk_size=50000):
+        """
+        Initialize intrabar resolver
+
+        Lower-timeframe candles are only read from the candle store the first
+        time an ambiguous bar needs resolving. After set_span, only the
+        candles of the current span are held, read forward in blocks.
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe of the backtested bars
+            intrabar_granularity (str): Lower timeframe used to drill down
+            store (CandleStore): Candle store holding the lower-timeframe data
+            start (datetime): Optional first time to load
+            end (datetime): Optional last time to load (exclusive)
+            chunk_size (int): Candles read per block after set_span
+        """
+        self.instrument = instrument
+        self.granularity = granularity
+        self.intrabar_granularity = intrabar_granularity or Config.INTRABAR_GRANULARITY
+        self.store = store or CandleStore()
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.bar_duration = pd.Timedelta(granularity_to_timedelta(granularity))
+
+        self._times = None
+        self._highs = None
+        self._lows = None
+        self._slices = {}
+
+        self._span = None
+        self._chunks = None
+        self._pending = None
+
+        self.resolved = 0
+        self.unresolved = 0
+
+    def set_span(self, start, end):
+        """
+        Limit the candles held to a time span, dropping the previous span
+
+        Spans must move forward in time: the store is read once, in order.
+
+        Args:
+            start (pd.Timestamp): First bar time that may be resolved
+            end (pd.Timestamp): End of the last bar that may be resolved (exclusive)
+        """
+        self.clear()
+        self._span = (start, end)
+
+    def clear(self):
+        """Drop the loaded candles and cached bar slices"""
+        self._times = None
+        self._highs = None
+        self._lows = None
+        self._slices = {}
+
+    def _read_span(self, start, end):
+        """
+        Read the lower-timeframe candles of a span from the forward block reader
+
+        Args:
+            start (pd.Timestamp): First time (inclusive)
+            end (pd.Timestamp): Last time (exclusive)
+
+        Returns:
+            pd.DataFrame: Candles in the span
+        """
+        if self._chunks is None:
+            self._chunks = self.store.iter_chunks(
+                self.instrument, self.intrabar_granularity, self.chunk_size, self.start, self.end
+            )
+
+        frames = []
+        while True:
+            if self._pending is None:
+                self._pending = next(self._chunks, None)
+                if self._pending is None:
+                    break
+
+            chunk = self._pending[self._pending.index >= start]
+            inside = chunk[chunk.index < end]
+            frames.append(inside)
+
+            # Candles past the span are kept for the next one
+            if len(inside) < len(chunk):
+                self._pending = chunk.iloc[len(inside):]
+                break
+            self._pending = None
+
+        return pd.concat(frames) if frames else None
+
+    def _load(self):
+        """Load lower-timeframe candles on first use"""
+        if self._times is not None:
+            return
+
+        if self._span is not None:
+            df = self._read_span(*self._span)
+        else:
+            df = self.store.load(
+                self.instrument,
+                self.intrabar_granularity,
+                start=self.start,
+                end=self.end
+            )
+
+        if df is None or df.empty:
+            self._times = np.array([], dtype='int64')
+            self._highs = np.array([], dtype=float)
+            self._lows = np.array([], dtype=float)
+            return
+
+        self._times = df.index.as_unit('ns').asi8
+        self._highs = df['high'].to_numpy(dtype=float)
+        self._lows = df['low'].to_numpy(dtype=float)
+
+    def _get_slice(self, bar_time):
+        """
+        Get the lower-timeframe highs and lows inside a bar
+
+        Args:
+            bar_time (pd.Timestamp): Open time of the bar
+
+        Returns:
+            tuple: (highs, lows) arrays
+        """
+        # Candle times are UTC; normalize before the lookup so both forms share a slot
+        bar_time = pd.Timestamp(bar_time)
+        if bar_time.tzinfo is None:
+            bar_time = bar_time.tz_localize('UTC')
+
+        if bar_time not in self._slices:
+            self._load()
+            start = np.searchsorted(self._times, bar_time.value, side='left')
+            end = np.searchsorted(self._times, (bar_time + self.bar_duration).value, side='left')
+            self._slices[bar_time] = (self._highs[start:end], self._lows[start:end])
+
+        return self._slices[bar_time]
+
+    def resolve(self, bar_time, stop_loss, take_profit, direction):
+        """
+        Find whether stop or target was hit first inside a bar
+
+        Args:
+            bar_time (pd.Timestamp): Open time of the ambiguous bar
+            stop_loss (float): Stop loss price
+            take_profit (float): Take profit price
+            direction (str): 'long' or 'short'
+
+        Returns:
+            str: 'stop', 'target', or None if the lower timeframe can't tell
+        """
+        highs, lows = self._get_slice(bar_time)
+
+        for high, low in zip(highs, lows):
+            if direction == 'long':
+                hit_stop = low <= stop_loss
+                hit_target = high >= take_profit
+            else:
+                hit_stop = high >= stop_loss
+                hit_target = low <= take_profit
+
+            if hit_stop and hit_target:
+                break
+
+            if hit_stop:
+                self.resolved += 1
+                return 'stop'
+
+            if hit_target:
+                self.resolved += 1
+                return 'target'
+
+        self.unresolved += 1
+        return None
 
 
 class Backtester:
-    """Backtest price action patterns"""
+    """
+    Backtest price action patterns
+
+    The backtester only holds its settings; the balance and trades of a run
+    are local to that run, so one instance can serve concurrent backtests.
+    """
 
-    def __init__(self, initial_balance=10000, risk_per_trade=1.0):
+    def __init__(self, initial_balance=10000, risk_per_trade=1.0, intrabar_resolver=None, cache=None):
         """
         Initialize backtester
 
         Args:
             initial_balance (float): Starting account balance
             risk_per_trade (float): Risk percentage per trade
+            intrabar_resolver (IntrabarResolver): Optional resolver for bars
+                touching both stop and target (stop is assumed first otherwise)
+            cache (ArtifactCache): Optional on-disk cache of pattern masks,
+                S/R levels and trades, so reruns only redo changed stages
         """
         self.initial_balance = initial_balance
-        self.balance = initial_balance
         self.risk_per_trade = risk_per_trade
-        self.trades = []
-        self.equity_curve = []
+        self.intrabar_resolver = intrabar_resolver
+        self.cache = cache
 
-    def backtest_pattern(self, df, pattern_type, direction='both', min_rr=1.5):
+    def _trade_filters(self, df, context, direction, min_rr, counters):
         """
-        Backtest a specific candlestick pattern
+        Build the pre-trade filters for one backtest, cheapest first
+
+        Candidates are {'index', 'direction'} dicts for pattern candles; the
+        S/R levels and risk/reward are only computed for candidates that
+        pass the index and direction checks, and stored as 'rr'.
 
         Args:
             df (pd.DataFrame): OHLC data
-            pattern_type (str): Pattern to test ('pin_bar', 'engulfing', etc.)
+            context (AnalysisContext): Context for df
             direction (str): 'long', 'short', or 'both'
             min_rr (float): Minimum risk/reward ratio
+            counters (StageCounters): Counters of this backtest
 
         Returns:
-            dict: Backtest results
+            SignalPipeline: Filters counting into counters
         """
-        # Detect patterns
-        pattern_detector = PatternDetector(df)
-        pattern_detector.detect_all_patterns()
-
-        # Detect S/R levels for each trade
-        for i in range(len(df)):
-            if i < 50:  # Need enough history
-                continue
-
-            # Check if pattern exists at this candle
-            has_pattern = False
-            trade_direction = None
-
-            if pattern_type == 'pin_bar' and df.iloc[i].get('pin_bar', False):
-                has_pattern = True
-                pin_type = df.iloc[i].get('pin_bar_type')
-                if pin_type == 'bullish_hammer':
-                    trade_direction = 'long'
-                elif pin_type == 'bearish_shooting_star':
-                    trade_direction = 'short'
-
-            elif pattern_type == 'engulfing' and df.iloc[i].get('engulfing', False):
-                has_pattern = True
-                eng_type = df.iloc[i].get('engulfing_type')
-                if eng_type == 'bullish_engulfing':
-                    trade_direction = 'long'
-                elif eng_type == 'bearish_engulfing':
-                    trade_direction = 'short'
-
-            elif pattern_type == 'morning_evening_star' and df.iloc[i].get('star', False):
-                has_pattern = True
-                star_type = df.iloc[i].get('star_type')
-                if star_type == 'morning_star':
-                    trade_direction = 'long'
-                elif star_type == 'evening_star':
-                    trade_direction = 'short'
-
-            if not has_pattern or not trade_direction:
-                continue
-
-            # Skip if direction filter doesn't match
-            if direction != 'both' and direction != trade_direction:
-                continue
-
-            # Calculate S/R levels for this point in time
-            historical_df = df.iloc[:i+1]
-            sr_detector = SupportResistance(historical_df.tail(100))
-            sr_detector.detect_support_resistance()
-
-            # Entry on next candle open
-            if i + 1 >= len(df):
-                break
+        opens = context.arrays['open']
+
+        def risk_reward(candidate):
+            # S/R levels as they were at the pattern candle, entry on the next open
+            i = candidate['index']
+            sr_detector = context.sr_detector_at(i)
+            candidate['rr'] = sr_detector.calculate_risk_reward(opens[i + 1], candidate['direction'])
+            return candidate['rr']['risk_reward_ratio'] >= min_rr
+
+        return (
+            SignalPipeline(counters)
+            .add('history', lambda candidate: candidate['index'] >= 50)  # Need enough history
+            .add('direction', lambda candidate: direction in ('both', candidate['direction']))
+            .add('entry_bar', lambda candidate: candidate['index'] + 1 < len(df))
+            .add('risk_reward', risk_reward, cost=10)
+        )
+
+    def backtest_pattern(self, df, pattern_type, direction='both', min_rr=1.5, context=None,
+                         intrabar_resolver=None, counters=None):
+        """
+        Backtest a specific candlestick pattern, starting from the initial balance
 
-            entry_price = df.iloc[i + 1]['open']
+        Args:
+            df (pd.DataFrame): OHLC data
+            pattern_type (str): Pattern to test ('pin_bar', 'engulfing', etc.)
+            direction (str): 'long', 'short', or 'both'
+            min_rr (float): Minimum risk/reward ratio
+            context (AnalysisContext): Optional context for df, to reuse
+                patterns and S/R levels across backtests
+            intrabar_resolver (IntrabarResolver): Optional resolver for this
+                run (defaults to the backtester's)
+            counters (StageCounters): Optional counters the pre-trade filter
+                counts are added to, also when the trades come from the cache
 
-            # Calculate stop loss and take profit
-            rr = sr_detector.calculate_risk_reward(entry_price, trade_direction)
+        Returns:
+            dict: Backtest results
+        """
+        resolver = intrabar_resolver or self.intrabar_resolver
+        filter_counts = StageCounters()
 
-            if rr['risk_reward_ratio'] < min_rr:
-                continue
+        # Detect patterns
+        if context is None:
+            context = AnalysisContext(df, cache=self.cache)
+
+        names = context.pattern_detector.registry.resolve(pattern_type)
+        directions, _ = context.pattern_detector.registry.directions(context.pattern_masks, names)
+
+        # Trades depend on the signals, not on how they were found, so a
+        # threshold change that leaves this pattern's signals alone is a hit.
+        # Intrabar resolution reads other candles and is never cached.
+        cache_key = None
+        if self.cache is not None and resolver is None:
+            cache_key = fingerprint(
+                context.fingerprint, directions, direction, min_rr, pattern_type,
+                Config.SUPPORT_RESISTANCE_LOOKBACK, Config.SUPPORT_RESISTANCE_ATR_MULTIPLIER,
+                Config.ATR_PERIOD, Config.SUPPORT_RESISTANCE_TOLERANCE,
+                self.initial_balance, self.risk_per_trade, context.pip_size
+            )
+            cached = self.cache.get('trades', cache_key)
+            # Entries cached without their filter counts are recomputed
+            if cached is not None and 'filters' in cached:
+                if counters is not None:
+                    counters.merge(cached['filters'])
+                return self._calculate_statistics(cached['trades'], cached['balance'])
+
+        balance = self.initial_balance
+        trades = []
+
+        candidates = [
+            {'index': i, 'direction': 'long' if directions[i] == 1 else 'short'}
+            for i in np.flatnonzero(directions)
+        ]
+
+        for candidate in self._trade_filters(df, context, direction, min_rr, filter_counts).run(candidates):
+            i = candidate['index']
+            trade_direction = candidate['direction']
+            rr = candidate['rr']
 
             # Simulate trade
             trade_result = self._simulate_trade(
                 df.iloc[i+1:],
-                entry_price,
+                rr['entry'],
                 rr['stop_loss'],
                 rr['take_profit'],
-                trade_direction
+                trade_direction,
+                risk_amount=balance * (self.risk_per_trade / 100),
+                pip_size=context.pip_size,
+                intrabar_resolver=resolver
             )
 
             if trade_result:
                 trade_result['entry_time'] = df.index[i + 1]
                 trade_result['pattern'] = pattern_type
                 trade_result['direction'] = trade_direction
-                self.trades.append(trade_result)
-
-        return self._calculate_statistics()
-
-    def _simulate_trade(self, future_df, entry, stop_loss, take_profit, direction):
+                balance += trade_result['pnl']
+                trades.append(trade_result)
+
+        if cache_key is not None:
+            self.cache.put('trades', cache_key, {
+                'trades': trades,
+                'balance': balance,
+                'filters': filter_counts.snapshot()
+            })
+        if counters is not None:
+            counters.merge(filter_counts.snapshot())
+
+        return self._calculate_statistics(trades, balance)
+
+    def _simulate_trade(self, future_df, entry, stop_loss, take_profit, direction, risk_amount,
+                        pip_size=DEFAULT_PIP_SIZE, intrabar_resolver=None):
         """
         Simulate a single trade
 
@@ -127,81 +359,63 @@ class Backtester:
             stop_loss (float): Stop loss price
             take_profit (float): Take profit price
             direction (str): 'long' or 'short'
+            risk_amount (float): Amount lost if the stop is hit
+            pip_size (float): Pip size of the instrument
+            intrabar_resolver (IntrabarResolver): Optional resolver for bars
+                touching both stop and target
 
         Returns:
-            dict: Trade result
+            dict: Trade result (the caller applies its P&L to the balance)
         """
-        risk_amount = self.balance * (self.risk_per_trade / 100)
-
         for i, (idx, candle) in enumerate(future_df.iterrows()):
             if direction == 'long':
-                # Check stop loss
-                if candle['low'] <= stop_loss:
-                    loss = risk_amount
-                    self.balance -= loss
-                    return {
-                        'exit_time': idx,
-                        'exit_price': stop_loss,
-                        'result': 'loss',
-                        'pnl': -loss,
-                        'pnl_pips': (stop_loss - entry) / 0.0001,
-                        'bars_held': i + 1
-                    }
-
-                # Check take profit
-                if candle['high'] >= take_profit:
-                    rr_ratio = abs(take_profit - entry) / abs(entry - stop_loss)
-                    profit = risk_amount * rr_ratio
-                    self.balance += profit
-                    return {
-                        'exit_time': idx,
-                        'exit_price': take_profit,
-                        'result': 'win',
-                        'pnl': profit,
-                        'pnl_pips': (take_profit - entry) / 0.0001,
-                        'bars_held': i + 1
-                    }
-
+                hit_stop = candle['low'] <= stop_loss
+                hit_target = candle['high'] >= take_profit
             else:  # short
-                # Check stop loss
-                if candle['high'] >= stop_loss:
-                    loss = risk_amount
-                    self.balance -= loss
-                    return {
-                        'exit_time': idx,
-                        'exit_price': stop_loss,
-                        'result': 'loss',
-                        'pnl': -loss,
-                        'pnl_pips': (entry - stop_loss) / 0.0001,
-                        'bars_held': i + 1
-                    }
-
-                # Check take profit
-                if candle['low'] <= take_profit:
-                    rr_ratio = abs(entry - take_profit) / abs(stop_loss - entry)
-                    profit = risk_amount * rr_ratio
-                    self.balance += profit
-                    return {
-                        'exit_time': idx,
-                        'exit_price': take_profit,
-                        'result': 'win',
-                        'pnl': profit,
-                        'pnl_pips': (entry - take_profit) / 0.0001,
-                        'bars_held': i + 1
-                    }
+                hit_stop = candle['high'] >= stop_loss
+                hit_target = candle['low'] <= take_profit
+
+            # Both touched in the same candle: drill down if possible, else stop first
+            if hit_stop and hit_target and intrabar_resolver is not None:
+                if intrabar_resolver.resolve(idx, stop_loss, take_profit, direction) == 'target':
+                    hit_stop = False
+
+            # Check stop loss
+            if hit_stop:
+                loss = risk_amount
+                return {
+                    'exit_time': idx,
+                    'exit_price': stop_loss,
+                    'result': 'loss',
+                    'pnl': -loss,
+                    'pnl_pips': (stop_loss - entry) / pip_size if direction == 'long' else (entry - stop_loss) / pip_size,
+                    'bars_held': i + 1
+                }
+
+            # Check take profit
+            if hit_target:
+                rr_ratio = abs(take_profit - entry) / abs(entry - stop_loss)
+                profit = risk_amount * rr_ratio
+                return {
+                    'exit_time': idx,
+                    'exit_price': take_profit,
+                    'result': 'win',
+                    'pnl': profit,
+                    'pnl_pips': (take_profit - entry) / pip_size if direction == 'long' else (entry - take_profit) / pip_size,
+                    'bars_held': i + 1
+                }
 
             # Max 50 bars
             if i >= 50:
                 # Close at market
                 exit_price = candle['close']
                 if direction == 'long':
-                    pnl_pips = (exit_price - entry) / 0.0001
+                    pnl_pips = (exit_price - entry) / pip_size
                 else:
-                    pnl_pips = (entry - exit_price) / 0.0001
+                    pnl_pips = (entry - exit_price) / pip_size
 
-                pnl = (pnl_pips / abs((entry - stop_loss) / 0.0001)) * risk_amount
+                pnl = (pnl_pips / abs((entry - stop_loss) / pip_size)) * risk_amount
 
-                self.balance += pnl
                 return {
                     'exit_time': idx,
                     'exit_price': exit_price,
@@ -213,14 +427,18 @@ class Backtester:
 
         return None
 
-    def _calculate_statistics(self):
+    def _calculate_statistics(self, trades, balance):
         """
         Calculate backtest statistics
 
+        Args:
+            trades (list): Closed trades in the order they were taken
+            balance (float): Final account balance
+
         Returns:
             dict: Performance metrics
         """
-        if not self.trades:
+        if not trades:
             return {
                 'total_trades': 0,
                 'winning_trades': 0,
@@ -234,20 +452,20 @@ class Backtester:
                 'profit_factor': 0
             }
 
-        df_trades = pd.DataFrame(self.trades)
+        df_trades = pd.DataFrame(trades)
 
         winning_trades = df_trades[df_trades['result'] == 'win']
         losing_trades = df_trades[df_trades['result'] == 'loss']
 
         total_pnl = df_trades['pnl'].sum()
-        total_return = ((self.balance - self.initial_balance) / self.initial_balance) * 100
+        total_return = ((balance - self.initial_balance) / self.initial_balance) * 100
 
         # Calculate drawdown
         equity = self.initial_balance
         equity_curve = [equity]
         peak = equity
 
-        for trade in self.trades:
+        for trade in trades:
             equity += trade['pnl']
             equity_curve.append(equity)
             if equity > peak:
@@ -261,13 +479,13 @@ class Backtester:
         profit_factor = gross_profit / gross_loss if gross_loss > 0 else 0
 
         return {
-            'total_trades': len(self.trades),
+            'total_trades': len(trades),
             'winning_trades': len(winning_trades),
             'losing_trades': len(losing_trades),
-            'win_rate': round((len(winning_trades) / len(self.trades)) * 100, 2),
+            'win_rate': round((len(winning_trades) / len(trades)) * 100, 2),
             'total_pnl': round(total_pnl, 2),
             'total_return': round(total_return, 2),
-            'final_balance': round(self.balance, 2),
+            'final_balance': round(balance, 2),
             'max_drawdown': round(max_drawdown, 2),
             'avg_win': round(winning_trades['pnl'].mean(), 2) if not winning_trades.empty else 0,
             'avg_loss': round(losing_trades['pnl'].mean(), 2) if not losing_trades.empty else 0,
@@ -277,7 +495,7 @@ class Backtester:
             'avg_bars_held': round(df_trades['bars_held'].mean(), 1)
         }
 
-    def run_comprehensive_backtest(self, pair, timeframe='H4', patterns=None):
+    def run_comprehensive_backtest(self, pair, timeframe='H4', patterns=None, intrabar=False, store=None):
         """
         Run backtest on multiple patterns
 
@@ -285,34 +503,52 @@ class Backtester:
             pair (str): Forex pair
             timeframe (str): Timeframe
             patterns (list): List of patterns to test
+            intrabar (bool): Resolve ambiguous bars with lower-timeframe
+                candles from the local candle store
+            store (CandleStore): Load the full backfilled history from this
+                store instead of the last 5000 candles from OANDA
 
         Returns:
-            dict: Results for all patterns
+            dict: Results for all patterns, with 'filters' counting this run's
+                pre-trade filter stages
         """
         if patterns is None:
-            patterns = ['pin_bar', 'engulfing', 'morning_evening_star']
+            patterns = default_registry.directional_groups()
 
-        client = OandaClient()
-        df = client.get_candles(pair, granularity=timeframe, count=5000)
+        if store is not None and store.has(pair, timeframe):
+            df = store.load(pair, timeframe)
+        else:
+            client = OandaClient()
+            df = client.get_candles(pair, granularity=timeframe, count=5000)
 
         if df is None or df.empty:
             return {'error': 'Unable to fetch data'}
 
+        resolver = None
+        if intrabar:
+            resolver = IntrabarResolver(
+                pair,
+                timeframe,
+                store=store,
+                start=df.index[0],
+                end=df.index[-1] + granularity_to_timedelta(timeframe)
+            )
+
         results = {}
+        filters = StageCounters()
+        context = AnalysisContext(df, pair=pair, timeframe=timeframe, cache=self.cache)
 
         for pattern in patterns:
             print(f"Backtesting {pattern} on {pair}...")
 
-            # Reset for each pattern
-            self.balance = self.initial_balance
-            self.trades = []
-
-            result = self.backtest_pattern(df, pattern)
+            # Each pattern starts from the initial balance
+            result = self.backtest_pattern(df, pattern, context=context, intrabar_resolver=resolver, counters=filters)
             results[pattern] = result
 
         return {
             'pair': pair,
             'timeframe': timeframe,
             'initial_balance': self.initial_balance,
-            'results': results
+            'results': results,
+            'filters': filters.snapshot()
         }
@@ -0,0 +1,80 @@
+"""
+Batched pattern analysis across many pairs
+"""
+import numpy as np
+from src.pattern_registry import CandleFeatures, default_registry
+
+
+OHLC_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+def stack_candles(frames):
+    """
+    Stack the OHLC data of many pairs into one (pairs x bars x 4) array
+
+    Pairs are aligned on their most recent candle, so each row keeps the
+    pair's own candle sequence and previous-candle rules behave exactly as
+    in a single-pair scan. Shorter series are padded with NaN on the left.
+
+    Args:
+        frames (dict): Pair -> OHLC DataFrame
+
+    Returns:
+        tuple: (pairs list, (pairs x bars x 4) array, bars per pair)
+    """
+    pairs = [pair for pair, df in frames.items() if df is not None and not df.empty]
+    lengths = [len(frames[pair]) for pair in pairs]
+    bars = max(lengths) if lengths else 0
+
+    tensor = np.full((len(pairs), bars, len(OHLC_COLUMNS)), np.nan)
+
+    for p, pair in enumerate(pairs):
+        values = frames[pair][OHLC_COLUMNS].to_numpy(dtype=float)
+        tensor[p, bars - len(values):] = values
+
+    return pairs, tensor, lengths
+
+
+def analyze_batch(tensor, registry=None, params=None):
+    """
+    Compute candle properties and pattern flags for all pairs in one call
+
+    Args:
+        tensor (np.ndarray): (pairs x bars x 4) OHLC array
+        registry (PatternRegistry): Patterns to evaluate (defaults to the built-in ones)
+        params (dict): Optional per-pattern parameter overrides
+
+    Returns:
+        tuple: (CandleFeatures over pairs x bars, dict pattern name -> pairs x bars mask)
+    """
+    registry = registry or default_registry
+
+    features = CandleFeatures(tensor[..., 0], tensor[..., 1], tensor[..., 2], tensor[..., 3])
+    masks = registry.compile(params=params).evaluate(features)
+
+    return features, masks
+
+
+def split_batch(features, masks, pairs, lengths):
+    """
+    Split batched results back into per-pair features and masks
+
+    Args:
+        features (CandleFeatures): Batched features
+        masks (dict): Batched pattern masks
+        pairs (list): Pairs in stacking order
+        lengths (list): Bars per pair
+
+    Returns:
+        dict: Pair -> (CandleFeatures, masks dict) for the pair's own candles
+    """
+    results = {}
+
+    for p, (pair, length) in enumerate(zip(pairs, lengths)):
+        window = (p, slice(features['close'].shape[-1] - length, None))
+        results[pair] = (
+            features.take(window),
+            {name: mask[window] for name, mask in masks.items()}
+        )
+
+    return results
@@ -0,0 +1,246 @@
+"""
+Columnar candle feed with pattern and level overlays for dashboard charts
+"""
+import json
+import struct
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional dependency: the typed-array and JSON formats still work
+    pa = None
+
+
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+BINARY_MIME = 'application/octet-stream'
+
+# Typed-array layout: magic, header length, JSON header, then 8-byte aligned column buffers
+BINARY_MAGIC = b'FXC1'
+
+
+def lttb(x, y, threshold):
+    """
+    Pick the points that best preserve the shape of a series (Largest-Triangle-Three-Buckets)
+
+    Args:
+        x (np.ndarray): Point positions (e.g., epoch milliseconds)
+        y (np.ndarray): Point values
+        threshold (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for b in range(threshold - 2):
+        start, end = edges[b], edges[b + 1]
+
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_start, next_end = end, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[b + 1] = a
+
+    return selected
+
+
+def downsample_candles(columns, max_points):
+    """
+    Reduce candles to at most max_points bars
+
+    Bars are picked with LTTB on the close, and each picked bar absorbs the
+    bars up to the next one: highest high, lowest low, last close, summed
+    volume and any pattern seen, so wicks and signals are not lost.
+
+    Args:
+        columns (dict): Column arrays from candle_columns
+        max_points (int): Maximum bars to return
+
+    Returns:
+        dict: Downsampled column arrays
+    """
+    n = len(columns['time'])
+    if max_points is None or n <= max_points:
+        return columns
+
+    starts = lttb(columns['time'], columns['close'], max_points)
+    ends = np.r_[starts[1:], n] - 1
+
+    return {
+        'time': columns['time'][starts],
+        'open': columns['open'][starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': columns['close'][ends],
+        'volume': np.add.reduceat(columns['volume'], starts),
+        'patterns': np.bitwise_or.reduceat(columns['patterns'], starts)
+    }
+
+
+def candle_columns(df, pattern_masks=None, pattern_names=None):
+    """
+    Convert candles and pattern masks to column arrays
+
+    Args:
+        df (pd.DataFrame): OHLCV data indexed by time
+        pattern_masks (dict): Pattern name -> boolean array aligned with df
+        pattern_names (list): Pattern order; bit k of 'patterns' is pattern_names[k]
+
+    Returns:
+        dict: 'time' (epoch ms), OHLC, 'volume' and 'patterns' bitmask arrays
+    """
+    patterns = np.zeros(len(df), dtype=np.uint32)
+    for bit, name in enumerate(pattern_names or []):
+        mask = (pattern_masks or {}).get(name)
+        if mask is not None:
+            patterns |= np.asarray(mask, dtype=bool).astype(np.uint32) << np.uint32(bit)
+
+    volume = df['volume'].to_numpy(dtype=np.int64) if 'volume' in df else np.zeros(len(df), dtype=np.int64)
+
+    return {
+        'time': df.index.as_unit('ms').asi8.astype(np.int64),
+        'open': df['open'].to_numpy(dtype=np.float64),
+        'high': df['high'].to_numpy(dtype=np.float64),
+        'low': df['low'].to_numpy(dtype=np.float64),
+        'close': df['close'].to_numpy(dtype=np.float64),
+        'volume': volume,
+        'patterns': patterns
+    }
+
+
+def build_feed(context, count=None, since=None, max_points=None):
+    """
+    Build the candle feed of a series
+
+    Args:
+        context (AnalysisContext): Candles with their pattern and level overlays
+        count (int): Optional number of most recent bars
+        since (int): Optional cursor (epoch ms); only later bars are returned
+        max_points (int): Optional maximum bars, downsampled with LTTB
+
+    Returns:
+        dict: 'columns' arrays and 'meta' (pattern names, levels, cursor, ...)
+    """
+    df = context.df
+    pattern_names = list(context.pattern_masks)
+    columns = candle_columns(df, context.pattern_masks, pattern_names)
+    total = len(df)
+
+    if count is not None:
+        columns = {name: values[-count:] for name, values in columns.items()}
+    if since is not None:
+        keep = columns['time'] > since
+        columns = {name: values[keep] for name, values in columns.items()}
+
+    selected = len(columns['time'])
+    columns = downsample_candles(columns, max_points)
+    levels = context.levels
+
+    meta = {
+        'pair': context.pair,
+        'timeframe': context.timeframe,
+        'bars': len(columns['time']),
+        'total_bars': total,
+        'downsampled': len(columns['time']) < selected,
+        'cursor': int(df.index[-1].value // 1_000_000) if total else since,
+        'pattern_bits': pattern_names,
+        'levels': {
+            level_type: [
+                {'price': float(level['price']), 'strength': int(level['strength'])}
+                for level in levels.get(level_type, [])
+            ]
+            for level_type in ('support', 'resistance')
+        }
+    }
+
+    return {'columns': columns, 'meta': meta}
+
+
+def encode_json(feed):
+    """Encode a feed as a JSON-ready dict of column lists"""
+    return {
+        **feed['meta'],
+        'columns': {name: values.tolist() for name, values in feed['columns'].items()}
+    }
+
+
+def encode_binary(feed):
+    """
+    Encode a feed as typed-array buffers
+
+    Layout: b'FXC1', uint32 little-endian header length, UTF-8 JSON header
+    padded to 8 bytes, then each column's little-endian buffer at the offset
+    listed in the header, so the browser can wrap it in a typed array
+    (e.g., new Float64Array(buffer, offset, length)) without copying.
+
+    Args:
+        feed (dict): Feed from build_feed
+
+    Returns:
+        bytes: Encoded feed
+    """
+    buffers = []
+    layout = []
+    offset = 0
+
+    for name, values in feed['columns'].items():
+        data = np.ascontiguousarray(values).astype(values.dtype.newbyteorder('<'), copy=False).tobytes()
+        layout.append({'name': name, 'dtype': values.dtype.name, 'offset': offset, 'length': len(values)})
+        buffers.append(data + b'\0' * (-len(data) % 8))
+        offset += len(buffers[-1])
+
+    header = json.dumps({**feed['meta'], 'columns': layout}).encode('utf-8')
+    prefix_length = len(BINARY_MAGIC) + 4 + len(header)
+    header += b' ' * (-prefix_length % 8)
+
+    # Column offsets are relative to the end of the header
+    return BINARY_MAGIC + struct.pack('<I', len(header)) + header + b''.join(buffers)
+
+
+def encode_arrow(feed):
+    """
+    Encode a feed as an Arrow IPC stream
+
+    The overlay metadata is stored as JSON in the schema metadata under 'meta'.
+
+    Args:
+        feed (dict): Feed from build_feed
+
+    Returns:
+        bytes: Arrow IPC stream
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for the Arrow format (pip install pyarrow)")
+
+    columns = feed['columns']
+    batch = pa.record_batch(
+        [pa.array(values) for values in columns.values()],
+        schema=pa.schema(
+            [(name, pa.from_numpy_dtype(values.dtype)) for name, values in columns.items()],
+            metadata={'meta': json.dumps(feed['meta'])}
+        )
+    )
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,275 @@
+"""
+Local on-disk candle store
+"""
+import os
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from config import Config
+
+
+# Candle duration for each OANDA granularity
+GRANULARITY_DURATIONS = {
+    'S5': timedelta(seconds=5),
+    'S10': timedelta(seconds=10),
+    'S15': timedelta(seconds=15),
+    'S30': timedelta(seconds=30),
+    'M1': timedelta(minutes=1),
+    'M2': timedelta(minutes=2),
+    'M4': timedelta(minutes=4),
+    'M5': timedelta(minutes=5),
+    'M10': timedelta(minutes=10),
+    'M15': timedelta(minutes=15),
+    'M30': timedelta(minutes=30),
+    'H1': timedelta(hours=1),
+    'H2': timedelta(hours=2),
+    'H3': timedelta(hours=3),
+    'H4': timedelta(hours=4),
+    'H6': timedelta(hours=6),
+    'H8': timedelta(hours=8),
+    'H12': timedelta(hours=12),
+    'D': timedelta(days=1),
+    'W': timedelta(weeks=1),
+}
+
+
+def granularity_to_timedelta(granularity):
+    """
+    Get the duration of a single candle
+
+    Args:
+        granularity (str): OANDA granularity (e.g., 'M15', 'H4', 'D')
+
+    Returns:
+        timedelta: Candle duration
+    """
+    try:
+        return GRANULARITY_DURATIONS[granularity]
+    except KeyError:
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+
+class CandleStore:
+    """Store OHLCV candles on disk, one CSV file per instrument and granularity"""
+
+    COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+    def __init__(self, root=None):
+        """
+        Initialize candle store
+
+        Args:
+            root (str): Directory holding the candle files
+        """
+        self.root = root or Config.CANDLE_STORE_DIR
+
+    def path(self, instrument, granularity):
+        """
+        Get the file path for an instrument/granularity
+
+        Args:
+            instrument (str): Forex pair (e.g., 'EUR_USD')
+            granularity (str): Timeframe
+
+        Returns:
+            str: CSV file path
+        """
+        return os.path.join(self.root, instrument, f"{granularity}.csv")
+
+    def has(self, instrument, granularity):
+        """Check if candles are stored for an instrument/granularity"""
+        return os.path.exists(self.path(instrument, granularity))
+
+    def load(self, instrument, granularity, start=None, end=None):
+        """
+        Load candles from disk
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            start (datetime): Optional first candle time (inclusive)
+            end (datetime): Optional last candle time (exclusive)
+
+        Returns:
+            pd.DataFrame: OHLCV data indexed by time, or None if not stored
+        """
+        path = self.path(instrument, granularity)
+
+        if not os.path.exists(path):
+            return None
+
+        df = pd.read_csv(path, index_col='time')
+        df.index = pd.to_datetime(df.index, utc=True, format='ISO8601')
+
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index < pd.Timestamp(end)]
+
+        return df
+
+    def iter_chunks(self, instrument, granularity, chunk_size=50000, start=None, end=None):
+        """
+        Read stored candles in fixed-size blocks without loading the whole file
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            chunk_size (int): Candles per block
+            start (datetime): Optional first candle time (inclusive)
+            end (datetime): Optional last candle time (exclusive)
+
+        Yields:
+            pd.DataFrame: OHLCV blocks in time order
+        """
+        path = self.path(instrument, granularity)
+
+        if not os.path.exists(path):
+            return
+
+        for chunk in pd.read_csv(path, index_col='time', chunksize=chunk_size):
+            chunk.index = pd.to_datetime(chunk.index, utc=True, format='ISO8601')
+
+            if end is not None:
+                if chunk.index[0] >= pd.Timestamp(end):
+                    break
+                chunk = chunk[chunk.index < pd.Timestamp(end)]
+            if start is not None:
+                chunk = chunk[chunk.index >= pd.Timestamp(start)]
+
+            if not chunk.empty:
+                yield chunk
+
+    def last_time(self, instrument, granularity):
+        """
+        Get the time of the last stored candle without reading the whole file
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+
+        Returns:
+            pd.Timestamp: Last candle time, or None if nothing is stored
+        """
+        path = self.path(instrument, granularity)
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lines = f.read().decode('utf-8').strip().splitlines()
+
+        if len(lines) < 1 or lines[-1].startswith('time'):
+            return None
+
+        return pd.Timestamp(lines[-1].split(',')[0])
+
+    def append(self, instrument, granularity, df):
+        """
+        Add candles to the store, appending to the file when they are all newer
+
+        Candles that overlap the stored range are merged through save().
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            df (pd.DataFrame): OHLCV data indexed by time
+
+        Returns:
+            int: Number of candles written
+        """
+        if df is None or df.empty:
+            return 0
+
+        df = df[self.COLUMNS].sort_index()
+        df = df[~df.index.duplicated(keep='last')]
+        last = self.last_time(instrument, granularity)
+
+        if last is None or df.index[0] <= last:
+            self.save(instrument, granularity, df)
+            return len(df)
+
+        df.index.name = 'time'
+        df.to_csv(
+            self.path(instrument, granularity),
+            mode='a',
+            header=False,
+            date_format='%Y-%m-%dT%H:%M:%S.%fZ'
+        )
+
+        return len(df)
+
+    def validate(self, instrument, granularity):
+        """
+        Check stored candles for duplicates, ordering problems and gaps
+
+        Gaps spanning a weekend are expected and not reported.
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+
+        Returns:
+            dict: Validation report
+        """
+        df = self.load(instrument, granularity)
+
+        if df is None or df.empty:
+            return {'candles': 0, 'duplicates': 0, 'unsorted': 0, 'gaps': []}
+
+        times = df.index
+        deltas = times[1:] - times[:-1]
+        duration = pd.Timedelta(granularity_to_timedelta(granularity))
+
+        gaps = []
+        for k in np.flatnonzero(deltas > duration):
+            gap_start, gap_end = times[k], times[k + 1]
+            closed_days = pd.date_range(gap_start.normalize(), gap_end.normalize(), freq='D')
+            if (closed_days.dayofweek == 5).any() and gap_end - gap_start <= pd.Timedelta(days=3) + duration:
+                continue
+            gaps.append({'from': gap_start.isoformat(), 'to': gap_end.isoformat()})
+
+        return {
+            'candles': len(df),
+            'start': times[0].isoformat(),
+            'end': times[-1].isoformat(),
+            'duplicates': int(times.duplicated().sum()),
+            'unsorted': int((deltas < pd.Timedelta(0)).sum()),
+            'gaps': gaps
+        }
+
+    def save(self, instrument, granularity, df):
+        """
+        Merge candles into the store
+
+        Candles already stored with the same time are replaced by the new ones.
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            df (pd.DataFrame): OHLCV data indexed by time
+
+        Returns:
+            int: Number of candles stored after the merge
+        """
+        if df is None or df.empty:
+            existing = self.load(instrument, granularity)
+            return 0 if existing is None else len(existing)
+
+        df = df[self.COLUMNS]
+        existing = self.load(instrument, granularity)
+
+        if existing is not None and not existing.empty:
+            df = pd.concat([existing, df])
+            df = df[~df.index.duplicated(keep='last')]
+
+        df = df.sort_index()
+        df.index.name = 'time'
+
+        path = self.path(instrument, granularity)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path, date_format='%Y-%m-%dT%H:%M:%S.%fZ')
+
+        return len(df)
@@ -0,0 +1,241 @@
+"""
+Higher-timeframe confluence scoring for trading signals
+"""
+import threading
+import time
+import numpy as np
+import pandas as pd
+from src.candle_store import granularity_to_timedelta
+from config import Config
+
+
+# Signal type -> (level type that supports it, trend that agrees with it)
+SIGNAL_SIDES = {
+    'BUY': ('support', 1),
+    'SELL': ('resistance', -1)
+}
+
+TREND_NAMES = {1: 'up', -1: 'down', 0: 'flat'}
+
+
+def trend_state(closes, fast=20, slow=50):
+    """
+    Classify the trend from fast and slow exponential moving averages
+
+    Args:
+        closes (array-like): Close prices
+        fast (int): Fast EMA span
+        slow (int): Slow EMA span
+
+    Returns:
+        int: 1 (up: close above fast EMA above slow EMA), -1 (down) or 0 (flat)
+    """
+    closes = pd.Series(np.asarray(closes, dtype=float))
+    if len(closes) < slow:
+        return 0
+
+    fast_ema = closes.ewm(span=fast, adjust=False).mean().iloc[-1]
+    slow_ema = closes.ewm(span=slow, adjust=False).mean().iloc[-1]
+    close = closes.iloc[-1]
+
+    if close > fast_ema > slow_ema:
+        return 1
+    if close < fast_ema < slow_ema:
+        return -1
+    return 0
+
+
+class ConfluenceFilter:
+    """Score signals against higher-timeframe S/R levels and trend, refreshed only when those bars close"""
+
+    def __init__(self, fetch, analysis_cache, timeframes=None, count=200, refresh_interval=300.0):
+        """
+        Initialize confluence filter
+
+        Args:
+            fetch (callable): fetch(pair, timeframe, count) -> OHLC DataFrame or None;
+                errors are raised unless an earlier context can stand in
+            analysis_cache (AnalysisCache): Cache holding the higher-timeframe contexts
+                (shared with the scanner, so a D scan also serves D confluence)
+            timeframes (list): Higher timeframes (defaults to Config.CONFLUENCE_TIMEFRAMES)
+            count (int): Candles fetched per higher timeframe
+            refresh_interval (float): Seconds between refetches while a closed
+                bar has not been published yet (e.g., over the weekend)
+        """
+        self.fetch = fetch
+        self.analysis_cache = analysis_cache
+        self.timeframes = timeframes if timeframes is not None else Config.CONFLUENCE_TIMEFRAMES
+        self.count = count
+        self.refresh_interval = refresh_interval
+
+        self.stats = {'fetches': 0, 'builds': 0}
+        self._artifacts = {}
+        self._last_fetch = {}
+        self._lock = threading.Lock()
+
+    def higher_timeframes(self, timeframe):
+        """
+        Get the configured timeframes above a timeframe
+
+        Args:
+            timeframe (str): Signal timeframe
+
+        Returns:
+            list: Higher timeframes
+        """
+        duration = granularity_to_timedelta(timeframe)
+        return [tf for tf in self.timeframes if granularity_to_timedelta(tf) > duration]
+
+    def _context(self, pair, timeframe):
+        """
+        Get the higher-timeframe context, fetching candles only after its bar closed
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Higher timeframe
+
+        Returns:
+            AnalysisContext: Context, or None if no data is available
+        """
+        context = self.analysis_cache.peek(pair, timeframe)
+        if context is not None:
+            return context
+
+        key = (pair, timeframe)
+        context = self.analysis_cache.latest(pair, timeframe)
+
+        with self._lock:
+            recently_fetched = time.monotonic() - self._last_fetch.get(key, -np.inf) < self.refresh_interval
+            if context is not None and recently_fetched:
+                return context
+            self._last_fetch[key] = time.monotonic()
+
+        try:
+            df = self.fetch(pair, timeframe, self.count)
+        except Exception as e:
+            if context is None:
+                raise
+            # Scoring against the previous bar's context beats failing the scan
+            print(f"Error fetching {pair} {timeframe}: {str(e)} (using the previous bar)")
+            return context
+
+        with self._lock:
+            self.stats['fetches'] += 1
+
+        if df is None or df.empty:
+            return context
+
+        return self.analysis_cache.get(pair, timeframe, df)
+
+    def artifacts(self, pair, timeframe):
+        """
+        Get the levels, tolerance and trend of a higher timeframe
+
+        Artifacts are built once per higher-timeframe bar.
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Higher timeframe
+
+        Returns:
+            dict: 'bar_time', 'support' and 'resistance' price arrays,
+                'tolerance' (fraction of price) and 'trend' (1, -1 or 0),
+                or None if no data is available
+        """
+        context = self._context(pair, timeframe)
+        if context is None:
+            return None
+
+        key = (pair, timeframe)
+
+        with self._lock:
+            cached = self._artifacts.get(key)
+            if cached is not None and cached['bar_time'] == context.bar_time:
+                return cached
+
+        levels = context.levels
+        artifacts = {
+            'bar_time': context.bar_time,
+            'support': np.array([level['price'] for level in levels['support']], dtype=float),
+            'resistance': np.array([level['price'] for level in levels['resistance']], dtype=float),
+            'tolerance': context.sr_detector.tolerance,
+            'trend': trend_state(context.arrays['close'])
+        }
+
+        with self._lock:
+            self._artifacts[key] = artifacts
+            self.stats['builds'] += 1
+
+        return artifacts
+
+    def score(self, pair, timeframe, signal, tolerance_multiplier=1.5):
+        """
+        Score a signal against the higher timeframes
+
+        Each higher timeframe adds 1 if the entry is at one of its levels on
+        the signal's side (support for BUY, resistance for SELL), adds 1 if
+        its trend agrees with the signal and subtracts 1 if it opposes it.
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Signal timeframe
+            signal (dict): BUY or SELL signal with an 'entry'
+            tolerance_multiplier (float): Multiplier for the level tolerance
+
+        Returns:
+            dict: 'score' and per-timeframe 'level' (price or None) and 'trend'
+        """
+        level_type, direction = SIGNAL_SIDES[signal['type']]
+        entry = signal['entry']
+        result = {'score': 0, 'timeframes': {}}
+
+        for higher in self.higher_timeframes(timeframe):
+            artifacts = self.artifacts(pair, higher)
+            if artifacts is None:
+                continue
+
+            prices = artifacts[level_type]
+            band = entry * artifacts['tolerance'] * tolerance_multiplier
+            near = prices[np.abs(prices - entry) <= band]
+            level = float(near[np.argmin(np.abs(near - entry))]) if len(near) else None
+
+            result['score'] += (level is not None) + artifacts['trend'] * direction
+            result['timeframes'][higher] = {
+                'level': level,
+                'trend': TREND_NAMES[artifacts['trend']]
+            }
+
+        return result
+
+    def apply(self, pair, timeframe, signals):
+        """
+        Add confluence scores to BUY/SELL signals, dropping weak ones if configured
+
+        Signals scoring below Config.CONFLUENCE_MIN_SCORE are dropped (no
+        signal is dropped when it is None).
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Signal timeframe
+            signals (list): Signals from the scanned timeframe
+
+        Returns:
+            list: Signals with 'confluence_score' and 'confluence' added
+        """
+        if not self.higher_timeframes(timeframe):
+            return signals
+
+        kept = []
+
+        for signal in signals:
+            if signal['type'] in SIGNAL_SIDES:
+                confluence = self.score(pair, timeframe, signal)
+                signal['confluence_score'] = confluence['score']
+                signal['confluence'] = confluence['timeframes']
+
+                if Config.CONFLUENCE_MIN_SCORE is not None and confluence['score'] < Config.CONFLUENCE_MIN_SCORE:
+                    continue
+
+            kept.append(signal)
+
+        return kept
@@ -0,0 +1,202 @@
+"""
+Rolling cross-pair correlation and currency strength
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+
+class CorrelationTracker:
+    """
+    Rolling return correlation matrix and currency strength index, updated bar by bar
+
+    Updates and reads are serialized, so one tracker can be shared by request threads.
+    """
+
+    def __init__(self, pairs, window=100):
+        """
+        Initialize correlation tracker
+
+        Args:
+            pairs (list): Forex pairs (e.g., 'EUR_USD')
+            window (int): Number of returns in the rolling window
+        """
+        self.pairs = list(pairs)
+        self.window = window
+
+        n = len(self.pairs)
+        self._returns = np.zeros((window, n))
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._position = 0
+        self._updates_since_recompute = 0
+        self.count = 0
+        self.last_close = np.full(n, np.nan)
+        self.last_time = None
+        self._lock = threading.RLock()
+
+        # +1 where the currency is the base of the pair, -1 where it is the quote
+        self.currencies = sorted({c for pair in self.pairs for c in pair.split('_')})
+        self._exposure = np.zeros((len(self.currencies), n))
+        for p, pair in enumerate(self.pairs):
+            base, quote = pair.split('_')
+            self._exposure[self.currencies.index(base), p] = 1
+            self._exposure[self.currencies.index(quote), p] = -1
+
+    def update(self, time, closes):
+        """
+        Add one bar of closes
+
+        The window sums are updated by adding the new returns and removing the
+        oldest, which is O(pairs^2) per bar. They are rebuilt from the buffer
+        once per window to stop floating-point drift.
+
+        Args:
+            time (pd.Timestamp): Bar time
+            closes (array-like): Close per pair, NaN where the pair has no bar
+        """
+        closes = np.asarray(closes, dtype=float)
+
+        with self._lock:
+            returns = np.log(closes / self.last_close)
+            returns[~np.isfinite(returns)] = 0.0
+
+            self.last_close = np.where(np.isnan(closes), self.last_close, closes)
+            self.last_time = pd.Timestamp(time)
+
+            oldest = self._returns[self._position]
+            if self.count >= self.window:
+                self._sum -= oldest
+                self._cross -= np.outer(oldest, oldest)
+            else:
+                self.count += 1
+
+            self._returns[self._position] = returns
+            self._sum += returns
+            self._cross += np.outer(returns, returns)
+            self._position = (self._position + 1) % self.window
+
+            self._updates_since_recompute += 1
+            if self._updates_since_recompute >= self.window:
+                self._recompute()
+
+    def _recompute(self):
+        """Rebuild the window sums from the return buffer"""
+        returns = self._returns[:self.count]
+        self._sum = returns.sum(axis=0)
+        self._cross = returns.T @ returns
+        self._updates_since_recompute = 0
+
+    def update_from_frames(self, frames, until=None):
+        """
+        Feed every bar newer than the last processed one that all series have reached
+
+        Bars after the earliest last bar of the frames are held back, so a
+        series that lags (e.g. the scanner cached it a bar earlier) gets its
+        bar before the window moves past it.
+
+        Args:
+            frames (dict): Pair -> OHLC DataFrame (pairs not tracked are ignored)
+            until (pd.Timestamp): Optional last bar of series with data that
+                are not in frames; later bars are held back too
+
+        Returns:
+            int: Number of bars added
+        """
+        series = {
+            pair: df['close'] for pair, df in frames.items()
+            if pair in self.pairs and df is not None and not df.empty
+        }
+
+        if not series:
+            return 0
+
+        closes = pd.concat(series, axis=1).reindex(columns=self.pairs)
+
+        last_bars = [s.index[-1] for s in series.values()]
+        if until is not None:
+            last_bars.append(pd.Timestamp(until))
+        closes = closes[closes.index <= min(last_bars)]
+
+        # Held across the whole batch so concurrent callers cannot feed the same bars twice
+        with self._lock:
+            if self.last_time is not None:
+                closes = closes[closes.index > self.last_time]
+
+            closes = closes.sort_index().ffill()
+
+            for time, row in zip(closes.index, closes.to_numpy(dtype=float)):
+                self.update(time, row)
+
+        return len(closes)
+
+    def correlation(self):
+        """
+        Get the correlation matrix of returns over the window
+
+        Returns:
+            np.ndarray: (pairs x pairs) correlation matrix (NaN for flat pairs)
+        """
+        with self._lock:
+            count = self.count
+            total = self._sum.copy()
+            cross = self._cross.copy()
+
+        if count < 2:
+            return np.full((len(self.pairs), len(self.pairs)), np.nan)
+
+        mean = total / count
+        cov = cross / count - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(std, std)
+
+        return np.clip(corr, -1, 1)
+
+    def currency_strength(self):
+        """
+        Get the strength index of each currency over the window
+
+        A currency's strength is the average window return of its pairs,
+        counted positive as base and negative as quote, in percent.
+
+        Returns:
+            dict: Currency -> strength
+        """
+        with self._lock:
+            total = self._sum.copy()
+
+        pairs_per_currency = np.abs(self._exposure).sum(axis=1)
+        strength = (self._exposure @ total) / pairs_per_currency * 100
+
+        return {
+            currency: round(float(value), 4)
+            for currency, value in zip(self.currencies, strength)
+        }
+
+    def to_dict(self):
+        """
+        Get the current state for serialization
+
+        Returns:
+            dict: Correlation matrix and currency strength
+        """
+        # One consistent state, even while another thread feeds bars
+        with self._lock:
+            corr = self.correlation()
+            strength = self.currency_strength()
+            count = self.count
+            last_time = self.last_time
+
+        return {
+            'pairs': self.pairs,
+            'window': self.window,
+            'bars': count,
+            'last_time': last_time.isoformat() if last_time is not None else None,
+            'correlation': [
+                [None if np.isnan(v) else round(float(v), 4) for v in row]
+                for row in corr
+            ],
+            'currency_strength': strength
+        }
@@ -0,0 +1,437 @@
+"""
+Columnar scan and signal history, stored as Parquet partitioned by month
+"""
+import atexit
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+from config import Config
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency: history is disabled without it
+    pa = ds = pq = None
+
+
+# Column name -> pyarrow type name, in file order
+SCAN_COLUMNS = {
+    'month': 'string',
+    'pair': 'string',
+    'timeframe': 'string',
+    'bar_time': 'timestamp',
+    'scanned_at': 'timestamp',
+    'current_price': 'float64',
+    'spread': 'float64',
+    'at_support': 'bool',
+    'at_resistance': 'bool',
+    'nearest_support': 'float64',
+    'nearest_resistance': 'float64',
+    'patterns': 'string',
+    'signals': 'int32'
+}
+
+SIGNAL_COLUMNS = {
+    'month': 'string',
+    'signal_id': 'string',
+    'event': 'string',
+    'recorded_at': 'timestamp',
+    'pair': 'string',
+    'timeframe': 'string',
+    'bar_time': 'timestamp',
+    'pattern': 'string',
+    'type': 'string',
+    'confidence': 'string',
+    'level': 'string',
+    'entry': 'float64',
+    'stop_loss': 'float64',
+    'take_profit': 'float64',
+    'risk_reward': 'float64',
+    'exit_price': 'float64',
+    'exit_time': 'timestamp'
+}
+
+TABLES = {'scans': SCAN_COLUMNS, 'signals': SIGNAL_COLUMNS}
+
+
+def _schema(columns):
+    """Build the pyarrow schema of a table"""
+    types = {
+        'string': pa.string(),
+        'float64': pa.float64(),
+        'int32': pa.int32(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us', tz='UTC')
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns.items()])
+
+
+def _utc(value):
+    """Convert a time to a UTC timestamp, treating naive times as UTC"""
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+def _months(start, end):
+    """
+    List the month partitions between two times
+
+    Args:
+        start (pd.Timestamp): First time
+        end (pd.Timestamp): Last time
+
+    Returns:
+        list: 'YYYY-MM' strings
+    """
+    periods = pd.period_range(start.tz_localize(None).to_period('M'), end.tz_localize(None).to_period('M'), freq='M')
+    return [str(p) for p in periods]
+
+
+class HistoryStore:
+    """
+    Append-only scan snapshots and signal events, queried by column and month
+
+    Rows are buffered in memory and written in batches, one file per table
+    and month; queries read the buffered rows alongside the files. A month
+    is compacted into one file, sorted by pair, timeframe and bar time into
+    full row groups, once it has compact_files files or has ended.
+    """
+
+    def __init__(self, root=None, flush_rows=5000, flush_interval=60.0, row_group_size=65536, compact_files=16):
+        """
+        Initialize history store
+
+        Args:
+            root (str): Directory holding the 'scans' and 'signals' datasets
+            flush_rows (int): Buffered rows that trigger a write
+            flush_interval (float): Seconds after which buffered rows are written
+            row_group_size (int): Rows per Parquet row group
+            compact_files (int): Files in a month that trigger its compaction
+        """
+        if pa is None:
+            raise ImportError("pyarrow is required for the history store (pip install pyarrow)")
+
+        self.root = root or Config.HISTORY_DIR
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.row_group_size = row_group_size
+        self.compact_files = compact_files
+
+        self.schemas = {table: _schema(columns) for table, columns in TABLES.items()}
+        self._buffers = {table: [] for table in TABLES}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        # Held while files are written or read, so a query never sees rows
+        # both buffered and on disk (or in neither)
+        self._io_lock = threading.Lock()
+
+        # Rows still buffered at shutdown are written out
+        atexit.register(self.flush)
+
+    def _append(self, table, rows):
+        """
+        Buffer rows, writing them out when the buffer is large or old enough
+
+        Args:
+            table (str): 'scans' or 'signals'
+            rows (list): Row dicts
+        """
+        with self._lock:
+            self._buffers[table].extend(rows)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            full = sum(len(buffer) for buffer in self._buffers.values()) >= self.flush_rows
+
+        if due or full:
+            self.flush()
+
+    def record_scan(self, result, bar_time):
+        """
+        Add a scan snapshot
+
+        Args:
+            result (dict): Result of ForexScanner.scan_pair
+            bar_time (pd.Timestamp): Time of the last closed candle scanned
+        """
+        bar_time = _utc(bar_time)
+        nearest_support = result.get('nearest_support') or []
+        nearest_resistance = result.get('nearest_resistance') or []
+        recent_patterns = result.get('recent_patterns') or []
+        level_info = result.get('level_info', {})
+
+        self._append('scans', [{
+            'month': bar_time.strftime('%Y-%m'),
+            'pair': result['pair'],
+            'timeframe': result['timeframe'],
+            'bar_time': bar_time,
+            'scanned_at': pd.Timestamp.now(tz='UTC'),
+            'current_price': result.get('current_price'),
+            'spread': result.get('spread'),
+            'at_support': bool(level_info.get('at_support', False)),
+            'at_resistance': bool(level_info.get('at_resistance', False)),
+            'nearest_support': nearest_support[0]['price'] if nearest_support else None,
+            'nearest_resistance': nearest_resistance[0]['price'] if nearest_resistance else None,
+            'patterns': ','.join(recent_patterns[-1]['patterns']) if recent_patterns else '',
+            'signals': len(result.get('signals', []))
+        }])
+
+    def record_signals(self, pair, timeframe, signals, event=None):
+        """
+        Add signal events
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+            signals (list): Signals or signal store records
+            event (str): Event name; defaults to the record's status, or
+                'open'/'watch' for fresh signals
+        """
+        now = pd.Timestamp.now(tz='UTC')
+        rows = []
+
+        for signal in signals:
+            bar_time = _utc(signal['bar_time'])
+            signal_type = signal['type']
+            default_event = 'open' if signal_type in ('BUY', 'SELL') else 'watch'
+
+            rows.append({
+                'month': bar_time.strftime('%Y-%m'),
+                'signal_id': f"{pair}|{timeframe}|{bar_time.isoformat()}|{signal['pattern']}",
+                'event': event or signal.get('status') or default_event,
+                'recorded_at': now,
+                'pair': pair,
+                'timeframe': timeframe,
+                'bar_time': bar_time,
+                'pattern': signal['pattern'],
+                'type': signal_type,
+                'confidence': signal.get('confidence'),
+                'level': {'BUY': 'support', 'SELL': 'resistance'}.get(signal_type),
+                'entry': signal.get('entry'),
+                'stop_loss': signal.get('stop_loss'),
+                'take_profit': signal.get('take_profit'),
+                'risk_reward': signal.get('risk_reward'),
+                'exit_price': signal.get('exit_price'),
+                'exit_time': _utc(signal['exit_time']) if signal.get('exit_time') else None
+            })
+
+        if rows:
+            self._append('signals', rows)
+
+    def _write(self, directory, arrow_table):
+        """Write a Parquet file into a month directory, atomically"""
+        # Files starting with '_' are skipped by dataset discovery until renamed
+        name = f"part-{uuid.uuid4().hex}.parquet"
+        tmp_path = os.path.join(directory, f"_{name}")
+        pq.write_table(arrow_table, tmp_path, row_group_size=self.row_group_size)
+        os.replace(tmp_path, os.path.join(directory, name))
+
+    @staticmethod
+    def _files(directory):
+        """List the visible Parquet files of a month directory"""
+        return [
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.endswith('.parquet') and not name.startswith(('_', '.'))
+        ]
+
+    def flush(self):
+        """Write buffered rows, one Parquet file per table and month, and compact months that are due"""
+        with self._io_lock:
+            with self._lock:
+                buffers = self._buffers
+                self._buffers = {table: [] for table in TABLES}
+                self._last_flush = time.monotonic()
+
+            for table, rows in buffers.items():
+                if not rows:
+                    continue
+
+                frame = pd.DataFrame(rows, columns=list(TABLES[table]))
+
+                for month, part in frame.groupby('month', sort=False):
+                    directory = os.path.join(self.root, table, f"month={month}")
+                    os.makedirs(directory, exist_ok=True)
+
+                    self._write(directory, pa.Table.from_pandas(
+                        part.drop(columns='month'),
+                        schema=self.schemas[table].remove(0),
+                        preserve_index=False
+                    ))
+
+            self._compact_due()
+
+    def _compact_due(self):
+        """Compact months with compact_files files, and ended months with more than one"""
+        current_month = pd.Timestamp.now(tz='UTC').strftime('%Y-%m')
+
+        for table in TABLES:
+            path = os.path.join(self.root, table)
+            if not os.path.isdir(path):
+                continue
+
+            for name in os.listdir(path):
+                if not name.startswith('month='):
+                    continue
+
+                files = self._files(os.path.join(path, name))
+                ended = name[len('month='):] < current_month
+
+                if len(files) >= self.compact_files or (ended and len(files) > 1):
+                    self._compact_month(table, os.path.join(path, name), files)
+
+    def _compact_month(self, table, directory, files):
+        """
+        Rewrite the files of a month as one file
+
+        Args:
+            table (str): 'scans' or 'signals'
+            directory (str): Month directory
+            files (list): Files to replace
+        """
+        schema = self.schemas[table].remove(0)
+        arrow_table = pa.concat_tables([pq.read_table(path, schema=schema) for path in files])
+        arrow_table = arrow_table.sort_by([('pair', 'ascending'), ('timeframe', 'ascending'),
+                                           ('bar_time', 'ascending')])
+
+        # A crash before the old files are removed leaves duplicate rows, never lost ones
+        self._write(directory, arrow_table)
+        for path in files:
+            os.remove(path)
+
+    def compact(self):
+        """Write buffered rows and rewrite every month with several files as one file"""
+        self.flush()
+
+        with self._io_lock:
+            for table in TABLES:
+                path = os.path.join(self.root, table)
+                if not os.path.isdir(path):
+                    continue
+
+                for name in os.listdir(path):
+                    files = self._files(os.path.join(path, name)) if name.startswith('month=') else []
+                    if len(files) > 1:
+                        self._compact_month(table, os.path.join(path, name), files)
+
+    def query(self, table, columns=None, filter=None, start=None, end=None):
+        """
+        Read rows, touching only the needed columns and month partitions
+
+        Rows not written yet are read from the buffer, so queries never
+        trigger a write.
+
+        Args:
+            table (str): 'scans' or 'signals'
+            columns (list): Columns to read (defaults to all)
+            filter (pyarrow.dataset.Expression): Optional row filter
+            start (datetime): Optional earliest bar time (inclusive)
+            end (datetime): Optional latest bar time (exclusive)
+
+        Returns:
+            pd.DataFrame: Matching rows
+        """
+        path = os.path.join(self.root, table)
+        schema = self.schemas[table]
+        expression = filter
+
+        if start is not None or end is not None:
+            start = _utc(start if start is not None else '1970-01-01')
+            end = _utc(end) if end is not None else pd.Timestamp.now(tz='UTC')
+
+            # The month partition key prunes files; bar_time trims the edge months
+            time_filter = (
+                ds.field('month').isin(_months(start, end)) &
+                (ds.field('bar_time') >= pa.scalar(start, type=schema.field('bar_time').type)) &
+                (ds.field('bar_time') < pa.scalar(end, type=schema.field('bar_time').type))
+            )
+            expression = time_filter if expression is None else expression & time_filter
+
+        with self._io_lock:
+            with self._lock:
+                rows = list(self._buffers[table])
+
+            buffered = pa.Table.from_pandas(
+                pd.DataFrame(rows, columns=schema.names), schema=schema, preserve_index=False
+            )
+            parts = [ds.dataset(buffered).to_table(columns=columns, filter=expression)]
+            if os.path.isdir(path):
+                dataset = ds.dataset(path, format='parquet', schema=schema, partitioning='hive')
+                parts.append(dataset.to_table(columns=columns, filter=expression))
+
+        return pa.concat_tables(parts).to_pandas()
+
+    def signal_outcomes(self, pattern=None, pair=None, timeframe=None, level=None, start=None, end=None):
+        """
+        Get the latest event of each signal
+
+        Args:
+            pattern (str): Optional pattern filter (e.g., 'bullish_engulfing')
+            pair (str): Optional pair filter
+            timeframe (str): Optional timeframe filter
+            level (str): Optional level filter ('support' or 'resistance')
+            start (datetime): Optional earliest signal bar time
+            end (datetime): Optional latest signal bar time
+
+        Returns:
+            pd.DataFrame: One row per signal with its latest event
+        """
+        expression = None
+        for column, value in (('pattern', pattern), ('pair', pair), ('timeframe', timeframe), ('level', level)):
+            if value is not None:
+                condition = ds.field(column) == value
+                expression = condition if expression is None else expression & condition
+
+        events = self.query(
+            'signals',
+            columns=['signal_id', 'event', 'recorded_at', 'pattern', 'pair', 'timeframe', 'bar_time', 'risk_reward'],
+            filter=expression,
+            start=start,
+            end=end
+        )
+
+        if events.empty:
+            return events
+
+        return events.sort_values('recorded_at').drop_duplicates('signal_id', keep='last')
+
+    def win_rate(self, pattern=None, pair=None, timeframe=None, level=None, start=None, end=None, months=None):
+        """
+        Get the win rate of closed signals
+
+        Example: win rate of bullish_engulfing at support on GBP_USD H4 over 6 months:
+            store.win_rate('bullish_engulfing', 'GBP_USD', 'H4', level='support', months=6)
+
+        Args:
+            pattern (str): Optional pattern filter
+            pair (str): Optional pair filter
+            timeframe (str): Optional timeframe filter
+            level (str): Optional level filter ('support' or 'resistance')
+            start (datetime): Optional earliest signal bar time
+            end (datetime): Optional latest signal bar time
+            months (int): Shortcut for start = now - months
+
+        Returns:
+            dict: Signal counts, wins, losses and win rate
+        """
+        if months is not None:
+            start = pd.Timestamp.now(tz='UTC') - pd.DateOffset(months=months)
+
+        outcomes = self.signal_outcomes(pattern, pair, timeframe, level, start, end)
+        events = outcomes['event'] if not outcomes.empty else pd.Series(dtype=str)
+
+        wins = int((events == 'hit_tp').sum())
+        losses = int((events == 'hit_sl').sum())
+        closed = wins + losses
+
+        return {
+            'pattern': pattern,
+            'pair': pair,
+            'timeframe': timeframe,
+            'level': level,
+            'signals': int(len(outcomes)),
+            'open': int((events == 'open').sum()),
+            'wins': wins,
+            'losses': losses,
+            'win_rate': round(wins / closed * 100, 2) if closed else 0
+        }
@@ -0,0 +1,321 @@
+"""
+Instrument metadata (pip size, precision, margin) and vectorized risk math
+"""
+import json
+import os
+import threading
+import numpy as np
+from config import Config
+
+
+# Pip size used when the instrument is unknown (e.g., a backtest on unnamed candles)
+DEFAULT_PIP_SIZE = 0.0001
+
+# Quote currencies whose pip is the second decimal
+TWO_DECIMAL_QUOTES = ('JPY', 'HUF')
+
+# Margin rate of the majors; other currency pairs default to 5%
+MAJOR_MARGIN_RATE = 0.0333
+CROSS_MARGIN_RATE = 0.05
+
+# Stand-in for non-currency instruments when the API table is not available
+STANDARD_INSTRUMENTS = {
+    'XAU_USD': {'type': 'METAL', 'pipLocation': -2, 'displayPrecision': 3, 'marginRate': 0.05, 'tradeUnitsPrecision': 0},
+    'XAG_USD': {'type': 'METAL', 'pipLocation': -4, 'displayPrecision': 5, 'marginRate': 0.1, 'tradeUnitsPrecision': 0},
+    'XAU_EUR': {'type': 'METAL', 'pipLocation': -2, 'displayPrecision': 3, 'marginRate': 0.05, 'tradeUnitsPrecision': 0},
+    'XPT_USD': {'type': 'METAL', 'pipLocation': -2, 'displayPrecision': 3, 'marginRate': 0.05, 'tradeUnitsPrecision': 0},
+    'XPD_USD': {'type': 'METAL', 'pipLocation': -2, 'displayPrecision': 3, 'marginRate': 0.05, 'tradeUnitsPrecision': 0},
+}
+
+
+def _currency_metadata(name):
+    """
+    Derive metadata of a currency pair from its quote currency
+
+    Args:
+        name (str): Instrument name (e.g., 'EUR_JPY')
+
+    Returns:
+        dict: Instrument metadata
+    """
+    quote = name.split('_')[-1]
+    two_decimals = quote in TWO_DECIMAL_QUOTES
+
+    return {
+        'type': 'CURRENCY',
+        'pipLocation': -2 if two_decimals else -4,
+        'displayPrecision': 3 if two_decimals else 5,
+        'marginRate': MAJOR_MARGIN_RATE if name in Config.DEFAULT_PAIRS else CROSS_MARGIN_RATE,
+        'tradeUnitsPrecision': 0
+    }
+
+
+def _normalize(instrument):
+    """Convert an API instrument dict to numeric metadata"""
+    return {
+        'type': instrument.get('type', 'CURRENCY'),
+        'pipLocation': int(instrument['pipLocation']),
+        'displayPrecision': int(instrument.get('displayPrecision', 5)),
+        'marginRate': float(instrument.get('marginRate', CROSS_MARGIN_RATE)),
+        'tradeUnitsPrecision': int(instrument.get('tradeUnitsPrecision', 0))
+    }
+
+
+def risk_reward(entries, stop_losses, take_profits, pip_sizes):
+    """
+    Calculate risk/reward for many trades at once
+
+    Args:
+        entries (array-like): Entry prices
+        stop_losses (array-like): Stop loss prices
+        take_profits (array-like): Take profit prices
+        pip_sizes (array-like): Pip size of each trade's instrument
+
+    Returns:
+        dict: 'risk', 'reward', 'risk_reward_ratio', 'risk_pips' and
+            'reward_pips' arrays
+    """
+    entries = np.asarray(entries, dtype=float)
+    risk = np.abs(entries - np.asarray(stop_losses, dtype=float))
+    reward = np.abs(np.asarray(take_profits, dtype=float) - entries)
+    pip_sizes = np.asarray(pip_sizes, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(risk > 0, reward / risk, 0.0)
+
+    return {
+        'risk': risk,
+        'reward': reward,
+        'risk_reward_ratio': np.round(ratio, 2),
+        'risk_pips': np.round(risk / pip_sizes, 1),
+        'reward_pips': np.round(reward / pip_sizes, 1)
+    }
+
+
+def conversion_pairs(instrument, account_currency=None):
+    """
+    List the instruments whose price converts an instrument's quote currency to the account currency
+
+    Args:
+        instrument (str): Instrument name
+        account_currency (str): Account currency (defaults to Config.ACCOUNT_CURRENCY)
+
+    Returns:
+        list: Candidate instruments, empty if the instrument's own price suffices
+    """
+    account_currency = account_currency or Config.ACCOUNT_CURRENCY
+    quote = instrument.split('_')[-1]
+    candidates = [f"{quote}_{account_currency}", f"{account_currency}_{quote}"]
+
+    if quote == account_currency or instrument in candidates:
+        return []
+
+    return candidates
+
+
+def conversion_rates(instruments, prices, account_currency=None):
+    """
+    Get the rate converting each instrument's quote currency to the account currency
+
+    Args:
+        instruments (list): Instrument names
+        prices (dict): Instrument -> current mid price, used for conversion
+        account_currency (str): Account currency (defaults to Config.ACCOUNT_CURRENCY)
+
+    Returns:
+        np.ndarray: Rates, NaN where no price allows the conversion
+    """
+    account_currency = account_currency or Config.ACCOUNT_CURRENCY
+    rates = np.full(len(instruments), np.nan)
+
+    for k, name in enumerate(instruments):
+        quote = name.split('_')[-1]
+
+        if quote == account_currency:
+            rates[k] = 1.0
+        elif f"{quote}_{account_currency}" in prices:
+            rates[k] = prices[f"{quote}_{account_currency}"]
+        elif f"{account_currency}_{quote}" in prices:
+            rates[k] = 1.0 / prices[f"{account_currency}_{quote}"]
+
+    return rates
+
+
+class InstrumentTable:
+    """Metadata per instrument, loaded once from OANDA or a local stand-in"""
+
+    def __init__(self, instruments=None):
+        """
+        Initialize instrument table
+
+        Args:
+            instruments (dict): Instrument name -> metadata with 'pipLocation',
+                'displayPrecision', 'marginRate' and 'tradeUnitsPrecision'
+        """
+        self.instruments = dict(instruments or {})
+
+    @classmethod
+    def load(cls, path=None, client=None):
+        """
+        Load the table from the API (saving it), else from a JSON file, else the stand-in
+
+        Args:
+            path (str): JSON file (defaults to Config.INSTRUMENTS_PATH)
+            client (OandaClient): Client to fetch the table with; without one
+                the saved file is used
+
+        Returns:
+            InstrumentTable: Loaded table
+        """
+        path = path or Config.INSTRUMENTS_PATH
+
+        if client is not None:
+            try:
+                instruments = client.get_instruments()
+            except Exception as e:
+                print(f"Error fetching instruments: {str(e)} (using the saved table)")
+                instruments = None
+
+            if instruments:
+                table = cls({instrument['name']: _normalize(instrument) for instrument in instruments})
+                table.save(path)
+                return table
+
+        if os.path.exists(path):
+            with open(path) as f:
+                return cls({name: _normalize(meta) for name, meta in json.load(f).items()})
+
+        return cls(STANDARD_INSTRUMENTS)
+
+    def save(self, path=None):
+        """
+        Write the table to a JSON file
+
+        Args:
+            path (str): JSON file (defaults to Config.INSTRUMENTS_PATH)
+        """
+        path = path or Config.INSTRUMENTS_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.instruments, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def get(self, name):
+        """
+        Get an instrument's metadata
+
+        Instruments missing from the table are treated as currency pairs.
+
+        Args:
+            name (str): Instrument name
+
+        Returns:
+            dict: Instrument metadata
+        """
+        meta = self.instruments.get(name)
+        if meta is None:
+            meta = _currency_metadata(name)
+        return meta
+
+    def pip_size(self, name):
+        """Get the price change of one pip (e.g., 0.0001 or 0.01)"""
+        return 10.0 ** self.get(name)['pipLocation']
+
+    def pip_sizes(self, names):
+        """Get the pip size of each instrument as an array"""
+        return np.array([self.pip_size(name) for name in names], dtype=float)
+
+    def margin_rates(self, names):
+        """Get the margin rate of each instrument as an array"""
+        return np.array([self.get(name)['marginRate'] for name in names], dtype=float)
+
+    def size_positions(self, instruments, entries, stop_losses, take_profits, account_size, risk_percent,
+                       prices=None, account_currency=None):
+        """
+        Size positions and calculate risk/reward for many trades on many pairs
+
+        Units are chosen so that a stop-out loses risk_percent of the account
+        in the account currency. Trades whose quote currency no price in
+        prices converts get NaN sizes and a message in 'errors'.
+
+        Args:
+            instruments (list): Instrument of each trade
+            entries (array-like): Entry prices
+            stop_losses (array-like): Stop loss prices
+            take_profits (array-like): Take profit prices
+            account_size (float): Account balance in the account currency
+            risk_percent (float or array-like): Risk percentage per trade
+            prices (dict): Current mid prices used to convert quote currencies
+                (each trade's entry is used for its own instrument)
+            account_currency (str): Account currency (defaults to Config.ACCOUNT_CURRENCY)
+
+        Returns:
+            dict: Risk/reward arrays plus 'pip_size', 'risk_amount', 'units',
+                'position_size_lots', 'margin_required', 'potential_profit'
+                and 'errors' (None for each trade that could be sized)
+        """
+        account_currency = account_currency or Config.ACCOUNT_CURRENCY
+        instruments = list(instruments)
+        entries = np.asarray(entries, dtype=float)
+        pip_sizes = self.pip_sizes(instruments)
+
+        rr = risk_reward(entries, stop_losses, take_profits, pip_sizes)
+
+        prices = {**(prices or {}), **dict(zip(instruments, entries))}
+        rates = conversion_rates(instruments, prices, account_currency)
+        precision = np.array([self.get(name)['tradeUnitsPrecision'] for name in instruments])
+        scale = 10.0 ** precision
+
+        risk_amount = account_size * (np.asarray(risk_percent, dtype=float) / 100)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            units = np.where(rr['risk'] > 0, risk_amount / (rr['risk'] * rates), 0.0)
+        # Round off float noise before flooring (e.g., 49999.9999 units for 50000)
+        units = np.floor(np.round(units * scale, 6)) / scale
+
+        errors = [
+            f"No price converts {name.split('_')[-1]} to {account_currency}" if np.isnan(rate) else None
+            for name, rate in zip(instruments, rates)
+        ]
+
+        return {
+            **rr,
+            'pip_size': pip_sizes,
+            'risk_amount': np.round(np.broadcast_to(risk_amount, entries.shape), 2),
+            'units': units,
+            'position_size_lots': np.round(units / 100000, 2),  # Standard lots
+            'margin_required': np.round(units * entries * rates * self.margin_rates(instruments), 2),
+            'potential_profit': np.round(units * rr['reward'] * rates, 2),
+            'errors': errors
+        }
+
+
+_default_instruments = None
+_default_instruments_lock = threading.Lock()
+
+
+def default_instruments(client=None):
+    """
+    Get the process-wide instrument table
+
+    The table is loaded on first use from the API, else the saved file,
+    else the stand-in, whichever caller comes first: without a client one
+    is created when an API key is configured.
+
+    Args:
+        client (OandaClient): Client used to fetch the table the first time
+
+    Returns:
+        InstrumentTable: Shared table
+    """
+    global _default_instruments
+
+    with _default_instruments_lock:
+        if _default_instruments is None:
+            if client is None and Config.OANDA_API_KEY:
+                from src.oanda_client import OandaClient
+                client = OandaClient()
+            _default_instruments = InstrumentTable.load(client=client)
+        return _default_instruments
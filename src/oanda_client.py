@@ -2,28 +2,90 @@
 OANDA API Client for fetching forex data
 """
 import oandapyV20
+import oandapyV20.endpoints.accounts as accounts
 import oandapyV20.endpoints.instruments as instruments
+import oandapyV20.endpoints.pricing as pricing
 import pandas as pd
 from datetime import datetime, timedelta
 from config import Config
+from src.request_scheduler import default_scheduler, raise_for_rate_limit, PRIORITY_LIVE, PRIORITY_BACKFILL
+from src.replay import REPLAY_ENVIRONMENT, SessionRecorder, register_replay_environment
 
 
 class OandaClient:
-    """Client for interacting with OANDA API"""
+    """
+    Client for interacting with OANDA API
 
-    def __init__(self):
-        """Initialize OANDA client"""
+    Requests go through the scheduler's retries; errors left after them
+    (V20Error, RateLimitError, connection errors) are raised to the caller.
+    """
+
+    def __init__(self, scheduler=None, recorder=None):
+        """
+        Initialize OANDA client
+
+        Args:
+            scheduler (RequestScheduler): Request scheduler (defaults to the shared one)
+            recorder (SessionRecorder): Saves every response for offline replay
+                (defaults to one in Config.OANDA_RECORD_DIR when OANDA_RECORD is set)
+        """
+        self.scheduler = scheduler or default_scheduler()
+        self.recorder = recorder or (SessionRecorder() if Config.OANDA_RECORD else None)
         self.api_key = Config.OANDA_API_KEY
         self.account_id = Config.OANDA_ACCOUNT_ID
         self.environment = Config.OANDA_ENVIRONMENT
 
+        if self.environment == REPLAY_ENVIRONMENT:
+            register_replay_environment(replace=False)
+
         # Initialize OANDA API client
         self.client = oandapyV20.API(
             access_token=self.api_key,
             environment=self.environment
         )
+        # Keeps 429 responses' Retry-After header for the scheduler's backoff
+        self.client.client.hooks['response'].append(raise_for_rate_limit)
+
+    def _request(self, endpoint_factory, key, priority):
+        """
+        Perform a request through the rate-limit scheduler
+
+        Args:
+            endpoint_factory (callable): Builds a fresh endpoint for each attempt
+            key (tuple): Request identity, used to coalesce duplicate requests
+            priority (int): Scheduler priority lane
+
+        Returns:
+            dict: API response
+        """
+        return self.scheduler.submit(
+            lambda: self._perform(endpoint_factory()),
+            key=key,
+            priority=priority
+        )
 
-    def get_candles(self, instrument, granularity='H1', count=500):
+    def _perform(self, endpoint):
+        """
+        Send one request, recording the response when a recorder is set
+
+        Args:
+            endpoint (APIRequest): oandapyV20 endpoint
+
+        Returns:
+            dict: API response
+        """
+        response = self.client.request(endpoint)
+
+        if self.recorder is not None:
+            self.recorder.record(endpoint, response)
+
+        return response
+
+    def scheduler_metrics(self):
+        """Get queue depth and wait-time metrics of the request scheduler"""
+        return self.scheduler.metrics()
+
+    def get_candles(self, instrument, granularity='H1', count=500, priority=PRIORITY_LIVE):
         """
         Fetch candlestick data from OANDA
 
@@ -31,6 +93,7 @@ class OandaClient:
             instrument (str): Forex pair (e.g., 'EUR_USD')
             granularity (str): Timeframe ('M15', 'H1', 'H4', 'D')
             count (int): Number of candles to fetch (max 5000)
+            priority (int): Scheduler priority lane (live scans before backfill)
 
         Returns:
             pd.DataFrame: OHLCV data
@@ -41,68 +104,117 @@ class OandaClient:
             'price': 'M'  # Mid prices
         }
 
-        try:
-            request = instruments.InstrumentsCandles(
-                instrument=instrument,
-                params=params
-            )
+        response = self._request(
+            lambda: instruments.InstrumentsCandles(instrument=instrument, params=dict(params)),
+            key=('candles', instrument, granularity, count),
+            priority=priority
+        )
+
+        return self._candles_to_dataframe(response.get('candles', []))
+
+    def get_candles_range(self, instrument, granularity, start, end, priority=PRIORITY_BACKFILL):
+        """
+        Fetch candles between two times
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            start (datetime): First candle time (inclusive)
+            end (datetime): Last candle time; at most 5000 candles may fit in the window
+            priority (int): Scheduler priority lane
+
+        Returns:
+            pd.DataFrame: OHLCV data of complete candles
+        """
+        params = {
+            'granularity': granularity,
+            'from': pd.Timestamp(start).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'to': pd.Timestamp(end).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'price': 'M'
+        }
+
+        response = self._request(
+            lambda: instruments.InstrumentsCandles(instrument=instrument, params=dict(params)),
+            key=('candles', instrument, granularity, params['from'], params['to']),
+            priority=priority
+        )
+
+        return self._candles_to_dataframe(response.get('candles', []))
 
-            response = self.client.request(request)
+    def get_instruments(self, priority=PRIORITY_BACKFILL):
+        """
+        Get the tradeable instruments of the account
 
-            # Convert to DataFrame
-            candles = response.get('candles', [])
+        Args:
+            priority (int): Scheduler priority lane
 
-            data = []
-            for candle in candles:
-                if candle['complete']:
-                    data.append({
-                        'time': candle['time'],
-                        'open': float(candle['mid']['o']),
-                        'high': float(candle['mid']['h']),
-                        'low': float(candle['mid']['l']),
-                        'close': float(candle['mid']['c']),
-                        'volume': int(candle['volume'])
-                    })
+        Returns:
+            list: Instrument dicts (name, pipLocation, displayPrecision, marginRate, ...)
+        """
+        response = self._request(
+            lambda: accounts.AccountInstruments(accountID=self.account_id),
+            key=('instruments', self.account_id),
+            priority=priority
+        )
 
-            df = pd.DataFrame(data)
-            df['time'] = pd.to_datetime(df['time'])
-            df.set_index('time', inplace=True)
+        return response.get('instruments', [])
 
-            return df
+    @staticmethod
+    def _candles_to_dataframe(candles):
+        """
+        Convert OANDA candles to a DataFrame, keeping complete candles only
 
-        except Exception as e:
-            print(f"Error fetching candles for {instrument}: {str(e)}")
-            return None
+        Args:
+            candles (list): Candles from an InstrumentsCandles response
 
-    def get_current_price(self, instrument):
+        Returns:
+            pd.DataFrame: OHLCV data indexed by time
+        """
+        data = []
+        for candle in candles:
+            if candle['complete']:
+                data.append({
+                    'time': candle['time'],
+                    'open': float(candle['mid']['o']),
+                    'high': float(candle['mid']['h']),
+                    'low': float(candle['mid']['l']),
+                    'close': float(candle['mid']['c']),
+                    'volume': int(candle['volume'])
+                })
+
+        df = pd.DataFrame(data, columns=['time', 'open', 'high', 'low', 'close', 'volume'])
+        df['time'] = pd.to_datetime(df['time'], utc=True)
+        df.set_index('time', inplace=True)
+
+        return df
+
+    def get_current_price(self, instrument, priority=PRIORITY_LIVE):
         """
         Get current price for an instrument
 
         Args:
             instrument (str): Forex pair
+            priority (int): Scheduler priority lane
 
         Returns:
-            dict: Current bid/ask prices
+            dict: Current bid/ask prices, or None if no price is quoted
         """
-        try:
-            request = instruments.InstrumentsPricing(
+        response = self._request(
+            lambda: pricing.PricingInfo(
                 accountID=self.account_id,
                 params={'instruments': instrument}
-            )
-
-            response = self.client.request(request)
-            prices = response.get('prices', [])
-
-            if prices:
-                price = prices[0]
-                return {
-                    'bid': float(price['bids'][0]['price']),
-                    'ask': float(price['asks'][0]['price']),
-                    'spread': float(price['asks'][0]['price']) - float(price['bids'][0]['price'])
-                }
+            ),
+            key=('pricing', instrument),
+            priority=priority
+        )
+        prices = response.get('prices', [])
 
-            return None
+        if prices:
+            price = prices[0]
+            return {
+                'bid': float(price['bids'][0]['price']),
+                'ask': float(price['asks'][0]['price']),
+                'spread': float(price['asks'][0]['price']) - float(price['bids'][0]['price'])
+            }
 
-        except Exception as e:
-            print(f"Error fetching price for {instrument}: {str(e)}")
-            return None
+        return None
@@ -0,0 +1,145 @@
+"""
+Multi-process pattern backtests over candles shared between workers
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.backtester import Backtester
+from src.analysis_context import AnalysisContext
+from src.pattern_registry import default_registry
+from src.oanda_client import OandaClient
+from src.candle_store import CandleStore
+from src.shared_candles import SharedCandleRegistry, init_worker, shared_candles
+from config import Config
+
+
+def _backtest_series(pair, timeframe, patterns, initial_balance, risk_per_trade, min_rr):
+    """
+    Backtest every pattern on one published series (runs in a worker)
+
+    Args:
+        pair (str): Forex pair
+        timeframe (str): Timeframe
+        patterns (list): Patterns to test
+        initial_balance (float): Starting account balance
+        risk_per_trade (float): Risk percentage per trade
+        min_rr (float): Minimum risk/reward ratio
+
+    Returns:
+        dict: Pattern -> backtest results
+    """
+    df = shared_candles(pair, timeframe)
+    backtester = Backtester(initial_balance=initial_balance, risk_per_trade=risk_per_trade)
+    context = AnalysisContext(df, pair=pair, timeframe=timeframe)
+
+    return {
+        pattern: backtester.backtest_pattern(df, pattern, min_rr=min_rr, context=context)
+        for pattern in patterns
+    }
+
+
+def run_parallel_backtest(pairs=None, timeframe='H4', patterns=None, workers=None, store=None,
+                          initial_balance=10000, risk_per_trade=1.0, min_rr=1.5):
+    """
+    Backtest patterns on many pairs, one worker process per pair at a time
+
+    The parent loads each pair once (from the candle store when available,
+    else the last 5000 candles from OANDA) into shared memory; workers
+    attach to it instead of receiving a pickled copy, so adding workers
+    does not multiply the memory used by candles.
+
+    Args:
+        pairs (list): Forex pairs (defaults to Config.DEFAULT_PAIRS)
+        timeframe (str): Timeframe
+        patterns (list): Patterns to test
+        workers (int): Worker processes (defaults to the CPU count)
+        store (CandleStore): Candle store to load from
+        initial_balance (float): Starting account balance
+        risk_per_trade (float): Risk percentage per trade
+        min_rr (float): Minimum risk/reward ratio
+
+    Returns:
+        dict: Results per pair and pattern
+    """
+    if pairs is None:
+        pairs = Config.DEFAULT_PAIRS
+    if patterns is None:
+        patterns = default_registry.directional_groups()
+
+    store = store or CandleStore()
+    client = None
+    results = {}
+
+    with SharedCandleRegistry(store) as registry:
+        for pair in pairs:
+            if store.has(pair, timeframe) and registry.load(pair, timeframe):
+                continue
+
+            client = client or OandaClient()
+            print(f"Fetching {pair} {timeframe}...")
+            try:
+                df = client.get_candles(pair, granularity=timeframe, count=5000)
+            except Exception as e:
+                results[pair] = {'error': f"Unable to fetch data: {str(e)}"}
+                continue
+
+            if df is None or df.empty:
+                results[pair] = {'error': 'Unable to fetch data'}
+            else:
+                registry.publish(pair, timeframe, df)
+
+        handles = registry.handles()
+        if not handles:
+            return {'error': 'Unable to fetch data'}
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_worker,
+                                 initargs=(handles,)) as executor:
+            futures = {
+                pair: executor.submit(_backtest_series, pair, timeframe, patterns,
+                                      initial_balance, risk_per_trade, min_rr)
+                for pair, _ in handles
+            }
+            for pair, future in futures.items():
+                results[pair] = future.result()
+
+    return {
+        'pairs': pairs,
+        'timeframe': timeframe,
+        'initial_balance': initial_balance,
+        'results': {pair: results[pair] for pair in pairs if pair in results}
+    }
+
+
+def main():
+    """Run parallel backtests from the command line"""
+    parser = argparse.ArgumentParser(description='Backtest patterns on many pairs with worker processes')
+    parser.add_argument('--pairs', default=','.join(Config.DEFAULT_PAIRS), help='Comma-separated instruments')
+    parser.add_argument('--timeframe', default='H4')
+    parser.add_argument('--patterns', help='Comma-separated patterns (defaults to every directional group)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (defaults to the CPU count)')
+    parser.add_argument('--min-rr', type=float, default=1.5, help='Minimum risk/reward ratio')
+    args = parser.parse_args()
+
+    output = run_parallel_backtest(
+        pairs=args.pairs.split(','),
+        timeframe=args.timeframe,
+        patterns=args.patterns.split(',') if args.patterns else None,
+        workers=args.workers,
+        min_rr=args.min_rr
+    )
+
+    if 'error' in output:
+        print(output['error'])
+        return
+
+    for pair, results in output['results'].items():
+        if 'error' in results:
+            print(f"{pair}: {results['error']}")
+            continue
+        for pattern, result in results.items():
+            print(f"{pair} {pattern}: {result['total_trades']} trades, "
+                  f"win rate {result['win_rate']}%, return {result['total_return']}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,90 @@
 """
 Candlestick Pattern Detection for Price Action Trading
 """
-import pandas as pd
 import numpy as np
+from src.pattern_registry import CandleFeatures, default_registry
 
 
 class PatternDetector:
     """Detect candlestick patterns for price action trading"""
 
-    def __init__(self, df):
+    def __init__(self, df, registry=None, features=None, masks=None):
         """
         Initialize pattern detector
 
         Args:
             df (pd.DataFrame): OHLC data
+            registry (PatternRegistry): Patterns to detect (defaults to the built-in ones)
+            features (CandleFeatures): Optional precomputed features for df (e.g., from a batch)
+            masks (dict): Optional precomputed default-parameter pattern masks for df
         """
         self.df = df.copy()
-        self._calculate_candle_properties()
+        self.registry = registry or default_registry
+        self.masks = {}
+        self._precomputed_masks = masks or {}
+        self._calculate_candle_properties(features)
 
-    def _calculate_candle_properties(self):
-        """Calculate candle body, wicks, and ranges"""
-        self.df['body'] = abs(self.df['close'] - self.df['open'])
-        self.df['range'] = self.df['high'] - self.df['low']
-        self.df['upper_wick'] = self.df['high'] - self.df[['open', 'close']].max(axis=1)
-        self.df['lower_wick'] = self.df[['open', 'close']].min(axis=1) - self.df['low']
-        self.df['body_position'] = (self.df['close'] - self.df['open']).apply(lambda x: 'bullish' if x > 0 else 'bearish')
+    def _calculate_candle_properties(self, features=None):
+        """
+        Calculate candle body, wicks, and ranges
+
+        Args:
+            features (CandleFeatures): Optional precomputed features
+        """
+        self.features = features or CandleFeatures(
+            self.df['open'].values,
+            self.df['high'].values,
+            self.df['low'].values,
+            self.df['close'].values
+        )
+
+        self.df['body'] = self.features['body']
+        self.df['range'] = self.features['range']
+        self.df['upper_wick'] = self.features['upper_wick']
+        self.df['lower_wick'] = self.features['lower_wick']
+        self.df['body_position'] = np.where(self.features['bullish'], 'bullish', 'bearish')
+
+    def _apply_patterns(self, names, params=None):
+        """
+        Evaluate patterns and write their family columns
+
+        Each family gets a boolean flag column and, when it has more than one
+        pattern, a '<column>_type' column naming the first matching pattern.
+
+        Args:
+            names (list): Pattern names to evaluate
+            params (dict): Optional per-pattern parameter overrides
+
+        Returns:
+            dict: Family column -> boolean Series
+        """
+        if params is None and all(name in self._precomputed_masks for name in names):
+            masks = {name: self._precomputed_masks[name] for name in names}
+        else:
+            masks = self.registry.compile(names, params).evaluate(self.features)
+        self.masks.update(masks)
+
+        flags = {}
+        for group, group_names in self.registry.groups().items():
+            evaluated = [name for name in group_names if name in masks]
+            if not evaluated:
+                continue
+
+            column = self.registry.get(evaluated[0]).column
+            flag = np.zeros(len(self.df), dtype=bool)
+            pattern_type = np.full(len(self.df), None, dtype=object)
+
+            for name in evaluated:
+                pattern_type[masks[name] & ~flag] = name
+                flag |= masks[name]
+
+            self.df[column] = flag
+            if len(group_names) > 1:
+                self.df[f'{column}_type'] = pattern_type
+
+            flags[group] = self.df[column]
+
+        return flags
 
     def detect_pin_bar(self, wick_ratio=2.0, body_ratio=0.3):
         """
@@ -37,26 +97,10 @@ class PatternDetector:
         Returns:
             pd.Series: Boolean series indicating pin bars
         """
-        # Bullish Pin Bar (Hammer) - long lower wick
-        bullish_pin = (
-            (self.df['lower_wick'] >= self.df['body'] * wick_ratio) &
-            (self.df['body'] <= self.df['range'] * body_ratio) &
-            (self.df['upper_wick'] <= self.df['body'])
-        )
-
-        # Bearish Pin Bar (Shooting Star) - long upper wick
-        bearish_pin = (
-            (self.df['upper_wick'] >= self.df['body'] * wick_ratio) &
-            (self.df['body'] <= self.df['range'] * body_ratio) &
-            (self.df['lower_wick'] <= self.df['body'])
-        )
+        params = {'wick_ratio': wick_ratio, 'body_ratio': body_ratio}
+        names = self.registry.resolve('pin_bar')
 
-        pin_bars = bullish_pin | bearish_pin
-        self.df['pin_bar'] = pin_bars
-        self.df['pin_bar_type'] = np.where(bullish_pin, 'bullish_hammer',
-                                   np.where(bearish_pin, 'bearish_shooting_star', None))
-
-        return pin_bars
+        return self._apply_patterns(names, {name: params for name in names})['pin_bar']
 
     def detect_engulfing(self):
         """
@@ -65,38 +109,7 @@ class PatternDetector:
         Returns:
             pd.Series: Boolean series indicating engulfing patterns
         """
-        engulfing = pd.Series(False, index=self.df.index)
-        engulfing_type = pd.Series(None, index=self.df.index)
-
-        for i in range(1, len(self.df)):
-            prev_body = self.df['body'].iloc[i-1]
-            curr_body = self.df['body'].iloc[i]
-
-            prev_open = self.df['open'].iloc[i-1]
-            prev_close = self.df['close'].iloc[i-1]
-            curr_open = self.df['open'].iloc[i]
-            curr_close = self.df['close'].iloc[i]
-
-            # Bullish Engulfing
-            if (prev_close < prev_open and  # Previous bearish
-                curr_close > curr_open and  # Current bullish
-                curr_open <= prev_close and  # Opens at/below previous close
-                curr_close >= prev_open):    # Closes at/above previous open
-                engulfing.iloc[i] = True
-                engulfing_type.iloc[i] = 'bullish_engulfing'
-
-            # Bearish Engulfing
-            elif (prev_close > prev_open and  # Previous bullish
-                  curr_close < curr_open and  # Current bearish
-                  curr_open >= prev_close and  # Opens at/above previous close
-                  curr_close <= prev_open):    # Closes at/below previous open
-                engulfing.iloc[i] = True
-                engulfing_type.iloc[i] = 'bearish_engulfing'
-
-        self.df['engulfing'] = engulfing
-        self.df['engulfing_type'] = engulfing_type
-
-        return engulfing
+        return self._apply_patterns(self.registry.resolve('engulfing'))['engulfing']
 
     def detect_inside_bar(self):
         """
@@ -105,21 +118,7 @@ class PatternDetector:
         Returns:
             pd.Series: Boolean series indicating inside bars
         """
-        inside_bars = pd.Series(False, index=self.df.index)
-
-        for i in range(1, len(self.df)):
-            prev_high = self.df['high'].iloc[i-1]
-            prev_low = self.df['low'].iloc[i-1]
-            curr_high = self.df['high'].iloc[i]
-            curr_low = self.df['low'].iloc[i]
-
-            # Current candle completely inside previous candle
-            if curr_high <= prev_high and curr_low >= prev_low:
-                inside_bars.iloc[i] = True
-
-        self.df['inside_bar'] = inside_bars
-
-        return inside_bars
+        return self._apply_patterns(self.registry.resolve('inside_bar'))['inside_bar']
 
     def detect_doji(self, body_ratio=0.1):
         """
@@ -131,10 +130,7 @@ class PatternDetector:
         Returns:
             pd.Series: Boolean series indicating dojis
         """
-        dojis = self.df['body'] <= self.df['range'] * body_ratio
-        self.df['doji'] = dojis
-
-        return dojis
+        return self._apply_patterns(['doji'], {'doji': {'body_ratio': body_ratio}})['doji']
 
     def detect_morning_evening_star(self):
         """
@@ -143,50 +139,21 @@ class PatternDetector:
         Returns:
             pd.Series: Boolean series indicating star patterns
         """
-        stars = pd.Series(False, index=self.df.index)
-        star_type = pd.Series(None, index=self.df.index)
-
-        for i in range(2, len(self.df)):
-            candle1_open = self.df['open'].iloc[i-2]
-            candle1_close = self.df['close'].iloc[i-2]
-            candle2_body = self.df['body'].iloc[i-1]
-            candle2_range = self.df['range'].iloc[i-1]
-            candle3_open = self.df['open'].iloc[i]
-            candle3_close = self.df['close'].iloc[i]
-
-            # Morning Star (bullish reversal)
-            if (candle1_close < candle1_open and  # First candle bearish
-                candle2_body <= candle2_range * 0.3 and  # Second candle small (star)
-                candle3_close > candle3_open and  # Third candle bullish
-                candle3_close > (candle1_open + candle1_close) / 2):  # Closes above midpoint
-                stars.iloc[i] = True
-                star_type.iloc[i] = 'morning_star'
+        return self._apply_patterns(self.registry.resolve('morning_evening_star'))['morning_evening_star']
 
-            # Evening Star (bearish reversal)
-            elif (candle1_close > candle1_open and  # First candle bullish
-                  candle2_body <= candle2_range * 0.3 and  # Second candle small (star)
-                  candle3_close < candle3_open and  # Third candle bearish
-                  candle3_close < (candle1_open + candle1_close) / 2):  # Closes below midpoint
-                stars.iloc[i] = True
-                star_type.iloc[i] = 'evening_star'
-
-        self.df['star'] = stars
-        self.df['star_type'] = star_type
+    def detect_all_patterns(self, params=None):
+        """
+        Detect all registered candlestick patterns
 
-        return stars
+        All patterns are evaluated by one compiled plan sharing the candle features.
 
-    def detect_all_patterns(self):
-        """
-        Detect all candlestick patterns
+        Args:
+            params (dict): Optional per-pattern parameter overrides
 
         Returns:
             pd.DataFrame: DataFrame with all patterns detected
         """
-        self.detect_pin_bar()
-        self.detect_engulfing()
-        self.detect_inside_bar()
-        self.detect_doji()
-        self.detect_morning_evening_star()
+        self._apply_patterns(list(self.registry.patterns), params)
 
         return self.df
 
@@ -201,28 +168,21 @@ class PatternDetector:
             list: List of detected patterns
         """
         patterns = []
-        recent_df = self.df.tail(last_n)
+        start = max(0, len(self.df) - last_n)
+        groups = self.registry.groups()
 
-        for idx, row in recent_df.iterrows():
+        for i in range(start, len(self.df)):
             pattern_info = {
-                'time': idx,
+                'time': self.df.index[i],
                 'patterns': []
             }
 
-            if row.get('pin_bar', False):
-                pattern_info['patterns'].append(row['pin_bar_type'])
-
-            if row.get('engulfing', False):
-                pattern_info['patterns'].append(row['engulfing_type'])
-
-            if row.get('inside_bar', False):
-                pattern_info['patterns'].append('inside_bar')
-
-            if row.get('doji', False):
-                pattern_info['patterns'].append('doji')
-
-            if row.get('star', False):
-                pattern_info['patterns'].append(row['star_type'])
+            for group_names in groups.values():
+                for name in group_names:
+                    mask = self.masks.get(name)
+                    if mask is not None and mask[i]:
+                        pattern_info['patterns'].append(name)
+                        break
 
             if pattern_info['patterns']:
                 patterns.append(pattern_info)
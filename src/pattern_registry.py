@@ -0,0 +1,388 @@
+"""
+Pattern registry with vectorized rule evaluation
+"""
+import numpy as np
+
+
+# Derived candle expressions shared by all patterns
+DERIVED_FEATURES = {
+    'body': lambda f: np.abs(f['close'] - f['open']),
+    'range': lambda f: f['high'] - f['low'],
+    'body_top': lambda f: np.maximum(f['open'], f['close']),
+    'body_bottom': lambda f: np.minimum(f['open'], f['close']),
+    'upper_wick': lambda f: f['high'] - f['body_top'],
+    'lower_wick': lambda f: f['body_bottom'] - f['low'],
+    'midpoint': lambda f: (f['open'] + f['close']) / 2,
+    'bullish': lambda f: f['close'] > f['open'],
+    'bearish': lambda f: f['close'] < f['open'],
+}
+
+
+class CandleFeatures:
+    """OHLC arrays and derived expressions, each computed at most once"""
+
+    def __init__(self, open_, high, low, close):
+        """
+        Initialize candle features
+
+        Arrays may have any number of leading dimensions (e.g., pairs x bars);
+        candles run along the last axis.
+
+        Args:
+            open_ (np.ndarray): Open prices
+            high (np.ndarray): High prices
+            low (np.ndarray): Low prices
+            close (np.ndarray): Close prices
+        """
+        self._cache = {
+            'open': np.asarray(open_, dtype=float),
+            'high': np.asarray(high, dtype=float),
+            'low': np.asarray(low, dtype=float),
+            'close': np.asarray(close, dtype=float),
+        }
+
+    def __getitem__(self, name):
+        """Get a base or derived feature"""
+        if name not in self._cache:
+            self._cache[name] = DERIVED_FEATURES[name](self)
+        return self._cache[name]
+
+    def prev(self, name, n=1):
+        """
+        Get a feature shifted n candles back
+
+        The first n candles have no previous value: NaN for prices,
+        False for flags, so conditions using them are never met.
+
+        Args:
+            name (str): Feature name
+            n (int): Number of candles back
+
+        Returns:
+            np.ndarray: Shifted feature
+        """
+        key = (name, n)
+
+        if key not in self._cache:
+            values = self[name]
+            fill = False if values.dtype == bool else np.nan
+            shifted = np.full(values.shape, fill, dtype=values.dtype)
+            if n < values.shape[-1]:
+                shifted[..., n:] = values[..., :-n]
+            self._cache[key] = shifted
+
+        return self._cache[key]
+
+    def take(self, index):
+        """
+        Select part of every computed feature
+
+        Args:
+            index: NumPy index applied to each array (e.g., one pair of a batch)
+
+        Returns:
+            CandleFeatures: Features for the selection, keeping computed values
+        """
+        selected = CandleFeatures.__new__(CandleFeatures)
+        selected._cache = {}
+
+        for key, values in self._cache.items():
+            # Shifted features can't be sliced: their first values come from outside the window
+            if isinstance(key, str):
+                selected._cache[key] = values[index]
+
+        return selected
+
+
+class PatternSpec:
+    """Declaration of a single candlestick pattern"""
+
+    def __init__(self, name, condition, group, column, direction=None, params=None,
+                 reason=None, confidence=None, action=None):
+        """
+        Initialize pattern spec
+
+        Args:
+            name (str): Pattern name (e.g., 'bullish_hammer')
+            condition (callable): condition(features, **params) -> boolean array
+            group (str): Pattern family (e.g., 'pin_bar'), as used by the backtester
+            column (str): DataFrame flag column of the family
+            direction (str): 'long', 'short', or None for non-directional patterns
+            params (dict): Default condition parameters
+            reason (str): Signal reason for non-directional patterns
+            confidence (str): Signal confidence for non-directional patterns
+            action (str): Suggested action for non-directional patterns
+        """
+        self.name = name
+        self.condition = condition
+        self.group = group
+        self.column = column
+        self.direction = direction
+        self.params = params or {}
+        self.reason = reason
+        self.confidence = confidence
+        self.action = action
+
+
+class PatternRegistry:
+    """Registry of declared patterns, evaluated together over shared features"""
+
+    def __init__(self):
+        """Initialize pattern registry"""
+        self.patterns = {}
+
+    def register(self, name, condition, group=None, column=None, direction=None, params=None,
+                 reason=None, confidence=None, action=None):
+        """
+        Declare a pattern
+
+        Patterns in the same group are mutually ranked by registration order
+        when a candle matches more than one of them.
+
+        Args:
+            name (str): Pattern name
+            condition (callable): condition(features, **params) -> boolean array
+            group (str): Pattern family (defaults to the name)
+            column (str): DataFrame flag column (defaults to the group)
+            direction (str): 'long', 'short', or None
+            params (dict): Default condition parameters
+            reason (str): Signal reason for non-directional patterns
+            confidence (str): Signal confidence for non-directional patterns
+            action (str): Suggested action for non-directional patterns
+
+        Returns:
+            PatternSpec: Registered pattern
+        """
+        group = group or name
+        spec = PatternSpec(
+            name, condition, group, column or group,
+            direction=direction, params=params,
+            reason=reason, confidence=confidence, action=action
+        )
+        self.patterns[name] = spec
+
+        return spec
+
+    def get(self, name):
+        """Get a pattern spec by name, or None"""
+        return self.patterns.get(name)
+
+    def groups(self):
+        """
+        Get pattern families in registration order
+
+        Returns:
+            dict: Group -> list of pattern names
+        """
+        groups = {}
+        for spec in self.patterns.values():
+            groups.setdefault(spec.group, []).append(spec.name)
+        return groups
+
+    def directional_groups(self):
+        """Get the families that contain long or short patterns"""
+        return [
+            group for group, names in self.groups().items()
+            if any(self.patterns[name].direction for name in names)
+        ]
+
+    def resolve(self, name):
+        """
+        Expand a group or pattern name into pattern names
+
+        Args:
+            name (str): Group name (e.g., 'engulfing') or pattern name
+
+        Returns:
+            list: Pattern names
+        """
+        groups = self.groups()
+        if name in groups:
+            return groups[name]
+        if name in self.patterns:
+            return [name]
+        raise ValueError(f"Unknown pattern: {name}")
+
+    def compile(self, names=None, params=None):
+        """
+        Build an evaluation plan for a set of patterns
+
+        Args:
+            names (list): Pattern names (defaults to all registered patterns)
+            params (dict): Optional per-pattern parameter overrides
+
+        Returns:
+            EvaluationPlan: Plan that evaluates all patterns in one pass
+        """
+        names = list(self.patterns) if names is None else names
+        params = params or {}
+
+        steps = []
+        for name in names:
+            spec = self.patterns[name]
+            steps.append((name, spec.condition, {**spec.params, **params.get(name, {})}))
+
+        return EvaluationPlan(steps)
+
+    def evaluate(self, open_, high, low, close, names=None, params=None):
+        """
+        Evaluate patterns over OHLC arrays
+
+        Args:
+            open_, high, low, close (np.ndarray): Price arrays, candles on the last axis
+            names (list): Pattern names (defaults to all registered patterns)
+            params (dict): Optional per-pattern parameter overrides
+
+        Returns:
+            dict: Pattern name -> boolean array
+        """
+        features = CandleFeatures(open_, high, low, close)
+        return self.compile(names, params).evaluate(features)
+
+    def directions(self, masks, names):
+        """
+        Combine pattern masks into a direction per candle
+
+        Args:
+            masks (dict): Pattern name -> boolean array
+            names (list): Patterns to combine, in priority order
+
+        Returns:
+            tuple: (direction array of 1/-1/0, index into names or -1)
+        """
+        shape = next(iter(masks.values())).shape
+        directions = np.zeros(shape, dtype=np.int8)
+        matched = np.full(shape, -1, dtype=np.int64)
+
+        for k, name in enumerate(names):
+            sign = {'long': 1, 'short': -1}.get(self.patterns[name].direction, 0)
+            if not sign:
+                continue
+            hits = masks[name] & (directions == 0)
+            directions[hits] = sign
+            matched[hits] = k
+
+        return directions, matched
+
+
+class EvaluationPlan:
+    """Compiled list of pattern conditions sharing one feature table"""
+
+    def __init__(self, steps):
+        """
+        Initialize evaluation plan
+
+        Args:
+            steps (list): (name, condition, params) tuples
+        """
+        self.steps = steps
+
+    def evaluate(self, features):
+        """
+        Run every condition against the same features
+
+        Sub-expressions such as body, range, wicks and previous-candle
+        values are computed on first use and shared by all later patterns.
+
+        Args:
+            features (CandleFeatures): Shared candle features
+
+        Returns:
+            dict: Pattern name -> boolean array
+        """
+        return {
+            name: np.asarray(condition(features, **params), dtype=bool)
+            for name, condition, params in self.steps
+        }
+
+
+def _bullish_hammer(f, wick_ratio=2.0, body_ratio=0.3):
+    return (
+        (f['lower_wick'] >= f['body'] * wick_ratio) &
+        (f['body'] <= f['range'] * body_ratio) &
+        (f['upper_wick'] <= f['body'])
+    )
+
+
+def _bearish_shooting_star(f, wick_ratio=2.0, body_ratio=0.3):
+    return (
+        (f['upper_wick'] >= f['body'] * wick_ratio) &
+        (f['body'] <= f['range'] * body_ratio) &
+        (f['lower_wick'] <= f['body'])
+    )
+
+
+def _bullish_engulfing(f):
+    return (
+        f.prev('bearish') &
+        f['bullish'] &
+        (f['open'] <= f.prev('close')) &
+        (f['close'] >= f.prev('open'))
+    )
+
+
+def _bearish_engulfing(f):
+    return (
+        f.prev('bullish') &
+        f['bearish'] &
+        (f['open'] >= f.prev('close')) &
+        (f['close'] <= f.prev('open'))
+    )
+
+
+def _inside_bar(f):
+    return (f['high'] <= f.prev('high')) & (f['low'] >= f.prev('low'))
+
+
+def _doji(f, body_ratio=0.1):
+    return f['body'] <= f['range'] * body_ratio
+
+
+def _morning_star(f, star_ratio=0.3):
+    return (
+        f.prev('bearish', 2) &
+        (f.prev('body') <= f.prev('range') * star_ratio) &
+        f['bullish'] &
+        (f['close'] > f.prev('midpoint', 2))
+    )
+
+
+def _evening_star(f, star_ratio=0.3):
+    return (
+        f.prev('bullish', 2) &
+        (f.prev('body') <= f.prev('range') * star_ratio) &
+        f['bearish'] &
+        (f['close'] < f.prev('midpoint', 2))
+    )
+
+
+default_registry = PatternRegistry()
+
+default_registry.register(
+    'bullish_hammer', _bullish_hammer, group='pin_bar', direction='long',
+    params={'wick_ratio': 2.0, 'body_ratio': 0.3}
+)
+default_registry.register(
+    'bearish_shooting_star', _bearish_shooting_star, group='pin_bar', direction='short',
+    params={'wick_ratio': 2.0, 'body_ratio': 0.3}
+)
+default_registry.register('bullish_engulfing', _bullish_engulfing, group='engulfing', direction='long')
+default_registry.register('bearish_engulfing', _bearish_engulfing, group='engulfing', direction='short')
+default_registry.register(
+    'inside_bar', _inside_bar,
+    reason='Consolidation - potential breakout', confidence='MEDIUM',
+    action='Wait for breakout direction'
+)
+default_registry.register(
+    'doji', _doji, params={'body_ratio': 0.1},
+    reason='Indecision - potential reversal', confidence='LOW',
+    action='Wait for confirmation'
+)
+default_registry.register(
+    'morning_star', _morning_star, group='morning_evening_star', column='star',
+    direction='long', params={'star_ratio': 0.3}
+)
+default_registry.register(
+    'evening_star', _evening_star, group='morning_evening_star', column='star',
+    direction='short', params={'star_ratio': 0.3}
+)
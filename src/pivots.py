@@ -0,0 +1,136 @@
+"""
+Multi-resolution pivot detection
+"""
+import bisect
+import numpy as np
+
+
+def find_pivots(values, orders, kind='high'):
+    """
+    Find pivot highs or lows for several orders in one sweep
+
+    A candle is a pivot of order k if its value is strictly above (below for
+    lows) every value up to k candles on each side. Windows are truncated at
+    the edges and the first and last candles are never pivots, which matches
+    scipy's argrelextrema with mode='clip'.
+
+    The rolling max of the left and right neighbours is grown one offset at
+    a time, so all orders are answered by a single sweep up to the largest.
+
+    Args:
+        values (array-like): High or low prices
+        orders (iterable): Pivot orders (e.g., (3, 5, 10, 20))
+        kind (str): 'high' or 'low'
+
+    Returns:
+        dict: Order -> array of pivot indices
+    """
+    x = np.asarray(values, dtype=float)
+    if kind == 'low':
+        x = -x
+
+    orders = sorted(set(orders))
+    n = len(x)
+    pivots = {}
+
+    if n < 3 or not orders:
+        return {order: np.array([], dtype=np.int64) for order in orders}
+
+    left_max = np.full(n, -np.inf)
+    right_max = np.full(n, -np.inf)
+    wanted = set(orders)
+
+    for k in range(1, orders[-1] + 1):
+        if k < n:
+            np.maximum(left_max[k:], x[:-k], out=left_max[k:])
+            np.maximum(right_max[:-k], x[k:], out=right_max[:-k])
+
+        if k in wanted:
+            mask = (x > left_max) & (x > right_max)
+            mask[0] = mask[-1] = False
+            pivots[k] = np.flatnonzero(mask)
+
+    return pivots
+
+
+class PivotDetector:
+    """Incremental pivot detection over a growing candle series"""
+
+    def __init__(self, orders=(3, 5, 10, 20)):
+        """
+        Initialize pivot detector
+
+        Args:
+            orders (iterable): Pivot orders to track
+        """
+        self.orders = sorted(set(orders))
+        self.max_order = self.orders[-1]
+        self.length = 0
+
+        self._highs = np.empty(1024)
+        self._lows = np.empty(1024)
+        self._pivots = {
+            kind: {order: [] for order in self.orders}
+            for kind in ('high', 'low')
+        }
+
+    def _reserve(self, size):
+        """Grow the price buffers to hold at least size candles"""
+        if size <= len(self._highs):
+            return
+
+        capacity = len(self._highs)
+        while capacity < size:
+            capacity *= 2
+
+        for name in ('_highs', '_lows'):
+            buffer = np.empty(capacity)
+            buffer[:self.length] = getattr(self, name)[:self.length]
+            setattr(self, name, buffer)
+
+    def append(self, highs, lows):
+        """
+        Append new candles and update pivots
+
+        Only the tail whose windows changed is recomputed: candles more than
+        max_order bars before the previous end keep their pivot status.
+
+        Args:
+            highs (array-like): New high prices
+            lows (array-like): New low prices
+        """
+        highs = np.atleast_1d(np.asarray(highs, dtype=float))
+        lows = np.atleast_1d(np.asarray(lows, dtype=float))
+
+        old_length = self.length
+        self._reserve(old_length + len(highs))
+        self._highs[old_length:old_length + len(highs)] = highs
+        self._lows[old_length:old_length + len(lows)] = lows
+        self.length = old_length + len(highs)
+
+        # First candle whose pivot status can change, plus a full left window for it
+        recompute_from = max(0, old_length - 1 - self.max_order)
+        context_start = max(0, recompute_from - self.max_order)
+
+        for kind, values in (('high', self._highs), ('low', self._lows)):
+            segment_pivots = find_pivots(values[context_start:self.length], self.orders, kind=kind)
+
+            for order in self.orders:
+                indices = self._pivots[kind][order]
+                del indices[bisect.bisect_left(indices, recompute_from):]
+
+                found = segment_pivots[order] + context_start
+                indices.extend(found[found >= recompute_from].tolist())
+
+    def pivots(self, order, kind='high'):
+        """
+        Get pivot indices for an order
+
+        Args:
+            order (int): Pivot order
+            kind (str): 'high' or 'low'
+
+        Returns:
+            np.ndarray: Pivot indices
+        """
+        return np.array(self._pivots[kind][order], dtype=np.int64)
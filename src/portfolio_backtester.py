@@ -0,0 +1,304 @@
+"""
+Event-driven portfolio backtester with a shared balance across pairs
+"""
+import heapq
+from src.backtester import Backtester
+from src.analysis_context import AnalysisContext
+from src.pattern_registry import default_registry
+from src.oanda_client import OandaClient
+from config import Config
+
+
+class PortfolioBacktester(Backtester):
+    """Backtest patterns on many pairs at once, sharing one account balance"""
+
+    def __init__(self, initial_balance=10000, risk_per_trade=None, max_open_positions=5,
+                 max_positions_per_pair=1, max_bars_held=50, sr_lookback=100):
+        """
+        Initialize portfolio backtester
+
+        Args:
+            initial_balance (float): Starting account balance
+            risk_per_trade (float): Risk percentage per trade (defaults to Config.DEFAULT_RISK_PERCENT)
+            max_open_positions (int): Maximum concurrent positions across all pairs
+            max_positions_per_pair (int): Maximum concurrent positions on one pair
+            max_bars_held (int): Close positions at market after this many bars
+            sr_lookback (int): Candles used for S/R levels at each signal
+        """
+        if risk_per_trade is None:
+            risk_per_trade = Config.DEFAULT_RISK_PERCENT
+
+        super().__init__(initial_balance=initial_balance, risk_per_trade=risk_per_trade)
+        self.max_open_positions = max_open_positions
+        self.max_positions_per_pair = max_positions_per_pair
+        self.max_bars_held = max_bars_held
+        self.sr_lookback = sr_lookback
+
+    def _signal_directions(self, context, patterns):
+        """
+        Get the trade direction of every candle for the given patterns
+
+        Args:
+            context (AnalysisContext): Analysis context of the pair
+            patterns (list): Pattern families or names (e.g., 'pin_bar')
+
+        Returns:
+            tuple: (directions array of 1/-1/0, pattern name per candle)
+        """
+        registry = context.pattern_detector.registry
+        names = [name for pattern in patterns for name in registry.resolve(pattern)]
+        directions, matched = registry.directions(context.pattern_masks, names)
+
+        return directions, [names[k] if k >= 0 else None for k in matched]
+
+    def backtest_portfolio(self, data, patterns=None, direction='both', min_rr=1.5):
+        """
+        Backtest patterns over many pairs in timestamp order
+
+        Candle streams are merged with a heap so that every pair's bars are
+        processed in global time order against one shared balance.
+
+        Args:
+            data (dict): Pair -> OHLC DataFrame
+            patterns (list): Patterns to trade
+            direction (str): 'long', 'short', or 'both'
+            min_rr (float): Minimum risk/reward ratio
+
+        Returns:
+            dict: Portfolio backtest results
+        """
+        if patterns is None:
+            patterns = default_registry.directional_groups()
+
+        # Run state is local, so one backtester can serve concurrent runs
+        run = {'balance': self.initial_balance, 'trades': [], 'max_concurrent_positions': 0, 'skipped_signals': 0}
+
+        allowed = {'both': (1, -1), 'long': (1,), 'short': (-1,)}[direction]
+        pairs = [pair for pair, df in data.items() if df is not None and not df.empty]
+
+        # Plain lists are much faster than NumPy scalars in the event loop
+        streams = []
+        for pair in pairs:
+            df = data[pair]
+            context = AnalysisContext(df, pair=pair)
+            directions, names = self._signal_directions(context, patterns)
+            streams.append({
+                'pair': pair,
+                'df': df,
+                'context': context,
+                'times': df.index.as_unit('ns').asi8.tolist(),
+                'open': df['open'].tolist(),
+                'high': df['high'].tolist(),
+                'low': df['low'].tolist(),
+                'close': df['close'].tolist(),
+                'direction': directions.tolist(),
+                'pattern': names,
+                'positions': [],
+                'pending': None
+            })
+
+        heap = [(stream['times'][0], k, 0) for k, stream in enumerate(streams)]
+        heapq.heapify(heap)
+        open_positions = 0
+
+        while heap:
+            _, k, i = heapq.heappop(heap)
+            stream = streams[k]
+
+            # Enter the signal from the previous candle at this candle's open
+            pending = stream['pending']
+            if pending is not None:
+                stream['pending'] = None
+
+                if (open_positions < self.max_open_positions and
+                        len(stream['positions']) < self.max_positions_per_pair):
+                    position = self._open_position(stream, pending, i, min_rr, run['balance'])
+                    if position:
+                        stream['positions'].append(position)
+                        open_positions += 1
+                        run['max_concurrent_positions'] = max(run['max_concurrent_positions'], open_positions)
+                else:
+                    run['skipped_signals'] += 1
+
+            # Check open positions against this candle
+            if stream['positions']:
+                still_open = []
+                for position in stream['positions']:
+                    trade = self._update_position(stream, position, i)
+                    if trade:
+                        run['balance'] += trade['pnl']
+                        run['trades'].append(trade)
+                        open_positions -= 1
+                    else:
+                        still_open.append(position)
+                stream['positions'] = still_open
+
+            # Queue a new signal for the next candle
+            signal = stream['direction'][i]
+            if signal in allowed and i >= 50:
+                stream['pending'] = i
+
+            if i + 1 < len(stream['times']):
+                heapq.heappush(heap, (stream['times'][i + 1], k, i + 1))
+
+        results = self._calculate_statistics(run['trades'], run['balance'])
+        results['by_pair'] = self._pair_breakdown(run['trades'], pairs)
+        results['max_concurrent_positions'] = run['max_concurrent_positions']
+        results['skipped_signals'] = run['skipped_signals']
+
+        return results
+
+    def _open_position(self, stream, signal_index, entry_index, min_rr, balance):
+        """
+        Open a position if the S/R levels at the signal candle give enough R/R
+
+        Args:
+            stream (dict): Pair stream state
+            signal_index (int): Index of the pattern candle
+            entry_index (int): Index of the entry candle
+            min_rr (float): Minimum risk/reward ratio
+            balance (float): Account balance when the position is opened
+
+        Returns:
+            dict: Position, or None if filtered out
+        """
+        trade_direction = 'long' if stream['direction'][signal_index] == 1 else 'short'
+
+        sr_detector = stream['context'].sr_detector_at(signal_index, lookback=self.sr_lookback)
+
+        entry_price = stream['open'][entry_index]
+        rr = sr_detector.calculate_risk_reward(entry_price, trade_direction)
+
+        if rr['risk_reward_ratio'] < min_rr:
+            return None
+
+        return {
+            'direction': trade_direction,
+            'pattern': stream['pattern'][signal_index],
+            'entry': entry_price,
+            'stop_loss': rr['stop_loss'],
+            'take_profit': rr['take_profit'],
+            'entry_index': entry_index,
+            'risk_amount': balance * (self.risk_per_trade / 100)
+        }
+
+    def _update_position(self, stream, position, i):
+        """
+        Check a position against a candle
+
+        Args:
+            stream (dict): Pair stream state
+            position (dict): Open position
+            i (int): Candle index
+
+        Returns:
+            dict: Closed trade, or None if the position stays open
+        """
+        entry = position['entry']
+        stop_loss = position['stop_loss']
+        take_profit = position['take_profit']
+        risk_amount = position['risk_amount']
+        sign = 1 if position['direction'] == 'long' else -1
+
+        if sign == 1:
+            hit_stop = stream['low'][i] <= stop_loss
+            hit_target = stream['high'][i] >= take_profit
+        else:
+            hit_stop = stream['high'][i] >= stop_loss
+            hit_target = stream['low'][i] <= take_profit
+
+        bars_held = i - position['entry_index'] + 1
+
+        if hit_stop:
+            result, exit_price, pnl = 'loss', stop_loss, -risk_amount
+        elif hit_target:
+            result, exit_price = 'win', take_profit
+            pnl = risk_amount * abs(take_profit - entry) / abs(entry - stop_loss)
+        elif bars_held > self.max_bars_held:
+            result, exit_price = 'timeout', stream['close'][i]
+            pnl = sign * (exit_price - entry) / abs(entry - stop_loss) * risk_amount
+        else:
+            return None
+
+        return {
+            'pair': stream['pair'],
+            'pattern': position['pattern'],
+            'direction': position['direction'],
+            'entry_time': stream['df'].index[position['entry_index']],
+            'exit_time': stream['df'].index[i],
+            'entry_price': entry,
+            'exit_price': exit_price,
+            'result': result,
+            'pnl': pnl,
+            'pnl_pips': sign * (exit_price - entry) / stream['context'].pip_size,
+            'bars_held': bars_held
+        }
+
+    def _pair_breakdown(self, trades, pairs):
+        """
+        Summarize closed trades per pair
+
+        Args:
+            trades (list): Closed trades
+            pairs (list): Pairs in the backtest
+
+        Returns:
+            dict: Trade count, wins and P&L per pair
+        """
+        breakdown = {pair: {'trades': 0, 'wins': 0, 'pnl': 0.0} for pair in pairs}
+
+        for trade in trades:
+            stats = breakdown[trade['pair']]
+            stats['trades'] += 1
+            stats['wins'] += trade['result'] == 'win'
+            stats['pnl'] += trade['pnl']
+
+        for stats in breakdown.values():
+            stats['pnl'] = round(stats['pnl'], 2)
+
+        return breakdown
+
+    def run_portfolio_backtest(self, pairs=None, timeframe='H4', patterns=None, min_rr=1.5, store=None):
+        """
+        Fetch data for many pairs and backtest them as one portfolio
+
+        Args:
+            pairs (list): Forex pairs (defaults to Config.DEFAULT_PAIRS)
+            timeframe (str): Timeframe
+            patterns (list): Patterns to trade
+            min_rr (float): Minimum risk/reward ratio
+            store (CandleStore): Load backfilled history from this store when
+                available instead of the last 5000 candles from OANDA
+
+        Returns:
+            dict: Portfolio backtest results, with 'fetch_errors' for pairs
+                whose candles could not be fetched
+        """
+        if pairs is None:
+            pairs = Config.DEFAULT_PAIRS
+
+        client = OandaClient()
+        data = {}
+        fetch_errors = {}
+
+        for pair in pairs:
+            if store is not None and store.has(pair, timeframe):
+                data[pair] = store.load(pair, timeframe)
+                continue
+
+            print(f"Fetching {pair} {timeframe}...")
+            try:
+                data[pair] = client.get_candles(pair, granularity=timeframe, count=5000)
+            except Exception as e:
+                fetch_errors[pair] = str(e)
+
+        if not any(df is not None and not df.empty for df in data.values()):
+            return {'error': 'Unable to fetch data', 'fetch_errors': fetch_errors}
+
+        return {
+            'pairs': pairs,
+            'timeframe': timeframe,
+            'initial_balance': self.initial_balance,
+            'fetch_errors': fetch_errors,
+            'results': self.backtest_portfolio(data, patterns=patterns, min_rr=min_rr)
+        }
@@ -0,0 +1,340 @@
+"""
+Record OANDA responses and replay them from a local HTTP stand-in server
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+import pandas as pd
+from oandapyV20.oandapyV20 import TRADING_ENVIRONMENTS
+from config import Config
+
+
+REPLAY_ENVIRONMENT = 'replay'
+
+
+def register_replay_environment(url=None, replace=True):
+    """
+    Make the 'replay' environment available to oandapyV20 clients
+
+    Args:
+        url (str): Base URL of the replay server (defaults to Config.OANDA_REPLAY_URL)
+        replace (bool): Overwrite a URL registered earlier (e.g., by ReplayServer.start)
+    """
+    if not replace and REPLAY_ENVIRONMENT in TRADING_ENVIRONMENTS:
+        return
+
+    url = (url or Config.OANDA_REPLAY_URL).rstrip('/')
+    TRADING_ENVIRONMENTS[REPLAY_ENVIRONMENT] = {'api': url, 'stream': url}
+
+
+def request_key(path, params):
+    """
+    Build the lookup key of a request
+
+    Args:
+        path (str): Endpoint path (e.g., 'v3/instruments/EUR_USD/candles')
+        params (dict): Query parameters
+
+    Returns:
+        str: Normalized 'path?query' key
+    """
+    query = '&'.join(f"{k}={params[k]}" for k in sorted(params or {}))
+    return f"{path.strip('/')}?{query}"
+
+
+class SessionRecorder:
+    """Write API responses to disk, one JSON file per distinct request"""
+
+    def __init__(self, root=None):
+        """
+        Initialize session recorder
+
+        Args:
+            root (str): Directory holding the recordings
+        """
+        self.root = root or Config.OANDA_RECORD_DIR
+
+    def record(self, endpoint, response):
+        """
+        Save the response of an endpoint request
+
+        Args:
+            endpoint (APIRequest): oandapyV20 endpoint that was requested
+            response (dict): Response body
+        """
+        path = str(endpoint).strip('/')
+        params = {k: str(v) for k, v in (getattr(endpoint, 'params', None) or {}).items()}
+        key = request_key(path, params)
+
+        os.makedirs(self.root, exist_ok=True)
+        file_name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+        tmp_path = os.path.join(self.root, file_name + '.tmp')
+
+        with open(tmp_path, 'w') as f:
+            json.dump({'path': path, 'params': params, 'response': response}, f)
+        os.replace(tmp_path, os.path.join(self.root, file_name))
+
+
+class RecordedSession:
+    """Recorded responses loaded from disk, answering requests like OANDA would"""
+
+    def __init__(self, root=None):
+        """
+        Load recordings
+
+        Args:
+            root (str): Directory holding the recordings
+        """
+        self.root = root or Config.OANDA_RECORD_DIR
+        self.responses = {}
+        self.candles = {}
+        self.prices = {}
+
+        if not os.path.isdir(self.root):
+            return
+
+        for file_name in sorted(os.listdir(self.root)):
+            if file_name.endswith('.json'):
+                with open(os.path.join(self.root, file_name)) as f:
+                    self._add(json.load(f))
+
+    def _add(self, recording):
+        """
+        Index a recording by exact request and by instrument
+
+        Args:
+            recording (dict): Recorded path, params and response
+        """
+        path, params, response = recording['path'], recording['params'], recording['response']
+        self.responses[request_key(path, params)] = response
+
+        parts = path.split('/')
+        if parts[-1] == 'candles':
+            series = self.candles.setdefault((parts[-2], params.get('granularity', 'S5')), {})
+            for candle in response.get('candles', []):
+                series[candle['time']] = candle
+        elif parts[-1] == 'pricing':
+            for price in response.get('prices', []):
+                self.prices[price['instrument']] = price
+
+    def lookup(self, path, params):
+        """
+        Answer a request from the recordings
+
+        Exact matches are returned as recorded. Otherwise candle requests are
+        answered from all candles recorded for the instrument and granularity,
+        and pricing requests from the last recorded price of each instrument.
+
+        Args:
+            path (str): Endpoint path
+            params (dict): Query parameters
+
+        Returns:
+            dict: Response body, or None if nothing was recorded
+        """
+        path = path.strip('/')
+        response = self.responses.get(request_key(path, params))
+        if response is not None:
+            return response
+
+        parts = path.split('/')
+        if parts[-1] == 'candles':
+            return self._candles(parts[-2], params)
+        if parts[-1] == 'pricing':
+            prices = [self.prices[i] for i in params.get('instruments', '').split(',') if i in self.prices]
+            return {'prices': prices} if prices else None
+
+        return None
+
+    def _candles(self, instrument, params):
+        """
+        Select recorded candles for a count or from/to request
+
+        Args:
+            instrument (str): Forex pair
+            params (dict): Query parameters
+
+        Returns:
+            dict: InstrumentsCandles response, or None if nothing was recorded
+        """
+        granularity = params.get('granularity', 'S5')
+        series = self.candles.get((instrument, granularity))
+        if not series:
+            return None
+
+        times = sorted(series)
+        if 'from' in params:
+            start = pd.Timestamp(params['from'])
+            times = [t for t in times if pd.Timestamp(t) >= start]
+        if 'to' in params:
+            end = pd.Timestamp(params['to'])
+            times = [t for t in times if pd.Timestamp(t) < end]
+        if 'count' in params and 'from' not in params:
+            times = times[-int(params['count']):]
+        elif 'count' in params:
+            times = times[:int(params['count'])]
+
+        return {
+            'instrument': instrument,
+            'granularity': granularity,
+            'candles': [series[t] for t in times]
+        }
+
+
+class ReplayServer:
+    """Local HTTP stand-in for the OANDA REST API with latency and error injection"""
+
+    def __init__(self, session=None, host='127.0.0.1', port=8765, latency=0.0,
+                 latency_jitter=0.0, error_rate=0.0, error_status=503, seed=None):
+        """
+        Initialize replay server
+
+        Args:
+            session (RecordedSession): Recordings to serve
+            host (str): Bind address
+            port (int): Bind port (0 picks a free one)
+            latency (float): Seconds added to every response
+            latency_jitter (float): Maximum random extra latency in seconds
+            error_rate (float): Fraction of requests answered with error_status
+            error_status (int): HTTP status of injected errors (e.g., 429, 503)
+            seed (int): Random seed for reproducible latency and errors
+        """
+        self.session = session or RecordedSession()
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+        self.stats = {'requests': 0, 'errors_injected': 0, 'not_found': 0}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        """Base URL of the running server"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self):
+        """
+        Draw this request's latency and whether it fails
+
+        Returns:
+            tuple: (delay seconds, inject error)
+        """
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            fail = self._random.random() < self.error_rate
+            self.stats['requests'] += 1
+            if fail:
+                self.stats['errors_injected'] += 1
+            return delay, fail
+
+    def _make_handler(self):
+        """Build the request handler class bound to this server"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                delay, fail = server._draw()
+                if delay:
+                    time.sleep(delay)
+
+                if fail:
+                    self._send(server.error_status, {'errorMessage': 'Injected error'})
+                    return
+
+                url = urlsplit(self.path)
+                response = server.session.lookup(url.path, dict(parse_qsl(url.query)))
+
+                if response is None:
+                    with server._random_lock:
+                        server.stats['not_found'] += 1
+                    self._send(404, {'errorMessage': f"No recording for {self.path}"})
+                else:
+                    self._send(200, response)
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """
+        Serve in a background thread and register the 'replay' environment
+
+        Returns:
+            ReplayServer: self
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        register_replay_environment(self.url)
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    """Run the replay server from the command line"""
+    parser = argparse.ArgumentParser(description='Serve recorded OANDA responses locally')
+    parser.add_argument('--dir', default=Config.OANDA_RECORD_DIR, help='Recordings directory')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Maximum random extra latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503, help='HTTP status of injected errors')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        RecordedSession(args.dir),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed
+    )
+
+    print(f"Replaying {len(server.session.responses)} recordings from {args.dir} on {server.url}")
+    print("Set OANDA_ENVIRONMENT=replay and OANDA_REPLAY_URL to point clients here")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""
+Rate-limit-aware request scheduler for the OANDA API
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+import requests
+from config import Config
+
+
+# Priority lanes: lower values go first
+PRIORITY_LIVE = 0
+PRIORITY_BACKFILL = 1
+
+LANE_NAMES = {
+    PRIORITY_LIVE: 'live',
+    PRIORITY_BACKFILL: 'backfill'
+}
+
+
+class TokenBucket:
+    """Token bucket allowing bursts up to capacity at a sustained rate"""
+
+    def __init__(self, rate, capacity):
+        """
+        Initialize token bucket
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum tokens held
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        """Add the tokens earned since the last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """
+        Take one token if available
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available
+        """
+        self._refill()
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimitError(requests.HTTPError):
+    """HTTP 429 response, with the delay the server asked for"""
+
+    code = 429
+
+    def __init__(self, response):
+        """
+        Initialize rate limit error
+
+        Args:
+            response (requests.Response): The 429 response
+        """
+        super().__init__(f"Rate limited: {response.text}", response=response)
+        self.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header
+
+    Args:
+        value (str): Delay in seconds or an HTTP date
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def raise_for_rate_limit(response, *args, **kwargs):
+    """
+    requests response hook raising RateLimitError for 429 responses
+
+    oandapyV20 turns error responses into V20Error without their headers,
+    so the Retry-After header is read here, before it is lost.
+
+    Args:
+        response (requests.Response): Response
+
+    Returns:
+        requests.Response: The response, unless it was a 429
+    """
+    if response.status_code == 429:
+        raise RateLimitError(response)
+    return response
+
+
+def is_retryable(error):
+    """
+    Check if a failed request is worth retrying
+
+    Args:
+        error (Exception): Error raised by the request
+
+    Returns:
+        bool: True for rate limits (429), server errors and connection problems
+    """
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError))
+
+
+class RequestScheduler:
+    """Schedule API requests through a token bucket with priority lanes"""
+
+    def __init__(self, rate=None, burst=None, max_retries=None, backoff=0.5, max_backoff=8.0):
+        """
+        Initialize request scheduler
+
+        Args:
+            rate (float): Sustained requests per second
+            burst (int): Maximum burst of requests
+            max_retries (int): Retries for rate-limited or failed requests
+            backoff (float): Base retry delay in seconds
+            max_backoff (float): Maximum retry delay in seconds
+        """
+        rate = rate or Config.OANDA_MAX_REQUESTS_PER_SECOND
+        self.bucket = TokenBucket(rate, burst or Config.OANDA_REQUEST_BURST)
+        self.max_retries = Config.OANDA_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._inflight = {}
+        self._resume_at = 0.0
+
+        self._metrics = {
+            lane: {
+                'queue_depth': 0,
+                'max_queue_depth': 0,
+                'requests': 0,
+                'total_wait': 0.0,
+                'max_wait': 0.0,
+                'retries': 0,
+                'rate_limited': 0,
+                'coalesced': 0,
+                'failures': 0
+            }
+            for lane in LANE_NAMES
+        }
+
+    def _acquire(self, priority):
+        """
+        Wait for this request's turn and a rate-limit token
+
+        Args:
+            priority (int): Priority lane
+        """
+        entry = (priority, next(self._sequence))
+        metrics = self._metrics[priority]
+        queued_at = time.monotonic()
+
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            metrics['queue_depth'] += 1
+            metrics['max_queue_depth'] = max(metrics['max_queue_depth'], metrics['queue_depth'])
+
+            while True:
+                if self._waiting[0] == entry:
+                    # Requests are held back while the server's Retry-After runs
+                    delay = self._resume_at - time.monotonic()
+                    if delay <= 0:
+                        delay = self.bucket.try_acquire()
+                        if delay == 0:
+                            break
+                    self._condition.wait(delay)
+                else:
+                    self._condition.wait()
+
+            heapq.heappop(self._waiting)
+            metrics['queue_depth'] -= 1
+
+            waited = time.monotonic() - queued_at
+            metrics['requests'] += 1
+            metrics['total_wait'] += waited
+            metrics['max_wait'] = max(metrics['max_wait'], waited)
+
+            self._condition.notify_all()
+
+    def _run(self, func, priority):
+        """
+        Run a request with retries and jittered exponential backoff
+
+        A 429 response carrying Retry-After pauses every lane for that long
+        instead of the backoff.
+
+        Args:
+            func (callable): Request to perform
+            priority (int): Priority lane
+
+        Returns:
+            Result of func
+        """
+        metrics = self._metrics[priority]
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(priority)
+
+            try:
+                return func()
+            except Exception as e:
+                retry_after = getattr(e, 'retry_after', None)
+                give_up = attempt >= self.max_retries or not is_retryable(e)
+
+                with self._condition:
+                    if getattr(e, 'code', None) == 429:
+                        metrics['rate_limited'] += 1
+
+                    if give_up:
+                        metrics['failures'] += 1
+                    else:
+                        metrics['retries'] += 1
+
+                    if retry_after is not None:
+                        self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+
+                if give_up:
+                    raise
+
+                if retry_after is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                    time.sleep(random.uniform(0, delay))
+
+    def submit(self, func, key=None, priority=PRIORITY_LIVE):
+        """
+        Perform a request, waiting for rate-limit capacity
+
+        Requests with the same key that are already in flight are coalesced:
+        later callers wait for and share the first caller's result.
+
+        Args:
+            func (callable): Request to perform
+            key (hashable): Optional identity of the request for coalescing
+            priority (int): PRIORITY_LIVE or PRIORITY_BACKFILL
+
+        Returns:
+            Result of func
+        """
+        if key is None:
+            return self._run(func, priority)
+
+        with self._condition:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self._metrics[priority]['coalesced'] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._run(func, priority)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._condition:
+                self._inflight.pop(key, None)
+
+    def metrics(self):
+        """
+        Get queue depth and wait-time metrics per lane
+
+        Returns:
+            dict: Lane name -> metrics
+        """
+        with self._condition:
+            snapshot = {}
+            for lane, metrics in self._metrics.items():
+                requests_done = metrics['requests']
+                snapshot[LANE_NAMES[lane]] = {
+                    **metrics,
+                    'avg_wait': round(metrics['total_wait'] / requests_done, 4) if requests_done else 0.0,
+                    'total_wait': round(metrics['total_wait'], 4),
+                    'max_wait': round(metrics['max_wait'], 4)
+                }
+            snapshot['inflight'] = len(self._inflight)
+            return snapshot
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def default_scheduler():
+    """
+    Get the process-wide scheduler shared by all OANDA clients
+
+    Returns:
+        RequestScheduler: Shared scheduler
+    """
+    global _default_scheduler
+
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
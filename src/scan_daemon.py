@@ -0,0 +1,420 @@
+"""
+Headless scanner daemon that scans each pair right after its bars close
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+from src.scanner import ForexScanner
+from src.signal_store import SignalStore
+from src.candle_store import granularity_to_timedelta
+from config import Config
+
+
+class JsonlSink:
+    """Append scan results to a JSON Lines file"""
+
+    def __init__(self, path):
+        """
+        Initialize JSONL sink
+
+        Args:
+            path (str): Output file path
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, record):
+        """
+        Write one scan record
+
+        Args:
+            record (dict): Scan record
+        """
+        line = json.dumps(record, default=str)
+
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+    def close(self):
+        """Nothing to release"""
+
+
+class SqliteSink:
+    """Store the latest scan result per pair, timeframe and bar in SQLite"""
+
+    def __init__(self, path):
+        """
+        Initialize SQLite sink
+
+        Args:
+            path (str): Database path
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scans (
+                    pair TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    bar_time TEXT NOT NULL,
+                    scanned_at TEXT NOT NULL,
+                    signals INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (pair, timeframe, bar_time)
+                )
+            """)
+
+    def write(self, record):
+        """
+        Write one scan record
+
+        Args:
+            record (dict): Scan record
+        """
+        with self._lock:
+            with sqlite3.connect(self.path) as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO scans (pair, timeframe, bar_time, scanned_at, signals, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        record['pair'],
+                        record['timeframe'],
+                        record['bar_time'],
+                        record['scanned_at'],
+                        len(record['result'].get('signals', [])),
+                        json.dumps(record, default=str)
+                    )
+                )
+
+    def close(self):
+        """Nothing to release"""
+
+
+class WebhookSink:
+    """POST scan records to a webhook URL"""
+
+    def __init__(self, url, only_new_signals=True, timeout=10):
+        """
+        Initialize webhook sink
+
+        Args:
+            url (str): Webhook URL
+            only_new_signals (bool): Only post scans that produced new or changed signals
+            timeout (float): Request timeout in seconds
+        """
+        self.url = url
+        self.only_new_signals = only_new_signals
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def write(self, record):
+        """
+        Post one scan record
+
+        Args:
+            record (dict): Scan record
+        """
+        if self.only_new_signals and not record['result'].get('new_signals', record['result'].get('signals')):
+            return
+
+        try:
+            response = self.session.post(
+                self.url,
+                data=json.dumps(record, default=str),
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Error posting to webhook: {str(e)}")
+
+    def close(self):
+        """Close the HTTP session"""
+        self.session.close()
+
+
+def make_sink(spec):
+    """
+    Build a sink from a 'kind:target' spec
+
+    Args:
+        spec (str): 'jsonl:<path>', 'sqlite:<path>' or 'webhook:<url>'
+
+    Returns:
+        Sink with write(record) and close()
+    """
+    kind, _, target = spec.partition(':')
+
+    if kind == 'jsonl':
+        return JsonlSink(target)
+    if kind == 'sqlite':
+        return SqliteSink(target)
+    if kind == 'webhook':
+        return WebhookSink(target)
+
+    raise ValueError(f"Unknown sink: {spec}")
+
+
+class ScanDaemon:
+    """Scan every (pair, timeframe) right after its bar closes and write results to sinks"""
+
+    def __init__(self, scanner=None, pairs=None, timeframes=None, sinks=None,
+                 settle_delay=5.0, stagger=1.0, max_workers=4, retry_delay=30.0, max_retry_delay=1800.0):
+        """
+        Initialize scanner daemon
+
+        Args:
+            scanner (ForexScanner): Scanner (defaults to one with a signal store)
+            pairs (list): Forex pairs (defaults to Config.DEFAULT_PAIRS)
+            timeframes (list): Timeframes (defaults to Config.TIMEFRAMES)
+            sinks (list): Destinations for scan records
+            settle_delay (float): Seconds to wait after a bar closes before fetching it
+            stagger (float): Seconds between the scans of consecutive pairs on a timeframe
+            max_workers (int): Scans run concurrently
+            retry_delay (float): First delay when a closed bar is not available yet
+            max_retry_delay (float): Longest delay between retries (e.g., over weekends)
+        """
+        if scanner is None:
+            history_store = None
+            if Config.HISTORY_DIR:
+                from src.history_store import HistoryStore
+                history_store = HistoryStore()
+
+            scanner = ForexScanner(
+                signal_store=SignalStore(Config.SIGNAL_DB_PATH or None),
+                history_store=history_store
+            )
+
+        self.scanner = scanner
+        self.pairs = pairs or Config.DEFAULT_PAIRS
+        self.timeframes = timeframes or Config.TIMEFRAMES
+        self.sinks = sinks or []
+        self.settle_delay = settle_delay
+        self.stagger = stagger
+        self.max_workers = max_workers
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self.last_bar = {}
+        self.retries = {}
+        self.stats = {'scans': 0, 'unchanged': 0, 'errors': 0}
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        """Increment a stats counter from a worker thread"""
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _offset(self, pair):
+        """Stagger offset of a pair within its timeframe"""
+        return self.pairs.index(pair) * self.stagger
+
+    def _schedule(self, due, pair, timeframe):
+        """
+        Queue a scan
+
+        Args:
+            due (float): Epoch seconds when the scan should run
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+        """
+        with self._condition:
+            heapq.heappush(self._queue, (due, next(self._sequence), pair, timeframe))
+            self._condition.notify()
+
+    def next_due(self, pair, timeframe, last_bar):
+        """
+        Get when the bar after last_bar closes, plus settle delay and stagger
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+            last_bar (pd.Timestamp): Open time of the last closed bar
+
+        Returns:
+            float: Epoch seconds
+        """
+        duration = pd.Timedelta(granularity_to_timedelta(timeframe))
+        closes_at = last_bar + 2 * duration
+
+        return closes_at.timestamp() + self.settle_delay + self._offset(pair)
+
+    def scan(self, pair, timeframe):
+        """
+        Scan a pair if a new bar closed, write the result and schedule the next scan
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+
+        Returns:
+            dict: Scan record, or None if the bars had not changed
+        """
+        key = (pair, timeframe)
+        record = None
+
+        try:
+            df = self.scanner.client.get_candles(pair, granularity=timeframe, count=200)
+
+            if df is None or df.empty:
+                raise RuntimeError('No data available')
+
+            bar_time = df.index[-1]
+
+            if self.last_bar.get(key) == bar_time:
+                # The closed bar is not published yet (or the market is shut)
+                self._count('unchanged')
+                self._retry(pair, timeframe)
+                return None
+
+            result = self.scanner.scan_pair(pair, timeframe, df=df)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+
+            self.last_bar[key] = bar_time
+            self.retries.pop(key, None)
+            self._count('scans')
+
+            record = {
+                'pair': pair,
+                'timeframe': timeframe,
+                'bar_time': bar_time.isoformat(),
+                'scanned_at': pd.Timestamp.now(tz='UTC').isoformat(),
+                'result': result
+            }
+
+            for sink in self.sinks:
+                sink.write(record)
+
+            self._schedule(self.next_due(pair, timeframe, bar_time), pair, timeframe)
+
+        except Exception as e:
+            self._count('errors')
+            print(f"Error scanning {pair} {timeframe}: {str(e)}")
+            self._retry(pair, timeframe)
+
+        return record
+
+    def _retry(self, pair, timeframe):
+        """Reschedule a scan with exponential backoff"""
+        attempt = self.retries.get((pair, timeframe), 0)
+        self.retries[(pair, timeframe)] = attempt + 1
+
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** attempt)
+        self._schedule(time.time() + delay, pair, timeframe)
+
+    def run_once(self):
+        """
+        Scan every pair and timeframe once, without scheduling follow-ups
+
+        Returns:
+            list: Scan records
+        """
+        jobs = [(pair, timeframe) for timeframe in self.timeframes for pair in self.pairs]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            records = list(executor.map(lambda job: self.scan(*job), jobs))
+
+        with self._condition:
+            self._queue.clear()
+
+        return [record for record in records if record is not None]
+
+    def run(self):
+        """Scan until stop() is called"""
+        start = time.time()
+        for timeframe in self.timeframes:
+            for pair in self.pairs:
+                self._schedule(start + self._offset(pair), pair, timeframe)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while not self._stopped.is_set():
+                    with self._condition:
+                        if not self._queue:
+                            self._condition.wait(1.0)
+                            continue
+
+                        due, _, pair, timeframe = self._queue[0]
+                        delay = due - time.time()
+
+                        if delay > 0:
+                            self._condition.wait(min(delay, 1.0))
+                            continue
+
+                        heapq.heappop(self._queue)
+
+                    executor.submit(self.scan, pair, timeframe)
+        finally:
+            self.close()
+
+    def close(self):
+        """Close all sinks and write out buffered history"""
+        for sink in self.sinks:
+            sink.close()
+
+        if self.scanner.history_store is not None:
+            self.scanner.history_store.flush()
+
+    def stop(self):
+        """Stop the daemon after the current scans"""
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+
+def main():
+    """Run the scanner daemon from the command line"""
+    parser = argparse.ArgumentParser(description='Scan forex pairs right after each bar closes')
+    parser.add_argument('--pairs', default=','.join(Config.DEFAULT_PAIRS), help='Comma-separated instruments')
+    parser.add_argument('--timeframes', default=','.join(Config.TIMEFRAMES), help='Comma-separated timeframes')
+    parser.add_argument('--sink', action='append', default=[],
+                        help="Output: 'jsonl:<path>', 'sqlite:<path>' or 'webhook:<url>' (repeatable)")
+    parser.add_argument('--settle', type=float, default=5.0, help='Seconds to wait after a bar closes')
+    parser.add_argument('--stagger', type=float, default=1.0, help='Seconds between pairs')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent scans')
+    parser.add_argument('--once', action='store_true', help='Scan everything once and exit')
+    args = parser.parse_args()
+
+    daemon = ScanDaemon(
+        pairs=args.pairs.split(','),
+        timeframes=args.timeframes.split(','),
+        sinks=[make_sink(spec) for spec in args.sink] or [JsonlSink('data/scans.jsonl')],
+        settle_delay=args.settle,
+        stagger=args.stagger,
+        max_workers=args.workers
+    )
+
+    if args.once:
+        records = daemon.run_once()
+        daemon.close()
+        print(f"Scanned {len(records)} pair/timeframe combinations")
+        return
+
+    print(f"Scanning {len(daemon.pairs)} pairs on {', '.join(daemon.timeframes)} after each bar close")
+
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == '__main__':
+    main()
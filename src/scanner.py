@@ -2,36 +2,106 @@
 Multi-pair Pattern Scanner for Forex
 """
 from src.oanda_client import OandaClient
-from src.pattern_detector import PatternDetector
-from src.support_resistance import SupportResistance
+from src.analysis_context import AnalysisCache
+from src.confluence import ConfluenceFilter
+from src.batch_analysis import stack_candles, analyze_batch, split_batch
+from src.signal_pipeline import SignalPipeline
+from src.serialization import ScanResult, Signal
 from config import Config
 import pandas as pd
 from datetime import datetime
+from typing import List
 
 
 class ForexScanner:
     """Scanner for detecting price action patterns across multiple pairs"""
 
-    def __init__(self):
-        """Initialize scanner"""
+    def __init__(self, signal_store=None, history_store=None, confluence=True):
+        """
+        Initialize scanner
+
+        Args:
+            signal_store (SignalStore): Optional store used to deduplicate
+                signals across scans and track their outcome
+            history_store (HistoryStore): Optional columnar store receiving
+                every scan snapshot and signal event
+            confluence (bool): Score signals against Config.CONFLUENCE_TIMEFRAMES
+        """
         self.client = OandaClient()
         self.pairs = Config.DEFAULT_PAIRS
         self.timeframes = Config.TIMEFRAMES
+        self.signal_store = signal_store
+        self.history_store = history_store
+        self.analysis_cache = AnalysisCache()
+        self.confluence = None
+
+        if confluence and Config.CONFLUENCE_TIMEFRAMES:
+            self.confluence = ConfluenceFilter(
+                lambda pair, timeframe, count: self.client.get_candles(pair, granularity=timeframe, count=count),
+                self.analysis_cache
+            )
+
+    def _market(self, pair, df, context) -> ScanResult:
+        """
+        Look up the current price and the S/R levels around it
 
-    def scan_pair(self, pair, timeframe='H4'):
+        Args:
+            pair (str): Forex pair
+            df (pd.DataFrame): OHLC data
+            context (AnalysisContext): Context for df
+
+        Returns:
+            dict: Price and level fields of the scan result
+        """
+        sr_detector = context.sr_detector
+        levels = context.levels
+
+        # Get current price (the last close stands in if the price request fails)
+        try:
+            current_price_data = self.client.get_current_price(pair)
+        except Exception as e:
+            print(f"Error fetching price for {pair}: {str(e)}")
+            current_price_data = None
+        current_price = current_price_data['bid'] if current_price_data else df['close'].iloc[-1]
+
+        # Get nearest levels
+        nearest_levels = sr_detector.get_nearest_levels(current_price)
+
+        # Check if at key level
+        at_level = sr_detector.is_at_level(current_price)
+
+        return {
+            'current_price': round(current_price, 5),
+            'spread': current_price_data['spread'] if current_price_data else None,
+            'support_levels': levels['support'][:5],  # Top 5
+            'resistance_levels': levels['resistance'][:5],  # Top 5
+            'nearest_support': nearest_levels['support'],
+            'nearest_resistance': nearest_levels['resistance'],
+            'at_key_level': at_level['at_support'] or at_level['at_resistance'],
+            'level_info': at_level
+        }
+
+    def scan_pair(self, pair, timeframe='H4', df=None, include_levels=True, counters=None) -> ScanResult:
         """
         Scan single pair for patterns
 
         Args:
             pair (str): Forex pair (e.g., 'EUR_USD')
             timeframe (str): Timeframe to analyze
+            df (pd.DataFrame): Optional candles already fetched for the pair
+            include_levels (bool): Always add the current price and S/R
+                levels; when False they are only looked up (and returned)
+                if a directional pattern needs them
+            counters (StageCounters): Optional counters of the scan run the
+                signal filter counts are added to
 
         Returns:
             dict: Scan results
         """
         try:
             # Fetch data
-            df = self.client.get_candles(pair, granularity=timeframe, count=200)
+            if df is None:
+                df = self.client.get_candles(pair, granularity=timeframe, count=200)
 
             if df is None or df.empty:
                 return {
@@ -40,43 +110,29 @@ class ForexScanner:
                     'error': 'No data available'
                 }
 
-            # Detect patterns
-            pattern_detector = PatternDetector(df)
-            pattern_detector.detect_all_patterns()
-
-            # Detect support/resistance
-            sr_detector = SupportResistance(df)
-            levels = sr_detector.detect_support_resistance()
+            # Patterns and S/R levels are computed once per closed candle
+            context = self.analysis_cache.get(pair, timeframe, df)
+            pattern_detector = context.pattern_detector
 
-            # Get current price
-            current_price_data = self.client.get_current_price(pair)
-            current_price = current_price_data['bid'] if current_price_data else df['close'].iloc[-1]
-
-            # Get recent patterns
-            recent_patterns = pattern_detector.get_recent_patterns(last_n=5)
+            # The price request and S/R levels are only paid for when needed
+            market = {}
 
-            # Get nearest levels
-            nearest_levels = sr_detector.get_nearest_levels(current_price)
+            def lookup_market():
+                if not market:
+                    market.update(self._market(pair, df, context))
+                return market
 
-            # Check if at key level
-            at_level = sr_detector.is_at_level(current_price)
+            if include_levels:
+                lookup_market()
 
             # Latest candle info
             latest_candle = df.iloc[-1]
 
-            result = {
+            result: ScanResult = {
                 'pair': pair,
                 'timeframe': timeframe,
                 'timestamp': datetime.now().isoformat(),
-                'current_price': round(current_price, 5),
-                'spread': current_price_data['spread'] if current_price_data else None,
-                'recent_patterns': recent_patterns,
-                'support_levels': levels['support'][:5],  # Top 5
-                'resistance_levels': levels['resistance'][:5],  # Top 5
-                'nearest_support': nearest_levels['support'],
-                'nearest_resistance': nearest_levels['resistance'],
-                'at_key_level': at_level['at_support'] or at_level['at_resistance'],
-                'level_info': at_level,
+                'recent_patterns': pattern_detector.get_recent_patterns(last_n=5),
                 'latest_candle': {
                     'open': float(latest_candle['open']),
                     'high': float(latest_candle['high']),
@@ -87,7 +143,24 @@ class ForexScanner:
             }
 
             # Generate signals
-            result['signals'] = self._generate_signals(result, pattern_detector, sr_detector)
+            result['signals'] = self._generate_signals(result['recent_patterns'], context, lookup_market, counters)
+            result.update(market)
+
+            # Higher-timeframe artifacts are only rebuilt when their bar closes
+            if self.confluence is not None:
+                result['signals'] = self.confluence.apply(pair, timeframe, result['signals'])
+
+            closed_signals = []
+            if self.signal_store is not None:
+                closed_signals = self.signal_store.update_lifecycle(pair, timeframe, df)
+                result['new_signals'] = self.signal_store.update(
+                    pair, timeframe, result['signals'], last_closed=df.index[-1]
+                )
+
+            if self.history_store is not None:
+                self.history_store.record_scan(result, df.index[-1])
+                self.history_store.record_signals(pair, timeframe, result.get('new_signals', result['signals']))
+                self.history_store.record_signals(pair, timeframe, closed_signals)
 
             return result
 
@@ -98,113 +171,179 @@ class ForexScanner:
                 'error': str(e)
             }
 
-    def _generate_signals(self, scan_result, pattern_detector, sr_detector):
+    def _signal_filters(self, context, market, counters=None):
+        """
+        Build the filters for directional patterns, cheapest first
+
+        Candidates are {'pattern', 'spec'} dicts; the current price is only
+        requested once a candidate passes the direction check, and the
+        risk/reward of candidates at a level is stored as 'rr'.
+
+        Args:
+            context (AnalysisContext): Context of the scanned candles
+            market (callable): Returns the price and level fields, looking them up on first call
+            counters (StageCounters): Optional counters of the scan run
+
+        Returns:
+            SignalPipeline: Filters counting into counters
+        """
+        def at_level(candidate):
+            # Bullish patterns at support, bearish patterns at resistance
+            side = 'at_support' if candidate['spec'].direction == 'long' else 'at_resistance'
+            return market()['level_info'][side]
+
+        def risk_reward(candidate):
+            candidate['rr'] = context.sr_detector.calculate_risk_reward(
+                market()['current_price'], candidate['spec'].direction
+            )
+            return candidate['rr']['risk_reward_ratio'] >= Config.MIN_RISK_REWARD
+
+        return (
+            SignalPipeline(counters)
+            .add('directional', lambda candidate: candidate['spec'].direction is not None)
+            .add('at_level', at_level, cost=5)
+            .add('risk_reward', risk_reward, cost=10)
+        )
+
+    def _generate_signals(self, recent_patterns, context, market, counters=None) -> List[Signal]:
         """
         Generate trading signals based on patterns and levels
 
         Args:
-            scan_result (dict): Scan results
-            pattern_detector (PatternDetector): Pattern detector instance
-            sr_detector (SupportResistance): S/R detector instance
+            recent_patterns (list): Recent patterns from the pattern detector
+            context (AnalysisContext): Context of the scanned candles
+            market (callable): Returns the price and level fields, looking them up on first call
+            counters (StageCounters): Optional counters of the scan run
 
         Returns:
             list: Trading signals
         """
-        signals = []
-        current_price = scan_result['current_price']
-        recent_patterns = scan_result['recent_patterns']
-
         if not recent_patterns:
-            return signals
+            return []
 
         # Get latest pattern
         latest_pattern_info = recent_patterns[-1]
+        bar_time = latest_pattern_info['time'].isoformat()
+        registry = context.pattern_detector.registry
+
+        candidates = [
+            {'pattern': pattern, 'spec': registry.get(pattern)}
+            for pattern in latest_pattern_info['patterns']
+        ]
+
+        for candidate in self._signal_filters(context, market, counters).run(candidates):
+            pattern = candidate['pattern']
+            rr = candidate['rr']
+            long = candidate['spec'].direction == 'long'
+
+            signal: Signal = {
+                'type': 'BUY' if long else 'SELL',
+                'pattern': pattern,
+                'reason': f"{pattern} at {'support' if long else 'resistance'} level",
+                'confidence': 'HIGH',
+                'entry': market()['current_price'],
+                'stop_loss': rr['stop_loss'],
+                'take_profit': rr['take_profit'],
+                'risk_reward': rr['risk_reward_ratio'],
+                'risk_pips': rr['risk_pips'],
+                'reward_pips': rr['reward_pips']
+            }
+            candidate['signal'] = signal
 
-        for pattern in latest_pattern_info['patterns']:
-            signal = None
-
-            # Bullish patterns
-            if pattern in ['bullish_hammer', 'bullish_engulfing', 'morning_star']:
-                # Check if at support level
-                if scan_result['level_info']['at_support']:
-                    rr = sr_detector.calculate_risk_reward(current_price, 'long')
-                    if rr['risk_reward_ratio'] >= Config.MIN_RISK_REWARD:
-                        signal = {
-                            'type': 'BUY',
-                            'pattern': pattern,
-                            'reason': f"{pattern} at support level",
-                            'confidence': 'HIGH',
-                            'entry': current_price,
-                            'stop_loss': rr['stop_loss'],
-                            'take_profit': rr['take_profit'],
-                            'risk_reward': rr['risk_reward_ratio'],
-                            'risk_pips': rr['risk_pips'],
-                            'reward_pips': rr['reward_pips']
-                        }
-
-            # Bearish patterns
-            elif pattern in ['bearish_shooting_star', 'bearish_engulfing', 'evening_star']:
-                # Check if at resistance level
-                if scan_result['level_info']['at_resistance']:
-                    rr = sr_detector.calculate_risk_reward(current_price, 'short')
-                    if rr['risk_reward_ratio'] >= Config.MIN_RISK_REWARD:
-                        signal = {
-                            'type': 'SELL',
-                            'pattern': pattern,
-                            'reason': f"{pattern} at resistance level",
-                            'confidence': 'HIGH',
-                            'entry': current_price,
-                            'stop_loss': rr['stop_loss'],
-                            'take_profit': rr['take_profit'],
-                            'risk_reward': rr['risk_reward_ratio'],
-                            'risk_pips': rr['risk_pips'],
-                            'reward_pips': rr['reward_pips']
-                        }
-
-            # Inside bar breakout potential
-            elif pattern == 'inside_bar':
-                signal = {
-                    'type': 'WATCH',
-                    'pattern': pattern,
-                    'reason': 'Consolidation - potential breakout',
-                    'confidence': 'MEDIUM',
-                    'action': 'Wait for breakout direction'
-                }
+        signals: List[Signal] = []
+
+        for candidate in candidates:
+            spec = candidate['spec']
+            signal = candidate.get('signal')
 
-            # Doji indecision
-            elif pattern == 'doji':
+            # Non-directional patterns (inside bar, doji, ...) to watch
+            if spec.direction is None and spec.reason:
                 signal = {
                     'type': 'WATCH',
-                    'pattern': pattern,
-                    'reason': 'Indecision - potential reversal',
-                    'confidence': 'LOW',
-                    'action': 'Wait for confirmation'
+                    'pattern': candidate['pattern'],
+                    'reason': spec.reason,
+                    'confidence': spec.confidence,
+                    'action': spec.action
                 }
 
             if signal:
+                signal['bar_time'] = bar_time
                 signals.append(signal)
 
         return signals
 
-    def scan_all_pairs(self, timeframe='H4'):
+    def scan_all_pairs(self, timeframe='H4', batched=False, include_levels=True,
+                       counters=None) -> List[ScanResult]:
         """
         Scan all configured pairs
 
         Args:
             timeframe (str): Timeframe to analyze
+            batched (bool): Detect patterns for all pairs in one vectorized call
+            include_levels (bool): Add price and S/R levels to every result
+                (see scan_pair)
+            counters (StageCounters): Optional counters the signal filter
+                counts of this scan are added to
 
         Returns:
             list: Results for all pairs
         """
+        if batched:
+            return self._scan_all_pairs_batched(timeframe, include_levels, counters)
+
         results = []
 
         for pair in self.pairs:
             print(f"Scanning {pair} on {timeframe}...")
-            result = self.scan_pair(pair, timeframe)
+            result = self.scan_pair(pair, timeframe, include_levels=include_levels, counters=counters)
             results.append(result)
 
         return results
 
+    def _scan_all_pairs_batched(self, timeframe, include_levels=True, counters=None) -> List[ScanResult]:
+        """
+        Scan all configured pairs, detecting patterns over a stacked price array
+
+        Args:
+            timeframe (str): Timeframe to analyze
+            include_levels (bool): Add price and S/R levels to every result
+            counters (StageCounters): Optional counters of this scan
+
+        Returns:
+            list: Results for all pairs
+        """
+        frames = {}
+        errors = {}
+
+        for pair in self.pairs:
+            try:
+                frames[pair] = self.client.get_candles(pair, granularity=timeframe, count=200)
+            except Exception as e:
+                errors[pair] = str(e)
+
+        pairs, tensor, lengths = stack_candles(frames)
+        features, masks = analyze_batch(tensor)
+        batch_results = split_batch(features, masks, pairs, lengths)
+
+        results = []
+
+        for pair in self.pairs:
+            if pair not in batch_results:
+                results.append({
+                    'pair': pair,
+                    'timeframe': timeframe,
+                    'error': errors.get(pair, 'No data available')
+                })
+                continue
+
+            context = self.analysis_cache.get(pair, timeframe, frames[pair])
+            context.use_batch_results(*batch_results[pair])
+            results.append(self.scan_pair(
+                pair, timeframe, df=frames[pair], include_levels=include_levels, counters=counters
+            ))
+
+        return results
+
     def scan_multi_timeframe(self, pair):
         """
         Scan single pair across multiple timeframes
@@ -226,26 +365,35 @@ class ForexScanner:
             'timeframes': results
         }
 
-    def get_active_signals(self, timeframe='H4'):
+    def get_active_signals(self, timeframe='H4', only_new=False, include_levels=False,
+                           counters=None) -> List[Signal]:
         """
         Get all active trading signals
 
         Args:
             timeframe (str): Timeframe to scan
+            only_new (bool): Only return signals that are new or changed since
+                the previous scan (requires a signal store)
+            include_levels (bool): Look up price and S/R levels for every pair,
+                not only for pairs with a directional pattern
+            counters (StageCounters): Optional counters the signal filter
+                counts of this scan are added to
 
         Returns:
             list: Active trading signals
         """
-        all_results = self.scan_all_pairs(timeframe)
+        all_results = self.scan_all_pairs(timeframe, include_levels=include_levels, counters=counters)
 
-        active_signals = []
+        active_signals: List[Signal] = []
 
         for result in all_results:
             if 'error' in result:
                 continue
 
-            if result.get('signals'):
-                for signal in result['signals']:
+            signals = result.get('new_signals', []) if only_new else result.get('signals')
+
+            if signals:
+                for signal in signals:
                     if signal['type'] in ['BUY', 'SELL']:
                         active_signals.append({
                             'pair': result['pair'],
@@ -253,10 +401,11 @@ class ForexScanner:
                             **signal
                         })
 
-        # Sort by confidence and risk/reward
+        # Sort by confidence, higher-timeframe confluence and risk/reward
         active_signals.sort(
             key=lambda x: (
                 {'HIGH': 3, 'MEDIUM': 2, 'LOW': 1}.get(x.get('confidence', 'LOW'), 0),
+                x.get('confluence_score', 0),
                 x.get('risk_reward', 0)
             ),
             reverse=True
@@ -0,0 +1,217 @@
+"""
+Typed API response schemas and fast JSON encoding
+"""
+import gzip
+import hashlib
+import json
+import math
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, TypedDict
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional dependency: falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional dependency: gzip is used instead
+    brotli = None
+
+
+class PatternInfo(TypedDict):
+    time: datetime
+    patterns: List[str]
+
+
+class Level(TypedDict):
+    price: float
+    strength: int
+    type: str
+
+
+class LevelInfo(TypedDict):
+    at_support: bool
+    at_resistance: bool
+    support_level: Optional[Level]
+    resistance_level: Optional[Level]
+
+
+class Candle(TypedDict):
+    open: float
+    high: float
+    low: float
+    close: float
+    body_position: str
+
+
+class ConfluenceInfo(TypedDict):
+    level: Optional[float]
+    trend: str
+
+
+class Signal(TypedDict, total=False):
+    pair: str  # Set on active and tracked signals
+    timeframe: str
+    type: str
+    pattern: str
+    reason: str
+    confidence: str
+    action: str
+    entry: float
+    stop_loss: float
+    take_profit: float
+    risk_reward: float
+    risk_pips: float
+    reward_pips: float
+    confluence_score: int
+    confluence: Dict[str, ConfluenceInfo]
+    bar_time: str
+
+
+class ScanResult(TypedDict, total=False):
+    pair: str
+    timeframe: str
+    timestamp: str
+    current_price: float
+    spread: Optional[float]
+    recent_patterns: List[PatternInfo]
+    support_levels: List[Level]
+    resistance_levels: List[Level]
+    nearest_support: List[Level]
+    nearest_resistance: List[Level]
+    at_key_level: bool
+    level_info: LevelInfo
+    latest_candle: Candle
+    signals: List[Signal]
+    new_signals: List[Signal]
+    digest: str
+    unchanged: bool
+    error: str
+
+
+# Fields that change on every scan without the analysis changing
+VOLATILE_FIELDS = ('timestamp', 'digest')
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def _default(obj):
+    """Convert values the standard library encoder does not handle"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):
+        # NumPy scalars and arrays (NumPy itself is not imported here to keep startup fast)
+        value = obj.tolist()
+        return None if isinstance(value, float) and math.isnan(value) else value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, sort_keys=False):
+    """
+    Encode an object as compact JSON
+
+    NumPy scalars and arrays, datetimes and pandas Timestamps are encoded
+    natively (datetimes as ISO 8601).
+
+    Args:
+        obj: Object to encode
+        sort_keys (bool): Sort dict keys (needed for stable digests)
+
+    Returns:
+        bytes: JSON document
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    return json.dumps(obj, default=_default, separators=(',', ':'), sort_keys=sort_keys).encode('utf-8')
+
+
+def loads(data):
+    """Decode a JSON document"""
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider using dumps(), so jsonify() gets the fast encoder"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+
+def result_digest(result: ScanResult) -> str:
+    """
+    Get a digest of a scan result that ignores volatile fields
+
+    Args:
+        result (dict): Scan result
+
+    Returns:
+        str: Short hex digest
+    """
+    stable = {key: value for key, value in result.items() if key not in VOLATILE_FIELDS}
+    return hashlib.blake2b(dumps(stable, sort_keys=True), digest_size=8).hexdigest()
+
+
+def omit_unchanged(results: List[ScanResult], known: Set[str]) -> List[ScanResult]:
+    """
+    Add digests to scan results and strip the ones the client already has
+
+    Args:
+        results (list): Scan results
+        known (set): Digests the client received earlier
+
+    Returns:
+        list: Results, unchanged ones reduced to pair, timeframe and digest
+    """
+    output = []
+
+    for result in results:
+        digest = result_digest(result)
+
+        if digest in known:
+            output.append({
+                'pair': result.get('pair'),
+                'timeframe': result.get('timeframe'),
+                'digest': digest,
+                'unchanged': True
+            })
+        else:
+            output.append({**result, 'digest': digest})
+
+    return output
+
+
+def compress(body, accept_encoding):
+    """
+    Compress a response body with the best encoding the client accepts
+
+    Args:
+        body (bytes): Response body
+        accept_encoding (str): Accept-Encoding request header
+
+    Returns:
+        tuple: (body, encoding), encoding is None when left uncompressed
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=4), 'br'
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=5), 'gzip'
+
+    return body, None
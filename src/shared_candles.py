@@ -0,0 +1,257 @@
+"""
+Shared-memory candle arrays for process-pool workers
+"""
+import threading
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from src.candle_store import CandleStore
+
+
+# Value columns, stored column-major after the int64 timestamps
+COLUMNS = CandleStore.COLUMNS
+
+
+def _layout(length):
+    """
+    Get the byte size of a series block
+
+    Args:
+        length (int): Number of candles
+
+    Returns:
+        int: Bytes for the timestamps and value columns
+    """
+    return 8 * length * (1 + len(COLUMNS))
+
+
+def _frame(buffer, length):
+    """
+    Build a read-only DataFrame over a block without copying
+
+    Args:
+        buffer (memoryview): Block buffer
+        length (int): Number of candles
+
+    Returns:
+        pd.DataFrame: OHLCV candles indexed by UTC time
+    """
+    times = np.ndarray((length,), dtype=np.int64, buffer=buffer)
+    values = np.ndarray((len(COLUMNS), length), dtype=np.float64, buffer=buffer, offset=8 * length)
+    times.flags.writeable = False
+    values.flags.writeable = False
+
+    # Building the UTC index from a DatetimeArray avoids tz_localize's copy
+    index = pd.DatetimeIndex(pd.arrays.DatetimeArray(times.view('datetime64[ns]'), dtype=pd.DatetimeTZDtype(tz='UTC')))
+
+    # values.T is one 2-D block, which pandas wraps without copying
+    return pd.DataFrame(values.T, index=index, columns=COLUMNS, copy=False)
+
+
+def _release(blocks):
+    """Close and unlink every block (runs on close() or garbage collection)"""
+    for block in blocks.values():
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+    blocks.clear()
+
+
+class SharedCandleRegistry:
+    """
+    Candle series published once to shared memory by the parent process
+
+    Workers attach to a series by (instrument, granularity) through the
+    small handles from handles(), so every process maps the same pages
+    instead of unpickling its own copy. The registry owns the blocks and
+    unlinks them on close(), on leaving a with block, or when it is garbage
+    collected; the multiprocessing resource tracker unlinks them if the
+    parent dies first.
+    """
+
+    def __init__(self, store=None):
+        """
+        Initialize shared candle registry
+
+        Args:
+            store (CandleStore): Candle store used by load()
+        """
+        self.store = store or CandleStore()
+        self._blocks = {}
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _release, self._blocks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def publish(self, instrument, granularity, df):
+        """
+        Copy a candle series into shared memory, replacing any earlier copy
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            df (pd.DataFrame): OHLCV candles with a UTC DatetimeIndex
+
+        Returns:
+            dict: Handle with the block 'name', 'length', 'instrument' and 'granularity'
+        """
+        length = len(df)
+        # Zero-size blocks are not allowed; an empty series still gets one byte
+        block = shared_memory.SharedMemory(create=True, size=max(_layout(length), 1))
+
+        times = np.ndarray((length,), dtype=np.int64, buffer=block.buf)
+        times[:] = df.index.as_unit('ns').asi8
+        values = np.ndarray((len(COLUMNS), length), dtype=np.float64, buffer=block.buf, offset=8 * length)
+        for k, column in enumerate(COLUMNS):
+            values[k] = df[column].to_numpy(dtype=float) if column in df else np.nan
+        del times, values
+
+        handle = {'name': block.name, 'length': length, 'instrument': instrument, 'granularity': granularity}
+        key = (instrument, granularity)
+
+        with self._lock:
+            previous = self._blocks.pop(key, None)
+            self._blocks[key] = block
+            self._handles[key] = handle
+
+        if previous is not None:
+            # Workers that already attached keep their mapping until they detach
+            previous.close()
+            previous.unlink()
+
+        return handle
+
+    def load(self, instrument, granularity, start=None, end=None):
+        """
+        Publish a series from the candle store
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            start (datetime): Optional first candle time (inclusive)
+            end (datetime): Optional last candle time (exclusive)
+
+        Returns:
+            dict: Handle, or None if nothing is stored
+        """
+        df = self.store.load(instrument, granularity, start=start, end=end)
+        if df is None or df.empty:
+            return None
+        return self.publish(instrument, granularity, df)
+
+    def handles(self):
+        """
+        Get the handles of every published series
+
+        Returns:
+            dict: (instrument, granularity) -> handle, picklable for worker initializers
+        """
+        with self._lock:
+            return dict(self._handles)
+
+    def nbytes(self):
+        """int: Shared memory held by the registry"""
+        with self._lock:
+            return sum(block.size for block in self._blocks.values())
+
+    def release(self, instrument, granularity):
+        """
+        Unlink one series
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+        """
+        with self._lock:
+            block = self._blocks.pop((instrument, granularity), None)
+            self._handles.pop((instrument, granularity), None)
+
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    def close(self):
+        """Unlink every series"""
+        with self._lock:
+            self._handles.clear()
+            _release(self._blocks)
+
+
+# Per-process attachments; the blocks must stay open while their frames are in use
+_attached = {}
+_worker_handles = {}
+_attached_lock = threading.Lock()
+
+
+def attach(handle):
+    """
+    Get a series published by another process, without copying it
+
+    The DataFrame is read-only and stays valid until detach_all().
+
+    Args:
+        handle (dict): Handle from SharedCandleRegistry.publish()
+
+    Returns:
+        pd.DataFrame: OHLCV candles indexed by UTC time
+    """
+    with _attached_lock:
+        entry = _attached.get(handle['name'])
+        if entry is None:
+            block = shared_memory.SharedMemory(name=handle['name'])
+            entry = (block, _frame(block.buf, handle['length']))
+            _attached[handle['name']] = entry
+        return entry[1]
+
+
+def detach_all():
+    """Close this process's attachments (the owner still has to unlink them)"""
+    with _attached_lock:
+        blocks = [block for block, _ in _attached.values()]
+        _attached.clear()
+
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            # A frame is still referenced; the mapping goes away with the process
+            pass
+
+
+def init_worker(handles):
+    """
+    Process-pool initializer that makes the registry's series available
+
+    Args:
+        handles (dict): (instrument, granularity) -> handle from SharedCandleRegistry.handles()
+    """
+    with _attached_lock:
+        _worker_handles.clear()
+        _worker_handles.update(handles)
+
+
+def shared_candles(instrument, granularity):
+    """
+    Get a series in a worker started with init_worker
+
+    Args:
+        instrument (str): Forex pair
+        granularity (str): Timeframe
+
+    Returns:
+        pd.DataFrame: Read-only OHLCV candles, or None if not published
+    """
+    with _attached_lock:
+        handle = _worker_handles.get((instrument, granularity))
+
+    if handle is None:
+        return None
+    return attach(handle)
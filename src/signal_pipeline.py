@@ -0,0 +1,120 @@
+"""
+Staged filter pipeline for candidate signals and trades
+"""
+import threading
+
+
+class StageCounters:
+    """Candidates evaluated and rejected per stage, accumulated over the pipelines of one run"""
+
+    def __init__(self):
+        """Initialize stage counters"""
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, counts):
+        """
+        Add the counts of one run
+
+        Args:
+            counts (dict): Stage name -> [evaluated, rejected]
+        """
+        with self._lock:
+            for name, (evaluated, rejected) in counts.items():
+                totals = self._counts.setdefault(name, [0, 0])
+                totals[0] += evaluated
+                totals[1] += rejected
+
+    def merge(self, snapshot):
+        """
+        Add counts reported by snapshot(), e.g. those cached with a result
+
+        Args:
+            snapshot (dict): Stage name -> {'evaluated', 'rejected', ...}
+        """
+        self.add({name: (stage['evaluated'], stage['rejected']) for name, stage in snapshot.items()})
+
+    def snapshot(self):
+        """
+        Get the counters
+
+        Returns:
+            dict: Stage name -> {'evaluated', 'rejected', 'passed'}, in stage order
+        """
+        with self._lock:
+            return {
+                name: {'evaluated': evaluated, 'rejected': rejected, 'passed': evaluated - rejected}
+                for name, (evaluated, rejected) in self._counts.items()
+            }
+
+    def reset(self):
+        """Clear the counters"""
+        with self._lock:
+            self._counts.clear()
+
+
+class SignalPipeline:
+    """
+    Filter candidates through stages ordered from cheapest to most expensive
+
+    Each stage is check(candidate) -> bool. A candidate stops at the first
+    stage that rejects it, so expensive stages (S/R levels, prices from the
+    API) only run for candidates every cheaper stage kept. Stages may store
+    what they computed on the candidate dict for later stages; a stage must
+    not cost less than a stage whose results it reads.
+    """
+
+    def __init__(self, counters=None):
+        """
+        Initialize signal pipeline
+
+        Args:
+            counters (StageCounters): Counters of the run this pipeline is
+                part of (a private set is created when not given)
+        """
+        self.stages = []
+        self.counters = counters if counters is not None else StageCounters()
+
+    def add(self, name, check, cost=0):
+        """
+        Add a stage
+
+        Stages run in order of cost; stages of equal cost keep the order
+        they were added in.
+
+        Args:
+            name (str): Stage name used in the counters
+            check (callable): check(candidate) -> True to keep the candidate
+            cost (float): Relative cost of the check
+
+        Returns:
+            SignalPipeline: The pipeline, for chaining
+        """
+        self.stages.append((cost, len(self.stages), name, check))
+        self.stages.sort(key=lambda stage: stage[:2])
+        return self
+
+    def run(self, candidates):
+        """
+        Filter candidates, lazily and in order
+
+        Args:
+            candidates (iterable): Candidate dicts
+
+        Returns:
+            list: Candidates that passed every stage, in their original order
+        """
+        counts = {name: [0, 0] for _, _, name, _ in self.stages}
+        passed = []
+
+        for candidate in candidates:
+            for _, _, name, check in self.stages:
+                counts[name][0] += 1
+                if not check(candidate):
+                    counts[name][1] += 1
+                    break
+            else:
+                passed.append(candidate)
+
+        self.counters.add(counts)
+        return passed
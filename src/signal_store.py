@@ -0,0 +1,344 @@
+"""
+Signal store for deduplication and lifecycle tracking across scans
+"""
+import json
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from config import Config
+
+
+class SignalStore:
+    """
+    Keep trading signals between scans, in memory with optional SQLite persistence
+
+    Open signals are held in memory per (pair, timeframe), so a lifecycle
+    check only visits the scanned series. Closed and watch signals stay in
+    memory for the retention window after their pattern candle; with SQLite
+    they remain in the database, which is searched for signals not in memory.
+    """
+
+    # Fields that make a signal "changed" when they differ between scans.
+    # 'entry' follows the live price, so it is not part of the comparison.
+    FINGERPRINT_FIELDS = ('type', 'stop_loss', 'take_profit', 'confidence')
+
+    # Changes to these restart lifecycle tracking; other changes keep it
+    PRICE_FIELDS = ('type', 'stop_loss', 'take_profit')
+
+    def __init__(self, db_path=None, retention_days=None):
+        """
+        Initialize signal store
+
+        Args:
+            db_path (str): Optional SQLite database path for persistence
+            retention_days (float): Days closed and watch signals are kept in
+                memory after their pattern candle (defaults to Config.SIGNAL_RETENTION_DAYS)
+        """
+        self.db_path = db_path
+        self.retention = pd.Timedelta(
+            days=Config.SIGNAL_RETENTION_DAYS if retention_days is None else retention_days
+        )
+        self._open = {}      # (pair, timeframe) -> {key: record}
+        self._inactive = {}  # (pair, timeframe) -> {key: record}, closed and watch signals
+        self._lock = threading.Lock()
+
+        if self.db_path:
+            self._init_db()
+            self._load()
+
+    @staticmethod
+    def make_key(pair, timeframe, bar_time, pattern):
+        """
+        Build the key identifying a signal
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+            bar_time: Time of the pattern candle
+            pattern (str): Pattern name
+
+        Returns:
+            tuple: (pair, timeframe, bar_time, pattern)
+        """
+        return (pair, timeframe, pd.Timestamp(bar_time).isoformat(), pattern)
+
+    def _connect(self):
+        """Open a connection to the SQLite database"""
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        """Create the signals table if needed"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS signals (
+                    pair TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    bar_time TEXT NOT NULL,
+                    pattern TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (pair, timeframe, bar_time, pattern)
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS signals_status ON signals (status)')
+
+    def _load(self):
+        """Load persisted open signals into memory"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT pair, timeframe, bar_time, pattern, data FROM signals WHERE status = 'open'"
+            ).fetchall()
+
+        for pair, timeframe, bar_time, pattern, data in rows:
+            self._put((pair, timeframe, bar_time, pattern), json.loads(data))
+
+    def _get(self, key):
+        """Get a signal record held in memory, or None"""
+        series = key[:2]
+        record = self._open.get(series, {}).get(key)
+        if record is None:
+            record = self._inactive.get(series, {}).get(key)
+        return record
+
+    def _put(self, key, record):
+        """Hold a signal record in memory under its status"""
+        series = key[:2]
+        self._open.get(series, {}).pop(key, None)
+        self._inactive.get(series, {}).pop(key, None)
+
+        group = self._open if record['status'] == 'open' else self._inactive
+        group.setdefault(series, {})[key] = record
+
+    def _fetch(self, keys):
+        """
+        Read signal records from SQLite
+
+        Args:
+            keys (list): Signal keys
+
+        Returns:
+            dict: Key -> record for the keys that are stored
+        """
+        if not self.db_path or not keys:
+            return {}
+
+        records = {}
+        with self._connect() as conn:
+            for key in keys:
+                row = conn.execute(
+                    'SELECT data FROM signals WHERE pair = ? AND timeframe = ? AND bar_time = ? AND pattern = ?',
+                    key
+                ).fetchone()
+                if row is not None:
+                    records[key] = json.loads(row[0])
+
+        return records
+
+    def _prune(self, series, now):
+        """Drop closed and watch signals of a series older than the retention window"""
+        records = self._inactive.get(series)
+        if not records:
+            return
+
+        cutoff = pd.Timestamp(now) - self.retention
+        for key in [key for key in records if pd.Timestamp(key[2]) < cutoff]:
+            del records[key]
+
+    def _persist(self, records):
+        """
+        Write signal records to SQLite
+
+        Args:
+            records (list): Signal records to upsert
+        """
+        if not self.db_path or not records:
+            return
+
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO signals (pair, timeframe, bar_time, pattern, status, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (r['pair'], r['timeframe'], r['bar_time'], r['pattern'], r['status'], json.dumps(r, default=str))
+                    for r in records
+                ]
+            )
+
+    def update(self, pair, timeframe, signals, last_closed=None):
+        """
+        Record the signals of a scan
+
+        A new signal (or one whose type, stop or target changed) is only
+        checked against candles closing after last_closed, since it was
+        emitted at the price after those candles. A signal whose other
+        fields changed keeps its status and lifecycle progress.
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+            signals (list): Signals from the scanner (with 'bar_time' and 'pattern')
+            last_closed: Time of the last closed candle when the signals
+                were emitted (defaults to each signal's pattern bar)
+
+        Returns:
+            list: Signals that are new or changed since the previous scan
+        """
+        emitted = []
+        changed_records = []
+
+        keys = [self.make_key(pair, timeframe, signal['bar_time'], signal['pattern']) for signal in signals]
+
+        with self._lock:
+            # Signals closed earlier may only be in the database
+            stored = self._fetch([key for key in keys if self._get(key) is None])
+            for key, record in stored.items():
+                self._put(key, record)
+
+            for signal, key in zip(signals, keys):
+                fingerprint = [signal.get(field) for field in self.FINGERPRINT_FIELDS]
+                existing = self._get(key)
+
+                if existing is not None and (
+                        existing['status'] in ('hit_tp', 'hit_sl') or
+                        [existing.get(f) for f in self.FINGERPRINT_FIELDS] == fingerprint):
+                    continue
+
+                if existing is not None and all(
+                        existing.get(field) == signal.get(field) for field in self.PRICE_FIELDS):
+                    # Same levels: keep the status, last check and exit
+                    lifecycle = {
+                        field: existing[field]
+                        for field in ('status', 'last_checked', 'exit_time', 'exit_price')
+                    }
+                else:
+                    trackable = signal['type'] in ('BUY', 'SELL')
+                    checked_from = last_closed if last_closed is not None else signal['bar_time']
+                    lifecycle = {
+                        'status': 'open' if trackable else 'watch',
+                        'last_checked': pd.Timestamp(checked_from).isoformat(),
+                        'exit_time': None,
+                        'exit_price': None
+                    }
+
+                record = {
+                    **signal,
+                    'pair': pair,
+                    'timeframe': timeframe,
+                    'bar_time': key[2],
+                    **lifecycle
+                }
+
+                self._put(key, record)
+                changed_records.append(record)
+                emitted.append(signal)
+
+            self._persist(changed_records)
+
+        return emitted
+
+    def update_lifecycle(self, pair, timeframe, df):
+        """
+        Check open signals against candles closed since they were last checked
+
+        A candle touching both stop and target counts as a stop hit,
+        the same assumption the backtester makes.
+
+        Args:
+            pair (str): Forex pair
+            timeframe (str): Timeframe
+            df (pd.DataFrame): Closed OHLC candles
+
+        Returns:
+            list: Signal records that closed (status 'hit_tp' or 'hit_sl')
+        """
+        if df is None or df.empty:
+            return []
+
+        times = df.index
+        highs = df['high'].to_numpy(dtype=float)
+        lows = df['low'].to_numpy(dtype=float)
+
+        closed = []
+        updated = []
+        series = (pair, timeframe)
+
+        with self._lock:
+            for key, record in list(self._open.get(series, {}).items()):
+                start = times.searchsorted(pd.Timestamp(record['last_checked']), side='right')
+                if start >= len(times):
+                    continue
+
+                if record['type'] == 'BUY':
+                    stop_hits = lows[start:] <= record['stop_loss']
+                    target_hits = highs[start:] >= record['take_profit']
+                else:
+                    stop_hits = highs[start:] >= record['stop_loss']
+                    target_hits = lows[start:] <= record['take_profit']
+
+                stop_idx = np.argmax(stop_hits) if stop_hits.any() else None
+                target_idx = np.argmax(target_hits) if target_hits.any() else None
+
+                if stop_idx is not None and (target_idx is None or stop_idx <= target_idx):
+                    record['status'] = 'hit_sl'
+                    record['exit_price'] = record['stop_loss']
+                    record['exit_time'] = times[start + stop_idx].isoformat()
+                    closed.append(record)
+                elif target_idx is not None:
+                    record['status'] = 'hit_tp'
+                    record['exit_price'] = record['take_profit']
+                    record['exit_time'] = times[start + target_idx].isoformat()
+                    closed.append(record)
+
+                record['last_checked'] = times[-1].isoformat()
+                updated.append(record)
+
+            for record in closed:
+                self._put(self.make_key(pair, timeframe, record['bar_time'], record['pattern']), record)
+
+            self._prune(series, times[-1])
+            self._persist(updated)
+
+        return closed
+
+    def get_signals(self, pair=None, timeframe=None, status=None):
+        """
+        Get tracked signals
+
+        Closed and watch signals come from SQLite when it is used, otherwise
+        only those within the retention window are returned.
+
+        Args:
+            pair (str): Optional pair filter
+            timeframe (str): Optional timeframe filter
+            status (str): Optional status filter ('open', 'hit_tp', 'hit_sl', 'watch')
+
+        Returns:
+            list: Signal records, most recent bar first
+        """
+        if self.db_path:
+            # Every record in memory is also written to the database
+            filters = {'pair': pair, 'timeframe': timeframe, 'status': status}
+            clauses = [f"{column} = ?" for column, value in filters.items() if value is not None]
+            query = 'SELECT data FROM signals'
+            if clauses:
+                query += ' WHERE ' + ' AND '.join(clauses)
+
+            with self._connect() as conn:
+                rows = conn.execute(query, [value for value in filters.values() if value is not None]).fetchall()
+
+            records = [json.loads(data) for data, in rows]
+        else:
+            with self._lock:
+                records = [
+                    dict(record)
+                    for group in (self._open, self._inactive)
+                    for series, series_records in group.items()
+                    if (pair is None or series[0] == pair) and (timeframe is None or series[1] == timeframe)
+                    for record in series_records.values()
+                    if status is None or record['status'] == status
+                ]
+
+        records.sort(key=lambda r: r['bar_time'], reverse=True)
+
+        return records
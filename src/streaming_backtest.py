@@ -0,0 +1,416 @@
+"""
+Bounded-memory pattern backtest streamed from the candle store
+"""
+import argparse
+import csv
+from collections import deque
+import numpy as np
+import pandas as pd
+from src.analysis_context import AnalysisContext
+from src.backtester import Backtester, IntrabarResolver
+from src.candle_store import CandleStore, granularity_to_timedelta
+from src.volatility import RollingATR
+from config import Config
+
+
+TRADE_FIELDS = [
+    'entry_time', 'exit_time', 'pattern', 'direction', 'entry', 'stop_loss', 'take_profit',
+    'exit_price', 'result', 'pnl', 'pnl_pips', 'bars_held'
+]
+
+
+class StreamingBacktester(Backtester):
+    """
+    Backtest a pattern over stored candles one block at a time
+
+    Only the last S/R lookback of bars, the ATR state, the open trades and
+    running statistics are kept between blocks, and closed trades are
+    written to a CSV file as they are settled, so memory does not grow with
+    the length of the history. Results match Backtester.backtest_pattern on the same
+    candles.
+    """
+
+    def __init__(self, initial_balance=10000, risk_per_trade=1.0, intrabar_resolver=None,
+                 store=None, chunk_size=50000, max_bars_held=50):
+        """
+        Initialize streaming backtester
+
+        Args:
+            initial_balance (float): Starting account balance
+            risk_per_trade (float): Risk percentage per trade
+            intrabar_resolver (IntrabarResolver): Optional resolver for bars
+                touching both stop and target (stop is assumed first otherwise)
+            store (CandleStore): Candle store to read from
+            chunk_size (int): Candles read per block
+            max_bars_held (int): Trades still open after this many bars past
+                the entry bar are closed at market
+        """
+        super().__init__(initial_balance, risk_per_trade, intrabar_resolver)
+        self.store = store or CandleStore()
+        self.chunk_size = chunk_size
+        self.max_bars_held = max_bars_held
+
+    def _new_run(self):
+        """
+        Create the state of one backtest run
+
+        Returns:
+            dict: 'balance' and running 'stats', local to the run
+        """
+        return {
+            'balance': self.initial_balance,
+            'stats': {
+                'total_trades': 0,
+                'winning_trades': 0,
+                'losing_trades': 0,
+                'total_pnl': 0.0,
+                'win_pnl': 0.0,
+                'loss_pnl': 0.0,
+                'win_pips': 0.0,
+                'loss_pips': 0.0,
+                'bars_held': 0,
+                'max_equity': self.initial_balance,
+                'min_equity': self.initial_balance
+            }
+        }
+
+    def _advance(self, trade, times, highs, lows, closes, offset):
+        """
+        Walk an open trade through the bars of a window
+
+        Args:
+            trade (dict): Open trade; 'next' is the global index of its next bar
+            times (pd.DatetimeIndex): Window candle times
+            highs (np.ndarray): Window highs
+            lows (np.ndarray): Window lows
+            closes (np.ndarray): Window closes
+            offset (int): Global index of the first window bar
+        """
+        start = trade['next'] - offset
+        limit = self.max_bars_held + 1 - trade['bars_held']
+        end = min(len(highs), start + limit)
+
+        if end <= start:
+            return
+
+        if trade['direction'] == 'long':
+            hit_stop = lows[start:end] <= trade['stop_loss']
+            hit_target = highs[start:end] >= trade['take_profit']
+        else:
+            hit_stop = highs[start:end] >= trade['stop_loss']
+            hit_target = lows[start:end] <= trade['take_profit']
+
+        hits = np.flatnonzero(hit_stop | hit_target)
+
+        if len(hits):
+            k = hits[0]
+            stop_first = hit_stop[k]
+
+            # Both touched in the same candle: drill down if possible, else stop first
+            if stop_first and hit_target[k] and self.intrabar_resolver is not None:
+                resolved = self.intrabar_resolver.resolve(
+                    times[start + k], trade['stop_loss'], trade['take_profit'], trade['direction']
+                )
+                stop_first = resolved != 'target'
+
+            exit_price = trade['stop_loss'] if stop_first else trade['take_profit']
+            self._close(trade, times[start + k], exit_price, 'loss' if stop_first else 'win', k + 1)
+            return
+
+        if end - start == limit:
+            self._close(trade, times[end - 1], closes[end - 1], 'timeout', limit)
+            return
+
+        trade['bars_held'] += end - start
+        trade['next'] = offset + end
+
+    def _close(self, trade, exit_time, exit_price, result, bars):
+        """
+        Mark a trade closed, storing its result in R multiples
+
+        Args:
+            trade (dict): Open trade
+            exit_time (pd.Timestamp): Time of the exit candle
+            exit_price (float): Exit price
+            result (str): 'win', 'loss' or 'timeout'
+            bars (int): Bars of this window the trade was held
+        """
+        entry = trade['entry']
+        stop_loss = trade['stop_loss']
+
+        pip_size = trade['pip_size']
+
+        if trade['direction'] == 'long':
+            pnl_pips = (exit_price - entry) / pip_size
+        else:
+            pnl_pips = (entry - exit_price) / pip_size
+
+        if result == 'loss':
+            r_multiple = -1.0
+        elif result == 'win':
+            r_multiple = abs(trade['take_profit'] - entry) / abs(entry - stop_loss)
+        else:
+            r_multiple = pnl_pips / abs((entry - stop_loss) / pip_size)
+
+        trade.update({
+            'exit_time': exit_time,
+            'exit_price': exit_price,
+            'result': result,
+            'pnl_pips': pnl_pips,
+            'bars_held': trade['bars_held'] + bars,
+            'r_multiple': r_multiple,
+            'closed': True
+        })
+
+    def _settle(self, run, pending, writer, final=False):
+        """
+        Apply closed trades to the balance in signal order
+
+        Position size depends on the balance after all earlier signals, so a
+        trade is only settled once every earlier trade has closed.
+
+        Args:
+            run (dict): Run state from _new_run
+            pending (deque): Trades in signal order
+            writer (csv.DictWriter): Optional trade log writer
+            final (bool): End of data: drop trades that never closed
+        """
+        stats = run['stats']
+
+        while pending and (pending[0]['closed'] or final):
+            trade = pending.popleft()
+            if not trade['closed']:
+                continue
+
+            risk_amount = run['balance'] * (self.risk_per_trade / 100)
+            pnl = risk_amount * trade['r_multiple']
+            run['balance'] += pnl
+
+            stats['total_trades'] += 1
+            stats['total_pnl'] += pnl
+            stats['bars_held'] += trade['bars_held']
+            stats['max_equity'] = max(stats['max_equity'], run['balance'])
+            stats['min_equity'] = min(stats['min_equity'], run['balance'])
+
+            if trade['result'] == 'win':
+                stats['winning_trades'] += 1
+                stats['win_pnl'] += pnl
+                stats['win_pips'] += trade['pnl_pips']
+            elif trade['result'] == 'loss':
+                stats['losing_trades'] += 1
+                stats['loss_pnl'] += pnl
+                stats['loss_pips'] += trade['pnl_pips']
+
+            if writer is not None:
+                writer.writerow({**{field: trade.get(field) for field in TRADE_FIELDS}, 'pnl': pnl})
+
+    def _streaming_statistics(self, run):
+        """
+        Build the same metrics as Backtester._calculate_statistics from running totals
+
+        Args:
+            run (dict): Run state from _new_run
+
+        Returns:
+            dict: Performance metrics
+        """
+        stats = run['stats']
+        balance = run['balance']
+        total = stats['total_trades']
+
+        if not total:
+            return self._calculate_statistics([], balance)
+
+        wins = stats['winning_trades']
+        losses = stats['losing_trades']
+        gross_loss = abs(stats['loss_pnl'])
+
+        # Equity only moves through settled trades, so the deepest drawdown
+        # from the final peak is measured against the lowest equity seen
+        peak = stats['max_equity']
+        max_drawdown = (peak - stats['min_equity']) / peak * 100
+
+        return {
+            'total_trades': total,
+            'winning_trades': wins,
+            'losing_trades': losses,
+            'win_rate': round((wins / total) * 100, 2),
+            'total_pnl': round(stats['total_pnl'], 2),
+            'total_return': round(((balance - self.initial_balance) / self.initial_balance) * 100, 2),
+            'final_balance': round(balance, 2),
+            'max_drawdown': round(max_drawdown, 2),
+            'avg_win': round(stats['win_pnl'] / wins, 2) if wins else 0,
+            'avg_loss': round(stats['loss_pnl'] / losses, 2) if losses else 0,
+            'avg_win_pips': round(stats['win_pips'] / wins, 1) if wins else 0,
+            'avg_loss_pips': round(stats['loss_pips'] / losses, 1) if losses else 0,
+            'profit_factor': round(stats['win_pnl'] / gross_loss, 2) if gross_loss > 0 else 0,
+            'avg_bars_held': round(stats['bars_held'] / total, 1)
+        }
+
+    def backtest_pattern_stream(self, instrument, granularity, pattern_type, direction='both', min_rr=1.5,
+                                start=None, end=None, trades_path=None):
+        """
+        Backtest a candlestick pattern over stored candles, block by block
+
+        Args:
+            instrument (str): Forex pair
+            granularity (str): Timeframe
+            pattern_type (str): Pattern to test ('pin_bar', 'engulfing', etc.)
+            direction (str): 'long', 'short', or 'both'
+            min_rr (float): Minimum risk/reward ratio
+            start (datetime): Optional first candle time (inclusive)
+            end (datetime): Optional last candle time (exclusive)
+            trades_path (str): Optional CSV file the trades are written to
+
+        Returns:
+            dict: Backtest results
+        """
+        run = self._new_run()
+        resolver = self.intrabar_resolver
+        bar_duration = pd.Timedelta(granularity_to_timedelta(granularity))
+
+        # Patterns look back at most 2 candles; S/R levels use the lookback window
+        carry_size = max(Config.SUPPORT_RESISTANCE_LOOKBACK, 3)
+        carry = None
+        carry_atr = None
+        atr_engine = RollingATR()
+        seen = 0
+        processed_until = 50  # Need enough history
+        open_trades = []
+        pending = deque()
+
+        trades_file = open(trades_path, 'w', newline='') if trades_path else None
+        writer = csv.DictWriter(trades_file, fieldnames=TRADE_FIELDS) if trades_file else None
+        if writer is not None:
+            writer.writeheader()
+
+        try:
+            for chunk in self.store.iter_chunks(instrument, granularity, self.chunk_size, start, end):
+                window = chunk if carry is None else pd.concat([carry, chunk])
+                offset = seen + len(chunk) - len(window)
+                seen += len(chunk)
+
+                # Ambiguous bars of this block are all new bars: hold only their lower-timeframe candles
+                if resolver is not None:
+                    resolver.set_span(chunk.index[0], chunk.index[-1] + bar_duration)
+
+                # ATR runs over the whole stream, not just the window
+                chunk_atr = atr_engine.extend(chunk['high'], chunk['low'], chunk['close'])
+                window_atr = chunk_atr if carry is None else np.r_[carry_atr, chunk_atr]
+
+                context = AnalysisContext(window, pair=instrument, timeframe=granularity, atr=window_atr)
+                arrays = context.arrays
+                times = window.index
+
+                # Open trades first, so trades are walked bar by bar in signal order
+                for trade in open_trades:
+                    self._advance(trade, times, arrays['high'], arrays['low'], arrays['close'], offset)
+
+                registry = context.pattern_detector.registry
+                directions, _ = registry.directions(context.pattern_masks, registry.resolve(pattern_type))
+
+                for i in np.flatnonzero(directions):
+                    # Earlier bars were handled with the previous block; the
+                    # last bar waits for the next block's entry candle
+                    if offset + i < processed_until or i + 1 >= len(window):
+                        continue
+
+                    trade_direction = 'long' if directions[i] == 1 else 'short'
+
+                    if direction != 'both' and direction != trade_direction:
+                        continue
+
+                    entry_price = arrays['open'][i + 1]
+                    rr = context.sr_detector_at(i).calculate_risk_reward(entry_price, trade_direction)
+
+                    if rr['risk_reward_ratio'] < min_rr:
+                        continue
+
+                    trade = {
+                        'entry_time': times[i + 1],
+                        'pattern': pattern_type,
+                        'direction': trade_direction,
+                        'entry': entry_price,
+                        'stop_loss': rr['stop_loss'],
+                        'take_profit': rr['take_profit'],
+                        'pip_size': context.pip_size,
+                        'next': offset + i + 1,
+                        'bars_held': 0,
+                        'closed': False
+                    }
+                    self._advance(trade, times, arrays['high'], arrays['low'], arrays['close'], offset)
+                    open_trades.append(trade)
+                    pending.append(trade)
+
+                processed_until = offset + len(window) - 1
+                open_trades = [trade for trade in open_trades if not trade['closed']]
+                self._settle(run, pending, writer)
+
+                carry = window.iloc[-carry_size:]
+                carry_atr = window_atr[-carry_size:]
+
+                if resolver is not None:
+                    resolver.clear()
+
+            # Trades that run out of data are dropped, as in backtest_pattern
+            self._settle(run, pending, writer, final=True)
+        finally:
+            if trades_file is not None:
+                trades_file.close()
+
+        return self._streaming_statistics(run)
+
+
+def main():
+    """Run a streaming backtest from the command line"""
+    parser = argparse.ArgumentParser(description='Backtest a pattern over the full stored history')
+    parser.add_argument('instrument', help='Forex pair (e.g., EUR_USD)')
+    parser.add_argument('granularity', help='Timeframe (e.g., M5)')
+    parser.add_argument('pattern', help="Pattern to test (e.g., 'pin_bar')")
+    parser.add_argument('--direction', default='both', choices=['long', 'short', 'both'])
+    parser.add_argument('--min-rr', type=float, default=1.5, help='Minimum risk/reward ratio')
+    parser.add_argument('--start', help='First candle time (ISO 8601)')
+    parser.add_argument('--end', help='Last candle time, exclusive (ISO 8601)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Candles read per block')
+    parser.add_argument('--trades', help='CSV file to write the trades to')
+    parser.add_argument('--intrabar', action='store_true',
+                        help='Resolve ambiguous bars with lower-timeframe candles from the store')
+    args = parser.parse_args()
+
+    start = pd.Timestamp(args.start, tz='UTC') if args.start else None
+    end = pd.Timestamp(args.end, tz='UTC') if args.end else None
+    store = CandleStore()
+
+    resolver = None
+    if args.intrabar:
+        if granularity_to_timedelta(Config.INTRABAR_GRANULARITY) >= granularity_to_timedelta(args.granularity):
+            parser.error(f"--intrabar needs a timeframe above {Config.INTRABAR_GRANULARITY} "
+                         f"(INTRABAR_GRANULARITY), got {args.granularity}")
+
+        resolver = IntrabarResolver(
+            args.instrument,
+            args.granularity,
+            store=store,
+            start=start,
+            end=end + granularity_to_timedelta(args.granularity) if end is not None else None,
+            chunk_size=args.chunk_size
+        )
+
+    backtester = StreamingBacktester(intrabar_resolver=resolver, store=store, chunk_size=args.chunk_size)
+    results = backtester.backtest_pattern_stream(
+        args.instrument,
+        args.granularity,
+        args.pattern,
+        direction=args.direction,
+        min_rr=args.min_rr,
+        start=start,
+        end=end,
+        trades_path=args.trades
+    )
+
+    for key, value in results.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,13 +3,88 @@ Support and Resistance Level Detection
 """
 import pandas as pd
 import numpy as np
-from scipy.signal import argrelextrema
+from src.pivots import find_pivots
+from src.instruments import DEFAULT_PIP_SIZE
+
+
+def cluster_prices(prices, tolerance):
+    """
+    Cluster nearby prices into zones
+
+    Args:
+        prices (np.ndarray): Pivot prices in time order
+        tolerance (float): Price tolerance as a fraction of price
+
+    Returns:
+        list: Clustered levels with strength, strongest first
+    """
+    clusters = []
+
+    for price in prices:
+        # Find if price belongs to existing cluster
+        added = False
+        for cluster in clusters:
+            if abs(price - cluster['price']) <= cluster['price'] * tolerance:
+                # Add to existing cluster
+                cluster['prices'].append(price)
+                cluster['price'] = np.mean(cluster['prices'])
+                cluster['strength'] += 1
+                added = True
+                break
+
+        if not added:
+            # Create new cluster
+            clusters.append({
+                'price': price,
+                'prices': [price],
+                'strength': 1
+            })
+
+    # Sort by strength
+    clusters.sort(key=lambda x: x['strength'], reverse=True)
+
+    return clusters
+
+
+def detect_levels(highs, lows, tolerance, order=5, min_strength=2):
+    """
+    Detect support and resistance levels from price arrays
+
+    Pure function of its inputs, so it is safe to call from many threads
+    on shared candles.
+
+    Args:
+        highs (np.ndarray): High prices of the lookback window
+        lows (np.ndarray): Low prices of the lookback window
+        tolerance (float): Price tolerance for level clustering (fraction of price)
+        order (int): Order for pivot point detection
+        min_strength (int): Minimum touches for a valid level
+
+    Returns:
+        dict: Support and resistance levels
+    """
+    highs_idx = find_pivots(highs, [order], kind='high')[order]
+    lows_idx = find_pivots(lows, [order], kind='low')[order]
+
+    resistance_clusters = cluster_prices(highs[highs_idx], tolerance)
+    support_clusters = cluster_prices(lows[lows_idx], tolerance)
+
+    return {
+        'support': [
+            {'price': c['price'], 'strength': c['strength'], 'type': 'support'}
+            for c in support_clusters if c['strength'] >= min_strength
+        ],
+        'resistance': [
+            {'price': c['price'], 'strength': c['strength'], 'type': 'resistance'}
+            for c in resistance_clusters if c['strength'] >= min_strength
+        ]
+    }
 
 
 class SupportResistance:
     """Detect support and resistance levels using price action"""
 
-    def __init__(self, df, lookback=100, tolerance=0.0005):
+    def __init__(self, df, lookback=100, tolerance=0.0005, pip_size=DEFAULT_PIP_SIZE):
         """
         Initialize S/R detector
 
@@ -17,12 +92,37 @@ class SupportResistance:
             df (pd.DataFrame): OHLC data
             lookback (int): Number of candles to look back
             tolerance (float): Price tolerance for level clustering (in decimal, e.g., 0.0005 = 5 pips)
+            pip_size (float): Price change of one pip for the instrument (e.g., 0.01 for JPY pairs)
         """
-        self.df = df.copy()
+        self.df = df
         self.lookback = lookback
         self.tolerance = tolerance
+        self.pip_size = pip_size
         self.support_levels = []
         self.resistance_levels = []
+        self._index = {}
+
+    @classmethod
+    def from_levels(cls, levels, lookback=100, tolerance=0.0005, pip_size=DEFAULT_PIP_SIZE):
+        """
+        Create a detector around levels that were already detected
+
+        The detector has no candles (df is None), so only the level lookups
+        and risk/reward methods are available.
+
+        Args:
+            levels (dict): Support and resistance levels from detect_levels()
+            lookback (int): Number of candles the levels were detected over
+            tolerance (float): Price tolerance the levels were clustered with
+            pip_size (float): Price change of one pip for the instrument
+
+        Returns:
+            SupportResistance: Detector holding the levels
+        """
+        sr_detector = cls(None, lookback=lookback, tolerance=tolerance, pip_size=pip_size)
+        sr_detector.support_levels = levels['support']
+        sr_detector.resistance_levels = levels['resistance']
+        return sr_detector
 
     def find_pivot_points(self, order=5):
         """
@@ -34,19 +134,8 @@ class SupportResistance:
         Returns:
             tuple: (pivot_highs, pivot_lows)
         """
-        # Find local maxima (resistance)
-        highs_idx = argrelextrema(
-            self.df['high'].values,
-            np.greater,
-            order=order
-        )[0]
-
-        # Find local minima (support)
-        lows_idx = argrelextrema(
-            self.df['low'].values,
-            np.less,
-            order=order
-        )[0]
+        highs_idx = find_pivots(self.df['high'].values, [order], kind='high')[order]
+        lows_idx = find_pivots(self.df['low'].values, [order], kind='low')[order]
 
         pivot_highs = self.df.iloc[highs_idx][['high']].copy()
         pivot_highs['type'] = 'resistance'
@@ -56,6 +145,21 @@ class SupportResistance:
 
         return pivot_highs, pivot_lows
 
+    def find_multi_order_pivots(self, orders=(3, 5, 10, 20)):
+        """
+        Find pivot highs and lows for several orders at once
+
+        Args:
+            orders (iterable): Pivot orders, e.g. weak (3) to strong (20)
+
+        Returns:
+            dict: {'high': {order: indices}, 'low': {order: indices}}
+        """
+        return {
+            'high': find_pivots(self.df['high'].values, orders, kind='high'),
+            'low': find_pivots(self.df['low'].values, orders, kind='low')
+        }
+
     def cluster_levels(self, levels, price_column):
         """
         Cluster nearby price levels into zones
@@ -70,37 +174,25 @@ class SupportResistance:
         if levels.empty:
             return []
 
-        prices = levels[price_column].values
-        clusters = []
-
-        for price in prices:
-            # Find if price belongs to existing cluster
-            added = False
-            for cluster in clusters:
-                if abs(price - cluster['price']) <= cluster['price'] * self.tolerance:
-                    # Add to existing cluster
-                    cluster['prices'].append(price)
-                    cluster['price'] = np.mean(cluster['prices'])
-                    cluster['strength'] += 1
-                    added = True
-                    break
-
-            if not added:
-                # Create new cluster
-                clusters.append({
-                    'price': price,
-                    'prices': [price],
-                    'strength': 1
-                })
-
-        # Sort by strength
-        clusters.sort(key=lambda x: x['strength'], reverse=True)
-
-        return clusters
+        return self._cluster_prices(levels[price_column].values)
+
+    def _cluster_prices(self, prices):
+        """
+        Cluster nearby prices into zones
+
+        Args:
+            prices (np.ndarray): Pivot prices in time order
+
+        Returns:
+            list: Clustered levels with strength
+        """
+        return cluster_prices(prices, self.tolerance)
 
     def detect_support_resistance(self, order=5, min_strength=2):
         """
-        Detect support and resistance levels
+        Detect support and resistance levels over the last lookback candles
+
+        self.df is left untouched; only the level lists are replaced.
 
         Args:
             order (int): Order for pivot point detection
@@ -109,40 +201,42 @@ class SupportResistance:
         Returns:
             dict: Support and resistance levels
         """
-        # Get recent data
         recent_df = self.df.tail(self.lookback)
-        self.df = recent_df
-
-        # Find pivot points
-        pivot_highs, pivot_lows = self.find_pivot_points(order=order)
-
-        # Cluster levels
-        resistance_clusters = self.cluster_levels(pivot_highs, 'high')
-        support_clusters = self.cluster_levels(pivot_lows, 'low')
-
-        # Filter by minimum strength
-        self.resistance_levels = [
-            {
-                'price': c['price'],
-                'strength': c['strength'],
-                'type': 'resistance'
-            }
-            for c in resistance_clusters if c['strength'] >= min_strength
-        ]
+        levels = detect_levels(
+            recent_df['high'].to_numpy(dtype=float),
+            recent_df['low'].to_numpy(dtype=float),
+            self.tolerance,
+            order=order,
+            min_strength=min_strength
+        )
 
-        self.support_levels = [
-            {
-                'price': c['price'],
-                'strength': c['strength'],
-                'type': 'support'
-            }
-            for c in support_clusters if c['strength'] >= min_strength
-        ]
+        self.support_levels = levels['support']
+        self.resistance_levels = levels['resistance']
 
-        return {
-            'support': self.support_levels,
-            'resistance': self.resistance_levels
-        }
+        return levels
+
+    def _level_index(self, level_type):
+        """
+        Get levels as a price-sorted array for bisection
+
+        The index is rebuilt whenever the level list is replaced or resized.
+
+        Args:
+            level_type (str): 'support' or 'resistance'
+
+        Returns:
+            tuple: (sorted prices, position of each sorted price in the level list)
+        """
+        levels = self.support_levels if level_type == 'support' else self.resistance_levels
+        cached = self._index.get(level_type)
+
+        if cached is None or cached[0] is not levels or cached[1] != len(levels):
+            prices = np.array([level['price'] for level in levels], dtype=float)
+            order = np.argsort(prices, kind='stable')
+            cached = (levels, len(levels), prices[order], order)
+            self._index[level_type] = cached
+
+        return cached[2], cached[3]
 
     def get_nearest_levels(self, current_price, max_levels=3):
         """
@@ -155,21 +249,20 @@ class SupportResistance:
         Returns:
             dict: Nearest support and resistance levels
         """
-        # Find nearest support (below current price)
-        supports_below = [
-            s for s in self.support_levels
-            if s['price'] < current_price
+        support_prices, support_order = self._level_index('support')
+        resistance_prices, resistance_order = self._level_index('resistance')
+
+        # Nearest support (below current price), closest first
+        end = np.searchsorted(support_prices, current_price, side='left')
+        nearest_support = [
+            self.support_levels[j] for j in support_order[max(0, end - max_levels):end][::-1]
         ]
-        supports_below.sort(key=lambda x: current_price - x['price'])
-        nearest_support = supports_below[:max_levels]
 
-        # Find nearest resistance (above current price)
-        resistances_above = [
-            r for r in self.resistance_levels
-            if r['price'] > current_price
+        # Nearest resistance (above current price), closest first
+        start = np.searchsorted(resistance_prices, current_price, side='right')
+        nearest_resistance = [
+            self.resistance_levels[j] for j in resistance_order[start:start + max_levels]
         ]
-        resistances_above.sort(key=lambda x: x['price'] - current_price)
-        nearest_resistance = resistances_above[:max_levels]
 
         return {
             'support': nearest_support,
@@ -177,6 +270,65 @@ class SupportResistance:
             'current_price': current_price
         }
 
+    def get_nearest_levels_batch(self, prices):
+        """
+        Get the nearest support and resistance for many prices in one call
+
+        Args:
+            prices (array-like): Prices to look up
+
+        Returns:
+            dict: 'support' and 'resistance' arrays of level prices (NaN when
+                there is no level on that side)
+        """
+        prices = np.asarray(prices, dtype=float)
+        support_prices, _ = self._level_index('support')
+        resistance_prices, _ = self._level_index('resistance')
+
+        support = np.full(prices.shape, np.nan)
+        end = np.searchsorted(support_prices, prices, side='left')
+        has_support = end > 0
+        support[has_support] = support_prices[end[has_support] - 1]
+
+        resistance = np.full(prices.shape, np.nan)
+        start = np.searchsorted(resistance_prices, prices, side='right')
+        has_resistance = start < len(resistance_prices)
+        resistance[has_resistance] = resistance_prices[start[has_resistance]]
+
+        return {
+            'support': support,
+            'resistance': resistance
+        }
+
+    def _levels_in_band(self, level_type, prices, tolerances):
+        """
+        Find the first listed level within a tolerance band around each price
+
+        Levels are listed strongest first, so this matches a linear scan.
+
+        Args:
+            level_type (str): 'support' or 'resistance'
+            prices (np.ndarray): Prices to check
+            tolerances (np.ndarray): Absolute tolerance per price
+
+        Returns:
+            np.ndarray: Index into the level list, or -1 if no level is in the band
+        """
+        sorted_prices, order = self._level_index(level_type)
+
+        if len(sorted_prices) == 0:
+            return np.full(prices.shape, -1)
+
+        lo = np.searchsorted(sorted_prices, prices - tolerances, side='left')
+        hi = np.searchsorted(sorted_prices, prices + tolerances, side='right')
+
+        # Minimum list position over each [lo, hi) band
+        sentinel = np.append(order, len(order))
+        bounds = np.column_stack([lo, hi]).ravel()
+        first = np.minimum.reduceat(sentinel, bounds)[::2]
+
+        return np.where(hi > lo, first, -1)
+
     def is_at_level(self, price, level_type='both', tolerance_multiplier=1.5):
         """
         Check if price is at a support or resistance level
@@ -197,22 +349,48 @@ class SupportResistance:
             'resistance_level': None
         }
 
+        price_array = np.array([price], dtype=float)
+        tolerance_array = np.array([tolerance], dtype=float)
+
         if level_type in ['support', 'both']:
-            for support in self.support_levels:
-                if abs(price - support['price']) <= tolerance:
-                    nearby['at_support'] = True
-                    nearby['support_level'] = support
-                    break
+            j = self._levels_in_band('support', price_array, tolerance_array)[0]
+            if j >= 0:
+                nearby['at_support'] = True
+                nearby['support_level'] = self.support_levels[j]
 
         if level_type in ['resistance', 'both']:
-            for resistance in self.resistance_levels:
-                if abs(price - resistance['price']) <= tolerance:
-                    nearby['at_resistance'] = True
-                    nearby['resistance_level'] = resistance
-                    break
+            j = self._levels_in_band('resistance', price_array, tolerance_array)[0]
+            if j >= 0:
+                nearby['at_resistance'] = True
+                nearby['resistance_level'] = self.resistance_levels[j]
 
         return nearby
 
+    def is_at_level_batch(self, prices, tolerance_multiplier=1.5):
+        """
+        Check many prices against support and resistance levels in one call
+
+        Args:
+            prices (array-like): Prices to check
+            tolerance_multiplier (float): Multiplier for tolerance
+
+        Returns:
+            dict: 'at_support' / 'at_resistance' boolean arrays and
+                'support_index' / 'resistance_index' arrays (-1 if not at a level)
+        """
+        prices = np.asarray(prices, dtype=float)
+        tolerances = prices * self.tolerance * tolerance_multiplier
+
+        support_index = self._levels_in_band('support', prices, tolerances)
+        resistance_index = self._levels_in_band('resistance', prices, tolerances)
+
+        return {
+            'at_support': support_index >= 0,
+            'at_resistance': resistance_index >= 0,
+            'support_index': support_index,
+            'resistance_index': resistance_index
+        }
+
     def calculate_risk_reward(self, entry_price, direction, stop_loss_pips=None, take_profit_pips=None):
         """
         Calculate risk/reward based on nearest levels
@@ -231,24 +409,24 @@ class SupportResistance:
         if direction == 'long':
             # For long: stop at support, target at resistance
             if stop_loss_pips:
-                stop_loss = entry_price - (stop_loss_pips * 0.0001)
+                stop_loss = entry_price - (stop_loss_pips * self.pip_size)
             else:
                 stop_loss = nearest['support'][0]['price'] if nearest['support'] else entry_price * 0.99
 
             if take_profit_pips:
-                take_profit = entry_price + (take_profit_pips * 0.0001)
+                take_profit = entry_price + (take_profit_pips * self.pip_size)
             else:
                 take_profit = nearest['resistance'][0]['price'] if nearest['resistance'] else entry_price * 1.01
 
         else:  # short
             # For short: stop at resistance, target at support
             if stop_loss_pips:
-                stop_loss = entry_price + (stop_loss_pips * 0.0001)
+                stop_loss = entry_price + (stop_loss_pips * self.pip_size)
             else:
                 stop_loss = nearest['resistance'][0]['price'] if nearest['resistance'] else entry_price * 1.01
 
             if take_profit_pips:
-                take_profit = entry_price - (take_profit_pips * 0.0001)
+                take_profit = entry_price - (take_profit_pips * self.pip_size)
             else:
                 take_profit = nearest['support'][0]['price'] if nearest['support'] else entry_price * 0.99
 
@@ -263,6 +441,6 @@ class SupportResistance:
             'risk': risk,
             'reward': reward,
             'risk_reward_ratio': round(risk_reward_ratio, 2),
-            'risk_pips': round(risk / 0.0001, 1),
-            'reward_pips': round(reward / 0.0001, 1)
+            'risk_pips': round(risk / self.pip_size, 1),
+            'reward_pips': round(reward / self.pip_size, 1)
         }
@@ -0,0 +1,156 @@
+"""
+Rolling ATR engine and volatility-normalized price tolerances
+"""
+import numpy as np
+import pandas as pd
+from config import Config
+
+
+def true_range(high, low, close, prev_close=None):
+    """
+    Calculate the true range of each candle
+
+    Args:
+        high (array-like): High prices
+        low (array-like): Low prices
+        close (array-like): Close prices
+        prev_close (float): Close before the first candle (its range is
+            high - low when not given)
+
+    Returns:
+        np.ndarray: True ranges
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    previous = np.empty_like(close)
+    if len(close):
+        previous[0] = np.nan if prev_close is None else prev_close
+        previous[1:] = close[:-1]
+
+    return np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+
+def wilder_average(values, period, seed=None):
+    """
+    Smooth values with Wilder's moving average (alpha = 1 / period)
+
+    Args:
+        values (array-like): Values to smooth
+        period (int): Smoothing period
+        seed (float): Average before the first value (the first value is
+            used when not given)
+
+    Returns:
+        np.ndarray: Smoothed values
+    """
+    values = np.asarray(values, dtype=float)
+    if seed is None:
+        return pd.Series(values).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+    # Continue from the seed: it becomes the first input, whose average is itself
+    smoothed = pd.Series(np.r_[seed, values]).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    return smoothed[1:]
+
+
+def atr(high, low, close, period=None):
+    """
+    Calculate the Average True Range over a whole history
+
+    Args:
+        high (array-like): High prices
+        low (array-like): Low prices
+        close (array-like): Close prices
+        period (int): ATR period (defaults to Config.ATR_PERIOD)
+
+    Returns:
+        np.ndarray: ATR of each candle
+    """
+    return wilder_average(true_range(high, low, close), period or Config.ATR_PERIOD)
+
+
+def atr_tolerance(atr_values, prices, multiplier=None):
+    """
+    Convert ATR to a tolerance relative to price, as used by SupportResistance
+
+    Args:
+        atr_values (float or np.ndarray): ATR
+        prices (float or np.ndarray): Reference prices (e.g., closes)
+        multiplier (float): Fraction of the ATR (defaults to
+            Config.SUPPORT_RESISTANCE_ATR_MULTIPLIER)
+
+    Returns:
+        float or np.ndarray: Tolerance as a fraction of price
+    """
+    if multiplier is None:
+        multiplier = Config.SUPPORT_RESISTANCE_ATR_MULTIPLIER
+    return multiplier * np.asarray(atr_values, dtype=float) / np.asarray(prices, dtype=float)
+
+
+class RollingATR:
+    """Average True Range updated one candle at a time, or extended by blocks"""
+
+    def __init__(self, period=None):
+        """
+        Initialize rolling ATR
+
+        Args:
+            period (int): ATR period (defaults to Config.ATR_PERIOD)
+        """
+        self.period = period or Config.ATR_PERIOD
+        self.alpha = 1 / self.period
+        self.value = None
+        self.prev_close = None
+        self.count = 0
+
+    def update(self, high, low, close):
+        """
+        Add one candle in O(1)
+
+        Args:
+            high (float): High price
+            low (float): Low price
+            close (float): Close price
+
+        Returns:
+            float: ATR after the candle
+        """
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        if self.value is None:
+            self.value = tr
+        elif self.value != tr:
+            # Same arithmetic as pandas' ewm, so update() and extend() agree exactly
+            decay = 1 - self.alpha
+            self.value = (decay * self.value + self.alpha * tr) / (decay + self.alpha)
+
+        self.prev_close = close
+        self.count += 1
+        return self.value
+
+    def extend(self, highs, lows, closes):
+        """
+        Add a block of candles, vectorized
+
+        Args:
+            highs (array-like): High prices
+            lows (array-like): Low prices
+            closes (array-like): Close prices
+
+        Returns:
+            np.ndarray: ATR after each candle
+        """
+        closes = np.asarray(closes, dtype=float)
+        if not len(closes):
+            return np.array([], dtype=float)
+
+        ranges = true_range(highs, lows, closes, prev_close=self.prev_close)
+        values = wilder_average(ranges, self.period, seed=self.value)
+
+        self.value = float(values[-1])
+        self.prev_close = float(closes[-1])
+        self.count += len(closes)
+        return values
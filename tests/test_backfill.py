@@ -0,0 +1,58 @@
+"""
+Tests for resuming backfills from checkpoints
+"""
+import numpy as np
+import pandas as pd
+from src.backfill import Backfiller
+from src.candle_store import CandleStore
+
+
+class FakeClient:
+    """Serves H1 candles like OANDA at a given time: only complete candles"""
+
+    def __init__(self):
+        self.now = None
+
+    def get_candles_range(self, instrument, granularity, start, end, priority=None):
+        times = pd.date_range(pd.Timestamp(start).ceil('h'), pd.Timestamp(end), freq='h')
+        times = times[times + pd.Timedelta(hours=1) <= self.now]
+        close = 1.1 + np.arange(len(times)) * 1e-4
+
+        return pd.DataFrame({
+            'open': close,
+            'high': close + 1e-4,
+            'low': close - 1e-4,
+            'close': close,
+            'volume': 100
+        }, index=pd.DatetimeIndex(times, name='time'))
+
+
+def make_backfiller(tmp_path):
+    client = FakeClient()
+    store = CandleStore(str(tmp_path / 'candles'))
+    return client, Backfiller(client=client, store=store, checkpoint_path=str(tmp_path / 'checkpoints.json'))
+
+
+def test_overlapping_runs_leave_no_gap(tmp_path):
+    client, backfiller = make_backfiller(tmp_path)
+
+    # Weekday runs, the first while the 10:00 candle is still forming
+    client.now = pd.Timestamp('2024-01-03 10:30', tz='UTC')
+    backfiller.backfill_instrument('EUR_USD', 'H1', '2024-01-02', end=client.now)
+    client.now = pd.Timestamp('2024-01-03 14:30', tz='UTC')
+    result = backfiller.backfill_instrument('EUR_USD', 'H1', '2024-01-02', end=client.now)
+
+    assert result['validation']['gaps'] == []
+    assert result['validation']['end'] == '2024-01-03T13:00:00+00:00'
+
+
+def test_earlier_start_backfills_leading_range(tmp_path):
+    client, backfiller = make_backfiller(tmp_path)
+    client.now = pd.Timestamp('2024-01-04 12:00', tz='UTC')
+
+    backfiller.backfill_instrument('EUR_USD', 'H1', '2024-01-03', end=client.now)
+    result = backfiller.backfill_instrument('EUR_USD', 'H1', '2024-01-02', end=client.now)
+
+    assert result['validation']['start'] == '2024-01-02T00:00:00+00:00'
+    assert result['validation']['gaps'] == []
+    assert result['validation']['candles'] == 2 * 24 + 12  # 00:00-11:00 on the last day
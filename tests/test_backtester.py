@@ -0,0 +1,64 @@
+"""
+Tests for the backtester's trade cache
+"""
+import numpy as np
+import pandas as pd
+from config import Config
+from src.artifact_cache import ArtifactCache
+from src.backtester import Backtester
+from src.signal_pipeline import StageCounters
+
+
+def make_candles(seed=0, count=400):
+    """Random-walk H4 candles"""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.002, count))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.002, count))
+
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(100, 1000, count)
+    }, index=pd.date_range('2024-01-01', periods=count, freq='4h', tz='UTC'))
+
+
+def test_trades_cache_hit_for_same_settings(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    df = make_candles()
+
+    first = Backtester(cache=cache).backtest_pattern(df, 'engulfing')
+    misses = cache.stats['misses']
+    second = Backtester(cache=cache).backtest_pattern(df, 'engulfing')
+
+    assert cache.stats['misses'] == misses
+    assert second == first
+
+
+def test_trades_cache_miss_when_atr_multiplier_changes(tmp_path, monkeypatch):
+    cache = ArtifactCache(root=str(tmp_path))
+    df = make_candles()
+
+    Backtester(cache=cache).backtest_pattern(df, 'engulfing')
+    writes = cache.stats['writes']
+
+    monkeypatch.setattr(Config, 'SUPPORT_RESISTANCE_ATR_MULTIPLIER', Config.SUPPORT_RESISTANCE_ATR_MULTIPLIER * 2)
+    Backtester(cache=cache).backtest_pattern(df, 'engulfing')
+
+    assert cache.stats['writes'] > writes
+
+
+def test_filter_counts_per_run_and_on_cache_hit(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path))
+    backtester = Backtester(cache=cache)
+    df = make_candles()
+
+    first = StageCounters()
+    backtester.backtest_pattern(df, 'engulfing', counters=first)
+    second = StageCounters()
+    backtester.backtest_pattern(df, 'engulfing', counters=second)
+
+    assert first.snapshot()['history']['evaluated'] > 0
+    assert second.snapshot() == first.snapshot()
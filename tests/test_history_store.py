@@ -0,0 +1,73 @@
+"""
+Tests for reading buffered history and compacting month files
+"""
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from src.history_store import HistoryStore
+
+
+def signal(bar_time, pattern='bullish_engulfing'):
+    return {
+        'bar_time': bar_time,
+        'pattern': pattern,
+        'type': 'BUY',
+        'confidence': 'high',
+        'entry': 1.1,
+        'stop_loss': 1.09,
+        'take_profit': 1.12,
+        'risk_reward': 2.0
+    }
+
+
+def month_files(root, table):
+    path = os.path.join(root, table)
+    return {
+        name: len([f for f in os.listdir(os.path.join(path, name)) if f.endswith('.parquet')])
+        for name in os.listdir(path)
+    }
+
+
+def test_query_reads_buffered_rows_without_writing(tmp_path):
+    root = str(tmp_path / 'history')
+    store = HistoryStore(root, flush_rows=10 ** 6, flush_interval=10 ** 6)
+
+    store.record_signals('EUR_USD', 'H1', [signal(pd.Timestamp('2024-01-02 10:00', tz='UTC'))])
+    store.flush()
+    store.record_signals('EUR_USD', 'H1', [signal(pd.Timestamp('2024-01-02 11:00', tz='UTC'))])
+    store.record_signals('EUR_USD', 'H1', [signal(pd.Timestamp('2024-01-02 10:00', tz='UTC'))], event='hit_tp')
+
+    outcomes = store.signal_outcomes(pair='EUR_USD')
+    assert len(outcomes) == 2
+    assert store.win_rate(pair='EUR_USD')['wins'] == 1
+    assert len(store.query('signals', start='2024-01-02 10:30')) == 1
+
+    # Only the explicit flush wrote a file
+    assert month_files(root, 'signals') == {'month=2024-01': 1}
+
+
+def test_months_are_compacted(tmp_path):
+    root = str(tmp_path / 'history')
+    store = HistoryStore(root, flush_rows=1, compact_files=4)
+    current = pd.Timestamp.now(tz='UTC').floor('h')
+    ended = pd.Timestamp('2024-01-02 10:00', tz='UTC')
+
+    for hour in range(6):
+        store.record_signals('EUR_USD', 'H1', [signal(current - pd.Timedelta(hours=hour))])
+        store.record_signals('EUR_USD', 'H1', [signal(ended + pd.Timedelta(hours=hour))])
+
+    files = month_files(root, 'signals')
+    # The ended month is kept in one file; the current one until it reaches compact_files
+    assert files['month=2024-01'] == 1
+    assert files[f"month={current.strftime('%Y-%m')}"] < 4
+
+    before = store.query('signals').sort_values(['bar_time']).reset_index(drop=True)
+    store.compact()
+    after = store.query('signals').sort_values(['bar_time']).reset_index(drop=True)
+
+    assert all(count == 1 for count in month_files(root, 'signals').values())
+    assert len(after) == 12
+    pd.testing.assert_frame_equal(before, after)
@@ -0,0 +1,67 @@
+"""
+Tests for the streaming backtest matching the in-memory backtest
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.backtester import Backtester, IntrabarResolver
+from src.candle_store import CandleStore
+from src.streaming_backtest import StreamingBacktester
+from tests.test_backtester import make_candles
+
+
+def make_intrabar(df, seed=0):
+    """M5 candles inside the range of each H4 candle"""
+    rng = np.random.default_rng(seed)
+    times = df.index.repeat(48) + pd.to_timedelta(np.tile(np.arange(48) * 5, len(df)), unit='min')
+    low = np.repeat(df['low'].to_numpy(), 48)
+    high = np.repeat(df['high'].to_numpy(), 48)
+    points = low[:, None] + (high - low)[:, None] * rng.random((len(times), 2))
+
+    return pd.DataFrame({
+        'open': points[:, 0],
+        'high': points.max(axis=1),
+        'low': points.min(axis=1),
+        'close': points[:, 1],
+        'volume': 10
+    }, index=times.rename('time'))
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    store = CandleStore(str(tmp_path_factory.mktemp('candles')))
+    df = make_candles(seed=7, count=1500)
+    store.save('EUR_USD', 'H4', df)
+    store.save('EUR_USD', 'M5', make_intrabar(df))
+    return store
+
+
+@pytest.mark.parametrize('chunk_size', [137, 500, 1777, 100000])
+def test_stream_matches_backtest_pattern(store, chunk_size):
+    df = store.load('EUR_USD', 'H4')
+
+    for direction in ('both', 'short'):
+        expected = Backtester().backtest_pattern(df, 'engulfing', direction=direction, min_rr=0.5)
+        result = StreamingBacktester(store=store, chunk_size=chunk_size).backtest_pattern_stream(
+            'EUR_USD', 'H4', 'engulfing', direction=direction, min_rr=0.5
+        )
+        assert expected['total_trades'] > 0
+        assert result == expected
+
+
+@pytest.mark.parametrize('chunk_size', [137, 1777])
+def test_stream_matches_backtest_pattern_intrabar(store, chunk_size):
+    df = store.load('EUR_USD', 'H4')
+
+    resolver = IntrabarResolver('EUR_USD', 'H4', 'M5', store=store)
+    expected = Backtester().backtest_pattern(df, 'engulfing', min_rr=0.5, intrabar_resolver=resolver)
+
+    stream_resolver = IntrabarResolver('EUR_USD', 'H4', 'M5', store=store, chunk_size=chunk_size)
+    result = StreamingBacktester(intrabar_resolver=stream_resolver, store=store, chunk_size=chunk_size)\
+        .backtest_pattern_stream('EUR_USD', 'H4', 'engulfing', min_rr=0.5)
+
+    assert stream_resolver.resolved > 0
+    assert (stream_resolver.resolved, stream_resolver.unresolved) == (resolver.resolved, resolver.unresolved)
+    assert result == expected
+    # Only the current block's lower-timeframe candles are ever held
+    assert stream_resolver._slices == {} and stream_resolver._times is None